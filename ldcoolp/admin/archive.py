@@ -0,0 +1,224 @@
+"""
+A set of functions to package deposits as tar archives with parallel block
+compression and an index of member offsets, so that single files can be
+extracted without decompressing the whole archive
+"""
+
+from os.path import join, exists, basename, relpath, isdir
+from os import walk, chmod, replace, getpid, remove
+import gzip
+import json
+import tarfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Logging
+from ..logger import log_stdout
+
+# Uncompressed size of each independently compressed block
+block_size = 4 * 1024**2  # 4 MB
+
+
+class BlockWriter:
+    """
+    Purpose:
+      File-like object that splits a stream into blocks and compresses them
+      in parallel as independent gzip members. Concatenated gzip members are
+      a valid gzip file, and the offset of each block is recorded so that it
+      can be decompressed on its own
+
+    :param f: Binary file object for the compressed output
+    :param block_size: Uncompressed size of each block
+    :param compresslevel: gzip compression level. Default: 6
+    :param n_threads: Number of blocks compressed in parallel. Default: 8
+    """
+
+    def __init__(self, f, block_size=block_size, compresslevel=6, n_threads=8):
+        self.f = f
+        self.block_size = block_size
+        self.compresslevel = compresslevel
+        self.n_threads = n_threads
+
+        self.executor = ThreadPoolExecutor(max_workers=n_threads)
+        self.pending = deque()
+        self.buffer = bytearray()
+
+        self.position = 0  # Uncompressed position
+        self.compressed_position = 0
+        self.blocks = []  # [uncompressed offset, compressed offset, compressed size]
+
+    def tell(self):
+        return self.position
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        while len(self.buffer) >= self.block_size:
+            self.submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return len(data)
+
+    def submit(self, block):
+        start = self.position - len(self.buffer)
+        future = self.executor.submit(gzip.compress, block, self.compresslevel)
+        self.pending.append((start, future))
+
+        # Bound memory by writing out completed blocks in order
+        while len(self.pending) > 2 * self.n_threads:
+            self.drain_one()
+
+    def drain_one(self):
+        start, future = self.pending.popleft()
+        data = future.result()
+        self.f.write(data)
+        self.blocks.append([start, self.compressed_position, len(data)])
+        self.compressed_position += len(data)
+
+    def close(self):
+        if self.buffer:
+            self.submit(bytes(self.buffer))
+            self.buffer = bytearray()
+        while self.pending:
+            self.drain_one()
+        self.executor.shutdown()
+
+
+def package(source, filename, arc_root=None, block_size=block_size, compresslevel=6,
+            n_threads=8, log=None):
+    """
+    Purpose:
+      Write the folder tree at [source] to a tar.gz archive compressed in
+      parallel blocks, and an index (<filename>.index.json) with the block
+      offsets and the offset and size of each member in a single pass
+
+    :param source: Full path of folder to archive
+    :param filename: Full filename of archive (e.g., Name_12345678_v1.tar.gz)
+    :param arc_root: Name of the top folder in the archive (e.g., Name_12345678/v1).
+           Default: folder name of [source]
+    :param block_size: Uncompressed size of each block. Default: 4 MB
+    :param compresslevel: gzip compression level. Default: 6
+    :param n_threads: Number of blocks compressed in parallel. Default: 8
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    :return index_dict: dict with 'block_size', 'blocks' and 'members'
+    """
+
+    if isinstance(log, type(None)):
+        log = log_stdout()
+
+    if arc_root is None:
+        arc_root = basename(source.rstrip('/'))
+    temp_filename = f"{filename}.{getpid()}.tmp"
+
+    path_list = [source]
+    for dir_path, dir_names, filenames in walk(source):
+        dir_names.sort()
+        for name in dir_names + sorted(filenames):
+            path_list.append(join(dir_path, name))
+
+    log.info(f"Packaging {len(path_list)} entries : {filename}")
+
+    members = dict()
+    try:
+        with open(temp_filename, 'wb') as f:
+            writer = BlockWriter(f, block_size=block_size, compresslevel=compresslevel,
+                                 n_threads=n_threads)
+            with tarfile.open(fileobj=writer, mode='w', format=tarfile.PAX_FORMAT) as tar:
+                for path in path_list:
+                    arcname = arc_root if path == source else \
+                        join(arc_root, relpath(path, source))
+                    tarinfo = tar.gettarinfo(path, arcname=arcname)
+                    if tarinfo.isreg():
+                        with open(path, 'rb') as member_file:
+                            tar.addfile(tarinfo, member_file)
+                        # Data is padded to a multiple of 512 bytes after the header
+                        offset = tar.offset - -(-tarinfo.size // 512) * 512
+                        members[arcname] = {'offset': offset, 'size': tarinfo.size}
+                    else:
+                        tar.addfile(tarinfo)
+            writer.close()
+
+        index_dict = {'block_size': writer.block_size, 'blocks': writer.blocks,
+                      'members': members}
+        with open(f"{temp_filename}.index", 'w') as f:
+            json.dump(index_dict, f)
+
+        replace(temp_filename, filename)
+        replace(f"{temp_filename}.index", f"{filename}.index.json")
+    except BaseException:
+        # Do not leave partial archives next to completed ones
+        for temp_file in [temp_filename, f"{temp_filename}.index"]:
+            if exists(temp_file):
+                remove(temp_file)
+        raise
+
+    for out_file in [filename, f"{filename}.index.json"]:
+        chmod(out_file, 0o444)
+
+    log.info(f"Packaged {len(members)} files in {len(writer.blocks)} blocks")
+
+    return index_dict
+
+
+def read_member(filename, name, index_dict=None):
+    """
+    Purpose:
+      Read a single file from an archive written by package(). Only the
+      blocks containing the file are read and decompressed
+
+    :param filename: Full filename of archive
+    :param name: Member name (e.g., Name_12345678/v1/ORIGINAL_DATA/file.txt)
+    :param index_dict: dict from package(). Default: read <filename>.index.json
+
+    :return: bytes of the file
+    """
+
+    if index_dict is None:
+        with open(f"{filename}.index.json", 'r') as f:
+            index_dict = json.load(f)
+
+    member = index_dict['members'][name]
+    start, end = member['offset'], member['offset'] + member['size']
+
+    data = bytearray()
+    data_start = None
+    with open(filename, 'rb') as f:
+        for u_offset, c_offset, c_size in index_dict['blocks']:
+            if u_offset >= end:
+                break
+            if u_offset + index_dict['block_size'] <= start:
+                continue
+            if data_start is None:
+                data_start = u_offset
+            f.seek(c_offset)
+            data += gzip.decompress(f.read(c_size))
+
+    if data_start is None:  # Empty file
+        return b''
+    return bytes(data[start - data_start:end - data_start])
+
+
+def archive_deposit(folder_path, archive_path, depositor_name, log=None):
+    """
+    Purpose:
+      Package a deposit folder (e.g., 4.Published/Name_12345678/v1) as
+      <archive_path>/Name_12345678_v1.tar.gz with Name_12345678/v1 as its
+      top folder, so an archive identifies its deposit on its own
+
+    :return filename: Full filename of archive. None if it exists
+    """
+
+    if isinstance(log, type(None)):
+        log = log_stdout()
+
+    filename = join(archive_path, depositor_name.replace('/v', '_v') + '.tar.gz')
+    if exists(filename):
+        log.warn(f"Archive exists. Not overwriting : {filename}")
+        return None
+
+    if not isdir(archive_path):
+        raise FileNotFoundError(f"Unable to archive {folder_path} to {archive_path}")
+
+    package(folder_path, filename, arc_root=depositor_name, log=log)
+
+    return filename
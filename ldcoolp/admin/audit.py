@@ -0,0 +1,249 @@
+from os.path import join, exists, relpath
+from os import scandir, chmod
+import sqlite3
+from time import time, monotonic, sleep
+
+# Logging
+from ..logger import log_stdout
+
+from .move import MoveClass
+from .fixity import file_digests
+
+# Read in default configuration settings
+from ..config import config_default_dict
+
+
+def scan_files(path):
+    """
+    Purpose:
+      Retrieve stat signature of all files under [path] with os.scandir
+
+    :param path: Parent location path
+
+    :return: dict mapping full path to (size, mtime_ns, inode)
+    """
+
+    file_dict = dict()
+
+    stack = [path]
+    while stack:
+        dir_path = stack.pop()
+        try:
+            with scandir(dir_path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        entry_stat = entry.stat(follow_symlinks=False)
+                        file_dict[entry.path] = (entry_stat.st_size, entry_stat.st_mtime_ns,
+                                                 entry_stat.st_ino)
+        except (FileNotFoundError, PermissionError):
+            continue
+
+    return file_dict
+
+
+class AuditClass:
+    """
+    Purpose:
+      Incremental fixity audit of deposits in curation stages. A SQLite
+      state store keeps the stat signature (size, mtime, inode), last
+      checksums and last verified time of every file. Each run:
+       1. Checksums files whose stat signature changed
+       2. Within an I/O budget (rate and duration of a run), checksums
+          new files, oldest first, then re-verifies files on a rolling
+          schedule, oldest verification first. New files beyond the
+          budget are deferred to the next run
+       3. Reports files that are missing or whose checksums changed
+
+    :param curation_dict: Dict that contains curation configuration.
+      This should include:
+       - audit_file (str)
+       - audit_stages (str, comma-separated)
+       - audit_rate (MB/s)
+       - audit_duration (minutes)
+       - audit_cycle (days)
+
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    Methods
+    -------
+    scan()
+      Compare stat signatures of all files with the state store
+
+    verify(path, signature, expected)
+      Checksum a file and record the result
+
+    main()
+      Perform audit
+    """
+
+    def __init__(self, curation_dict=config_default_dict['curation'], log=None):
+
+        if isinstance(log, type(None)):
+            self.log = log_stdout()
+        else:
+            self.log = log
+
+        self.mc = MoveClass(curation_dict=curation_dict, log=self.log)
+        self.root_directory_main = self.mc.root_directory_main
+
+        self.stage_list = [stage.strip() for stage in curation_dict['audit_stages'].split(',')]
+        self.rate = float(curation_dict['audit_rate']) * 1024**2  # bytes/s
+        self.duration = float(curation_dict['audit_duration']) * 60  # s
+        self.cycle = float(curation_dict['audit_cycle']) * 86400  # s
+
+        self.db_file = join(self.root_directory_main, curation_dict['audit_file'])
+        new_db = not exists(self.db_file)
+        self.db = sqlite3.connect(self.db_file)
+        if new_db:
+            chmod(self.db_file, 0o666)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS files (
+                             path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,
+                             inode INTEGER, md5 TEXT, sha256 TEXT, verified REAL,
+                             status TEXT)""")
+        self.db.commit()
+
+        self.bytes_read = 0
+        self.start_time = None
+
+    def close(self):
+        self.db.close()
+
+    def scan(self):
+        """
+        Purpose:
+          Compare stat signatures of all files in the audited stages with
+          the state store. Files no longer present are marked missing
+
+        :return changed_list, new_list: lists of (path, signature) for files
+                whose stat signature changed and for new files (oldest first)
+        """
+
+        changed_list = []
+        new_list = []
+        seen = set()
+
+        stored_dict = {row[0]: row[1:] for row in
+                       self.db.execute("SELECT path, size, mtime_ns, inode, sha256 FROM files "
+                                       "WHERE status != 'missing'")}
+
+        for stage in self.stage_list:
+            for full_path, signature in scan_files(join(self.root_directory_main, stage)).items():
+                path = relpath(full_path, self.root_directory_main)
+                seen.add(path)
+
+                stored = stored_dict.get(path)
+                if stored is None:
+                    new_list.append((path, signature))
+                elif tuple(stored[:3]) != signature:
+                    self.log.warn(f"Stat signature changed : {path}")
+                    changed_list.append((path, signature))
+
+        missing_list = [path for path in stored_dict if path not in seen]
+        for path in missing_list:
+            self.log.warn(f"File is missing : {path}")
+        self.db.executemany("UPDATE files SET status = 'missing' WHERE path = ?",
+                            [(path,) for path in missing_list])
+        self.db.commit()
+
+        new_list.sort(key=lambda item: item[1][1])  # By mtime
+
+        return changed_list, new_list
+
+    def throttle(self):
+        """Sleep to keep the average read rate within the I/O budget"""
+
+        expected = self.bytes_read / self.rate
+        elapsed = monotonic() - self.start_time
+        if expected > elapsed:
+            sleep(expected - elapsed)
+
+    def verify(self, path, signature, expected=None):
+        """
+        Purpose:
+          Checksum a file and record the result in the state store
+
+        :param path: File path relative to root_directory_main
+        :param signature: (size, mtime_ns, inode)
+        :param expected: Expected SHA-256 checksum. None for new or changed files
+
+        :return status: 'ok', 'new' or 'corrupt'
+        """
+
+        digests = file_digests(join(self.root_directory_main, path))
+        self.bytes_read += signature[0]
+
+        if expected is None:
+            status = 'new'
+        elif digests['sha256'] == expected:
+            status = 'ok'
+        else:
+            status = 'corrupt'
+            self.log.error(f"Checksum mismatch : {path}")
+
+        # Keep the last good checksum for corrupt files
+        if status == 'corrupt':
+            self.db.execute("UPDATE files SET verified = ?, status = ? WHERE path = ?",
+                            (time(), status, path))
+        else:
+            self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            (path, *signature, digests['md5'], digests['sha256'], time(),
+                             'ok'))
+        self.db.commit()
+
+        self.throttle()
+
+        return status
+
+    def main(self):
+        """
+        Purpose:
+          Perform audit
+
+        :return summary_dict: dict with number of files for each result
+        """
+
+        self.bytes_read = 0
+        self.start_time = monotonic()
+        budget = self.rate * self.duration
+
+        summary_dict = {'new': 0, 'ok': 0, 'corrupt': 0, 'deferred': 0}
+
+        # Changed files are always checksummed
+        changed_list, new_list = self.scan()
+        self.log.info(f"Checksumming {len(changed_list)} changed files ...")
+        for path, signature in changed_list:
+            try:
+                summary_dict[self.verify(path, signature)] += 1
+            except FileNotFoundError:
+                continue
+
+        # New files (oldest first), then rolling schedule (oldest verification
+        # first), within I/O budget
+        due_list = self.db.execute("SELECT path, size, mtime_ns, inode, sha256 FROM files "
+                                   "WHERE status IN ('ok', 'corrupt') AND verified < ? "
+                                   "ORDER BY verified", (time() - self.cycle,)).fetchall()
+        self.log.info(f"{len(new_list)} new files, {len(due_list)} files due for verification")
+
+        queue = [(path, signature, None) for path, signature in new_list] + \
+                [(path, (size, mtime_ns, inode), sha256) for
+                 path, size, mtime_ns, inode, sha256 in due_list]
+        for ii, (path, signature, expected) in enumerate(queue):
+            if self.bytes_read > 0 and self.bytes_read + signature[0] > budget:
+                summary_dict['deferred'] = len(queue) - ii
+                self.log.info(f"I/O budget reached. {len(queue) - ii} files deferred to next run")
+                break
+            try:
+                summary_dict[self.verify(path, signature, expected)] += 1
+            except FileNotFoundError:
+                continue
+
+        summary_dict['missing'] = self.db.execute(
+            "SELECT COUNT(*) FROM files WHERE status = 'missing'").fetchone()[0]
+        summary_dict['bytes'] = self.bytes_read
+        summary_dict['duration'] = round(monotonic() - self.start_time, 3)
+
+        self.log.info(f"Audit summary : {summary_dict}")
+
+        return summary_dict
@@ -0,0 +1,265 @@
+from os.path import join, isdir, exists, basename, dirname
+from os import listdir, stat, chmod, replace, getpid
+import json
+from threading import Lock
+
+# Logging
+from ..logger import log_stdout
+
+from .lock import DepositLock
+
+
+def get_version(depositor_name):
+    """Return version number (int) from version folder (e.g., "Name_12345678/v2").
+    None if there is no version folder"""
+
+    version = basename(depositor_name)
+    if version[:1] == 'v' and version[1:].isdigit():
+        return int(version[1:])
+    else:
+        return None
+
+
+class CatalogClass:
+    """
+    Purpose:
+      Persistent catalog of the curation server that maps each deposit
+      folder to its curation stage and version. Single lookups are
+      validated with one stat of the catalogued path, and bulk queries
+      re-list only the stage and deposit folders whose mtime changed
+
+    :param root_directory_main: Full path of curation parent/root directory
+    :param filename: Full filename of JSON catalog.
+           Default: .stage_catalog.json in root_directory_main
+    :param lock_folder: Folder for lock files in root_directory_main. Changes
+           are made under a lock on the reserved name .catalog. Default: .locks
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    Attributes
+    ----------
+    deposits : dict
+      Maps deposit folder (e.g., "Name_12345678/v2") to dict with 'stage' and 'version'
+
+    mtimes : dict
+      Maps stage and deposit folders (relative to root_directory_main) to
+      mtime when last listed
+
+    Methods
+    -------
+    lookup(depositor_name)
+      Return catalogued stage for a deposit if it is still valid
+
+    update(depositor_name, stage)
+      Record stage for a deposit
+
+    update_many(stage_dict)
+      Record stages for multiple deposits with a single write
+
+    refresh(stage)
+      Re-list folders in a stage that changed since last listed
+
+    list_stage(stage)
+      Return list of all deposits in a stage
+
+    list_versions(parent, stage_list)
+      Return all versions of a deposit and their stages
+    """
+
+    def __init__(self, root_directory_main, filename=None, lock_folder='.locks', log=None):
+
+        if isinstance(log, type(None)):
+            self.log = log_stdout()
+        else:
+            self.log = log
+
+        self.root_directory_main = root_directory_main
+
+        if isinstance(filename, type(None)):
+            filename = join(root_directory_main, '.stage_catalog.json')
+        self.filename = filename
+
+        self.deposits = dict()
+        self.mtimes = dict()
+        self.lock = Lock()
+        self.lock_folder = lock_folder
+        self.load()
+
+    def file_lock(self):
+        """Return DepositLock that serializes changes to the catalog across processes"""
+
+        return DepositLock(self.root_directory_main, '.catalog', operation='catalog',
+                           lock_folder=self.lock_folder, log=self.log)
+
+    def load(self):
+        """Read catalog from JSON file"""
+
+        if not exists(self.filename):
+            return
+
+        try:
+            with open(self.filename, 'r') as f:
+                catalog = json.load(f)
+            self.deposits = catalog['deposits']
+            self.mtimes = catalog['mtimes']
+        except (OSError, ValueError, KeyError):
+            self.log.debug(f"Unable to read catalog: {self.filename}")
+
+    def save(self):
+        """Write catalog to JSON file. The catalog is a cache so failures are not fatal"""
+
+        temp_filename = f"{self.filename}.{getpid()}.tmp"
+        try:
+            with open(temp_filename, 'w') as f:
+                json.dump({'deposits': self.deposits, 'mtimes': self.mtimes}, f)
+            chmod(temp_filename, 0o666)
+            replace(temp_filename, self.filename)  # atomic
+        except OSError:
+            self.log.debug(f"Unable to write catalog: {self.filename}")
+
+    def lookup(self, depositor_name):
+        """
+        Purpose:
+          Return catalogued stage for a deposit if it is still valid
+
+        :param depositor_name: Exact name of the data curation folder with spaces
+
+        :return stage: str containing stage name. None if not catalogued or stale
+        """
+
+        entry = self.deposits.get(depositor_name)
+        if entry and isdir(join(self.root_directory_main, entry['stage'], depositor_name)):
+            return entry['stage']
+        else:
+            return None
+
+    def update(self, depositor_name, stage):
+        """
+        Purpose:
+          Record stage for a deposit
+
+        :param depositor_name: Exact name of the data curation folder with spaces
+        :param stage: str containing stage name. None removes the deposit
+        """
+
+        self.update_many({depositor_name: stage})
+
+    def update_many(self, stage_dict):
+        """
+        Purpose:
+          Record stages for multiple deposits with a single write. The
+          catalog is re-read under the catalog lock to keep changes from
+          other processes
+
+        :param stage_dict: dict mapping data curation folder to stage name.
+               A stage of None removes the deposit
+        """
+
+        with self.lock, self.file_lock():
+            self.load()
+            for depositor_name, stage in stage_dict.items():
+                if stage is None:
+                    self.deposits.pop(depositor_name, None)
+                else:
+                    self.deposits[depositor_name] = {'stage': stage,
+                                                     'version': get_version(depositor_name)}
+            self.save()
+
+    def refresh(self, stage):
+        """
+        Purpose:
+          Re-list stage and deposit folders whose mtime changed since last listed
+
+        :param stage: str containing stage name
+
+        :return changed: bool. True if the catalog was changed
+        """
+
+        changed = False
+
+        stage_path = join(self.root_directory_main, stage)
+        if not isdir(stage_path):
+            return changed
+
+        stage_mtime = stat(stage_path).st_mtime
+        if self.mtimes.get(stage) != stage_mtime:
+            parents = [parent for parent in listdir(stage_path) if
+                       isdir(join(stage_path, parent)) and parent[0] != '.']
+            self.mtimes[stage] = stage_mtime
+            changed = True
+        else:
+            parents = set([dirname(name) for name, entry in self.deposits.items()
+                           if entry['stage'] == stage])
+
+        valid_parents = set()
+        for parent in parents:
+            parent_path = join(stage_path, parent)
+            key = join(stage, parent)
+            if not isdir(parent_path):
+                self.mtimes.pop(key, None)
+                continue
+            valid_parents.add(parent)
+
+            parent_mtime = stat(parent_path).st_mtime
+            if self.mtimes.get(key) == parent_mtime:
+                continue
+
+            # Remove previous entries for this deposit in this stage
+            for name in [name for name, entry in self.deposits.items() if
+                         entry['stage'] == stage and dirname(name) == parent]:
+                del self.deposits[name]
+
+            for version in listdir(parent_path):
+                name = join(parent, version)
+                if get_version(name) is not None:
+                    self.deposits[name] = {'stage': stage, 'version': get_version(name)}
+
+            self.mtimes[key] = parent_mtime
+            changed = True
+
+        # Remove deposits whose folder was removed from the stage
+        for name in [name for name, entry in self.deposits.items() if
+                     entry['stage'] == stage and dirname(name) not in valid_parents]:
+            del self.deposits[name]
+            changed = True
+
+        return changed
+
+    def list_stage(self, stage):
+        """
+        Purpose:
+          Return list of all deposits in a stage (e.g., all deposits in 2.UnderReview)
+
+        :param stage: str containing stage name
+
+        :return: sorted list of deposit folders (e.g., "Name_12345678/v2")
+        """
+
+        with self.lock, self.file_lock():
+            self.load()
+            if self.refresh(stage):
+                self.save()
+
+        return sorted([name for name, entry in self.deposits.items() if
+                       entry['stage'] == stage])
+
+    def list_versions(self, parent, stage_list):
+        """
+        Purpose:
+          Return all versions of a deposit across curation stages
+
+        :param parent: Deposit folder without version (e.g., "Name_12345678")
+        :param stage_list: list of stage names to search
+
+        :return: dict mapping version folders (e.g., "Name_12345678/v2") to stage
+        """
+
+        with self.lock, self.file_lock():
+            self.load()
+            changed = False
+            for stage in stage_list:
+                changed = self.refresh(stage) or changed
+            if changed:
+                self.save()
+
+        return {name: entry['stage'] for name, entry in self.deposits.items() if
+                dirname(name) == parent and entry['stage'] in stage_list}
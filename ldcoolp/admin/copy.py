@@ -0,0 +1,431 @@
+"""
+A set of functions to clone and copy files on the curation server, favoring
+hard links and copy-on-write clones over full copies of the data
+"""
+
+from os import link, remove, scandir, mkdir, makedirs, chmod, readlink, symlink, \
+    stat, rename, walk
+from os.path import exists, join, dirname, basename, islink
+import os
+import errno
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import shutil
+import filecmp
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Non-POSIX systems
+    fcntl = None
+
+# ioctl request number to clone a file on Linux (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+
+def reflink(source, destination):
+    """
+    Purpose:
+      Create a copy-on-write clone of [source] at [destination].
+      Raises OSError if the filesystem does not support reflinks
+
+    :param source: Full path of file to clone
+    :param destination: Full path of new file
+    """
+
+    if fcntl is None:
+        raise OSError("reflink is not supported on this platform")
+
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            remove(destination)
+            raise
+
+
+def supports_reflink(path):
+    """Return True if the filesystem of folder [path] supports reflinks.
+    Probed by cloning a small temporary file"""
+
+    fd, probe = tempfile.mkstemp(dir=path, prefix='.reflink_probe.')
+    try:
+        os.write(fd, b'probe')
+        os.close(fd)
+        try:
+            reflink(probe, f"{probe}.clone")
+        except OSError:
+            return False
+        remove(f"{probe}.clone")
+        return True
+    finally:
+        remove(probe)
+
+
+def clone(source, destination, hardlink=True):
+    """
+    Purpose:
+      Clone a file with the cheapest available method.
+      This tries a hard link, then a copy-on-write reflink, and falls
+      back to a full copy
+
+    :param source: Full path of file to clone
+    :param destination: Full path of new file
+    :param hardlink: bool to allow hard links. Default: True
+
+    :return method: str indicating 'hardlink', 'reflink' or 'copy'
+    """
+
+    if exists(destination):
+        raise FileExistsError(f"File exists: {destination}")
+
+    if hardlink:
+        try:
+            link(source, destination)
+            return 'hardlink'
+        except OSError:
+            pass
+
+    try:
+        reflink(source, destination)
+        return 'reflink'
+    except OSError:
+        pass
+
+    shutil.copyfile(source, destination)
+    return 'copy'
+
+
+def copy_file_range(source, destination):
+    """
+    Purpose:
+      Copy [source] to [destination] with the kernel's copy offload
+      (os.copy_file_range) so that data does not pass through user space.
+      Raises OSError if copy offload is not supported
+
+    :param source: Full path of file to copy
+    :param destination: Full path of new file
+    """
+
+    if not hasattr(os, 'copy_file_range'):
+        raise OSError(errno.ENOSYS, "copy_file_range is not supported on this platform")
+
+    size = stat(source).st_size
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        offset = 0
+        try:
+            while offset < size:
+                n_bytes = os.copy_file_range(src.fileno(), dst.fileno(), size - offset)
+                if n_bytes == 0:
+                    break
+                offset += n_bytes
+        except OSError:
+            dst.close()
+            remove(destination)
+            raise
+
+
+def fast_copy(source, destination):
+    """
+    Purpose:
+      Copy a file with the fastest available method.
+      This tries a copy-on-write reflink, then kernel copy offload, and
+      falls back to shutil.copyfile (which uses sendfile on Linux)
+
+    :param source: Full path of file to copy
+    :param destination: Full path of new file
+
+    :return method: str indicating 'reflink', 'copy_file_range' or 'copy'
+    """
+
+    try:
+        reflink(source, destination)
+        return 'reflink'
+    except OSError:
+        pass
+
+    try:
+        copy_file_range(source, destination)
+        return 'copy_file_range'
+    except OSError:
+        pass
+
+    shutil.copyfile(source, destination)
+    return 'copy'
+
+
+def file_checksum(filename, blocksize=2**20):
+    """Return MD5 checksum (hexdigest) of a file"""
+
+    hash_md5 = hashlib.md5()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(blocksize), b''):
+            hash_md5.update(chunk)
+
+    return hash_md5.hexdigest()
+
+
+def remove_tree(path):
+    """Remove folder tree at [path], including read-only folders"""
+
+    for dir_path, dir_names, _ in walk(path):
+        chmod(dir_path, 0o777)
+        for dir_name in dir_names:
+            if not islink(join(dir_path, dir_name)):
+                chmod(join(dir_path, dir_name), 0o777)
+    shutil.rmtree(path)
+
+
+def scan_tree(path):
+    """
+    Purpose:
+      Retrieve all folders, files and symbolic links under [path] with a
+      single os.scandir pass
+
+    :param path: Parent location path
+
+    :return dirs, files, links: lists of (relative path, mode) for folders
+            and files, and relative paths for symbolic links
+    """
+
+    dirs, files, links = [], [], []
+
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        with scandir(join(path, rel_dir)) as it:
+            for entry in it:
+                rel_path = join(rel_dir, entry.name)
+                if entry.is_symlink():
+                    links.append(rel_path)
+                elif entry.is_dir():
+                    dirs.append((rel_path, entry.stat().st_mode))
+                    stack.append(rel_path)
+                else:
+                    files.append((rel_path, entry.stat().st_mode))
+
+    return dirs, files, links
+
+
+def copy_tree(source, destination, n_threads=8, compare=False, log=None):
+    """
+    Purpose:
+      Copy the folder tree at [source] to [destination] in bulk. Files are
+      copied by a pool of threads so that many transfers are in flight at
+      once, which hides the round trip latency of network mounts. Each file
+      is verified after copying and file and folder permissions are
+      preserved
+
+    :param source: Full path of folder to copy
+    :param destination: Full path of new folder. Parent folder must exist
+    :param n_threads: Number of parallel copies. Default: 8
+    :param compare: bool to compare file contents in addition to size.
+           Default: False
+    :param log: logger.LogClass object. Default: None (no logging)
+
+    :return n_files: Number of files copied
+    """
+
+    dirs, files, links = scan_tree(source)
+    if log:
+        log.info(f"Copying {len(files)} files in {len(dirs)} folders to {destination}")
+
+    # Folders are created writable. Permissions are applied at the end
+    mkdir(destination)
+    for rel_dir, _ in dirs:
+        mkdir(join(destination, rel_dir))
+
+    for rel_link in links:
+        symlink(readlink(join(source, rel_link)), join(destination, rel_link))
+
+    def copy_file(rel_file, mode):
+        src_file = join(source, rel_file)
+        dst_file = join(destination, rel_file)
+
+        fast_copy(src_file, dst_file)
+        chmod(dst_file, mode)
+
+        if stat(dst_file).st_size != stat(src_file).st_size:
+            raise OSError(f"Size mismatch after copy: {dst_file}")
+        if compare and not filecmp.cmp(src_file, dst_file, shallow=False):
+            raise OSError(f"Content mismatch after copy: {dst_file}")
+
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        futures = [executor.submit(copy_file, rel_file, mode) for rel_file, mode in files]
+        for future in futures:
+            future.result()
+
+    # Deepest folders first so read-only folders do not block their parents
+    for rel_dir, mode in sorted(dirs, key=lambda d: d[0].count('/'), reverse=True):
+        chmod(join(destination, rel_dir), mode)
+    chmod(destination, stat(source).st_mode)
+
+    return len(files)
+
+
+def populate_tree(source, destination, mode=0o777, n_threads=8, log=None):
+    """
+    Purpose:
+      Populate the working copy at [destination] with the folders and
+      files of [source]. Files are cloned with copy-on-write reflinks
+      where supported, which take no space until modified, and otherwise
+      copied in parallel with copy offload. Files are never hard linked,
+      so changes to the working copy do not affect [source]. Existing
+      files in [destination] are kept
+
+    :param source: Full path of folder to copy (e.g., ORIGINAL_DATA)
+    :param destination: Full path of working copy (e.g., DATA)
+    :param mode: Mode for folders and files of the working copy.
+           Default: 0o777 (rwx for curators)
+    :param n_threads: Number of parallel copies. Default: 8
+    :param log: logger.LogClass object. Default: None (no logging)
+
+    :return method_dict: dict with number of files for each method
+            ('reflink', 'copy_file_range', 'copy', 'exists')
+    """
+
+    dirs, files, links = scan_tree(source)
+
+    makedirs(destination, exist_ok=True)
+    chmod(destination, mode)
+    for rel_dir, _ in dirs:
+        makedirs(join(destination, rel_dir), exist_ok=True)
+        chmod(join(destination, rel_dir), mode)
+
+    for rel_link in links:
+        if not islink(join(destination, rel_link)):
+            symlink(readlink(join(source, rel_link)), join(destination, rel_link))
+
+    def copy_file(rel_file):
+        dst_file = join(destination, rel_file)
+        if exists(dst_file):
+            return 'exists'
+
+        method = fast_copy(join(source, rel_file), dst_file)
+        chmod(dst_file, mode)
+        return method
+
+    method_dict = {'reflink': 0, 'copy_file_range': 0, 'copy': 0, 'exists': 0}
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        for method in executor.map(copy_file, [rel_file for rel_file, _ in files]):
+            method_dict[method] += 1
+
+    if log:
+        log.info(f"Populated {destination} : " +
+                 ", ".join([f"{value} {key}" for key, value in method_dict.items() if value]))
+
+    return method_dict
+
+
+def move_tree(source, destination, n_threads=8, checksum=True, log=None):
+    """
+    Purpose:
+      Move the folder tree at [source] to [destination] on another
+      filesystem. Files are copied in parallel with copy offload into a
+      hidden partial folder next to [destination] and verified against
+      [source] by size and checksum. The partial folder is then renamed
+      to [destination] and only then is [source] removed. An interrupted
+      move is resumed by calling move_tree again: verified files in the
+      partial folder are kept, and if [destination] is already in place,
+      [source] is removed once [destination] is verified against it
+
+    :param source: Full path of folder to move
+    :param destination: Full path of new folder. Must not exist unless
+           resuming an interrupted move
+    :param n_threads: Number of parallel copies. Default: 8
+    :param checksum: bool to verify MD5 checksum in addition to size.
+           Default: True
+    :param log: logger.LogClass object. Default: None (no logging)
+
+    :return n_files: Number of files copied. 0 if the copy was already complete
+    """
+
+    partial = join(dirname(destination), f".{basename(destination)}.partial")
+    trash = join(dirname(source), f".{basename(source)}.moved")
+
+    def verify(src_file, dst_file):
+        if stat(dst_file).st_size != stat(src_file).st_size:
+            return False
+        if checksum and file_checksum(dst_file) != file_checksum(src_file):
+            return False
+        return True
+
+    if exists(destination) and not exists(partial):
+        # Interrupted after the rename of the partial folder
+        if not exists(source) and exists(trash):
+            remove_tree(trash)
+            return 0
+
+        if exists(source):
+            src_dirs, src_files, src_links = scan_tree(source)
+            dst_dirs, dst_files, dst_links = scan_tree(destination)
+            if sorted(src_dirs) == sorted(dst_dirs) and sorted(src_links) == sorted(dst_links) \
+                    and sorted(src_files) == sorted(dst_files) and \
+                    all([verify(join(source, rel_file), join(destination, rel_file))
+                         for rel_file, _ in src_files]):
+                if log:
+                    log.info(f"Destination verified. Removing source: {source}")
+                if exists(trash):
+                    remove_tree(trash)
+                rename(source, trash)
+                remove_tree(trash)
+                return 0
+
+    if exists(destination):
+        raise FileExistsError(f"Destination exists: {destination}")
+
+    dirs, files, links = scan_tree(source)
+    if log:
+        log.info(f"Moving {len(files)} files in {len(dirs)} folders to {destination}")
+        if exists(partial):
+            log.info(f"Resuming from partial folder: {partial}")
+
+    # Folders are created writable. Permissions are applied at the end
+    makedirs(partial, exist_ok=True)
+    for rel_dir, _ in dirs:
+        makedirs(join(partial, rel_dir), exist_ok=True)
+
+    for rel_link in links:
+        if not islink(join(partial, rel_link)):
+            symlink(readlink(join(source, rel_link)), join(partial, rel_link))
+
+    def copy_file(rel_file, mode):
+        src_file = join(source, rel_file)
+        dst_file = join(partial, rel_file)
+
+        if exists(dst_file):
+            if verify(src_file, dst_file):
+                chmod(dst_file, mode)
+                return 0
+            remove(dst_file)
+
+        fast_copy(src_file, dst_file)
+        chmod(dst_file, mode)
+
+        if not verify(src_file, dst_file):
+            raise OSError(f"Verification failed after copy: {dst_file}")
+        return 1
+
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        futures = [executor.submit(copy_file, rel_file, mode) for rel_file, mode in files]
+        n_copied = sum([future.result() for future in futures])
+
+    if log:
+        log.info(f"Copied {n_copied} files ({len(files) - n_copied} already copied)")
+
+    # Deepest folders first so read-only folders do not block their parents
+    for rel_dir, mode in sorted(dirs, key=lambda d: d[0].count('/'), reverse=True):
+        chmod(join(partial, rel_dir), mode)
+    chmod(partial, stat(source).st_mode)
+
+    # Destination appears only once the copy is complete and verified
+    rename(partial, destination)
+
+    # Set source aside in a single rename before removing it
+    if exists(trash):
+        remove_tree(trash)
+    rename(source, trash)
+    remove_tree(trash)
+
+    return len(files)
@@ -0,0 +1,238 @@
+"""
+A set of functions to compute checksums of deposit files and write
+BagIt-style fixity manifests for preservation
+"""
+
+from os.path import join, exists, relpath
+from os import makedirs, chmod, walk, stat
+import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+# Logging
+from ..logger import log_stdout
+
+from .move import MoveClass
+
+# Read in default configuration settings
+from ..config import config_default_dict
+
+default_algorithms = ('md5', 'sha256')
+
+
+def file_digests(filename, algorithms=default_algorithms, blocksize=8*1024**2):
+    """
+    Purpose:
+      Compute several checksums of a file in a single read pass. Blocks are
+      read into a reused buffer and the kernel is advised of sequential
+      access to maximize read-ahead
+
+    :param filename: Full filename (str)
+    :param algorithms: list of hashlib algorithm names. Default: md5, sha256
+    :param blocksize: Number of bytes to read at a time. Default: 8 MB
+
+    :return: dict of hexadecimal checksum for each algorithm
+    """
+
+    hashes = [hashlib.new(algorithm) for algorithm in algorithms]
+
+    buffer = bytearray(blocksize)
+    view = memoryview(buffer)
+    with open(filename, 'rb', buffering=0) as f:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+        while True:
+            n_bytes = f.readinto(buffer)
+            if not n_bytes:
+                break
+            for hash_obj in hashes:
+                hash_obj.update(view[:n_bytes])
+
+    return {algorithm: hash_obj.hexdigest() for algorithm, hash_obj in zip(algorithms, hashes)}
+
+
+def _file_digests(args):
+    """Wrapper of file_digests for process pool"""
+    return file_digests(*args)
+
+
+def hash_tree(path, algorithms=default_algorithms, executor=None, n_processes=None):
+    """
+    Purpose:
+      Compute checksums for all files under [path] with a process pool.
+      Files are submitted largest first to balance the workers
+
+    :param path: Parent location path
+    :param algorithms: list of hashlib algorithm names. Default: md5, sha256
+    :param executor: concurrent.futures executor to use. Default: new process pool
+    :param n_processes: Number of processes for new process pool. Default: number of CPUs
+
+    :return digest_dict: dict mapping relative path to dict of checksums
+    """
+
+    file_list = []
+    for dir_path, _, filenames in walk(path):
+        for filename in filenames:
+            full_path = join(dir_path, filename)
+            if not os.path.islink(full_path):
+                file_list.append((stat(full_path).st_size, full_path))
+    file_list.sort(reverse=True)
+
+    args_list = [(full_path, algorithms) for _, full_path in file_list]
+
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=n_processes) as pool:
+            digest_list = list(pool.map(_file_digests, args_list))
+    else:
+        digest_list = list(executor.map(_file_digests, args_list))
+
+    return {relpath(full_path, path): digests for (_, full_path), digests in
+            zip(file_list, digest_list)}
+
+
+def encode_path(path):
+    """Percent-encode a path for a BagIt manifest"""
+    return path.replace('%', '%25').replace('\n', '%0A').replace('\r', '%0D')
+
+
+def decode_path(path):
+    """Decode a percent-encoded path from a BagIt manifest"""
+    return path.replace('%0D', '\r').replace('%0A', '\n').replace('%25', '%')
+
+
+def write_manifest(digest_dict, out_path, algorithm, prefix=''):
+    """
+    Purpose:
+      Write BagIt-style manifest (manifest-<algorithm>.txt) with one
+      "<checksum>  <path>" line per file
+
+    :param digest_dict: dict mapping relative path to dict of checksums
+    :param out_path: Folder for the manifest (e.g., UAL_RDM)
+    :param algorithm: hashlib algorithm name
+    :param prefix: Folder prepended to paths (e.g., ORIGINAL_DATA)
+
+    :return filename: Full filename of manifest
+    """
+
+    filename = join(out_path, f"manifest-{algorithm}.txt")
+    with open(filename, 'w') as f:
+        for rel_path in sorted(digest_dict):
+            f.write(f"{digest_dict[rel_path][algorithm]}  " +
+                    f"{encode_path(join(prefix, rel_path))}\n")
+    chmod(filename, 0o777)
+
+    return filename
+
+
+def read_manifest(filename):
+    """
+    Purpose:
+      Read BagIt-style manifest
+
+    :param filename: Full filename of manifest
+
+    :return: dict mapping path to checksum
+    """
+
+    manifest_dict = dict()
+    with open(filename, 'r') as f:
+        for line in f:
+            if line.strip():
+                checksum, path = line.rstrip('\n').split(maxsplit=1)
+                manifest_dict[decode_path(path)] = checksum
+
+    return manifest_dict
+
+
+class FixityClass:
+    """
+    Purpose:
+      Generate fixity manifests for deposits on the curation server. The
+      files in ORIGINAL_DATA are hashed with all algorithms in one read
+      pass, and manifests are written to UAL_RDM. Files of a stage are
+      hashed by a single process pool so that many reads are in flight
+
+    :param curation_dict: Dict that contains curation configuration
+    :param algorithms: list of hashlib algorithm names. Default: md5, sha256
+    :param n_processes: Number of processes. Default: number of CPUs
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    Methods
+    -------
+    manifest(depositor_name, stage)
+      Hash ORIGINAL_DATA of a deposit and write manifests to UAL_RDM
+
+    main(stage)
+      Write manifests for all deposits in a stage
+    """
+
+    def __init__(self, curation_dict=config_default_dict['curation'],
+                 algorithms=default_algorithms, n_processes=None, log=None):
+
+        if isinstance(log, type(None)):
+            self.log = log_stdout()
+        else:
+            self.log = log
+
+        self.mc = MoveClass(curation_dict=curation_dict, log=self.log)
+        self.root_directory_main = self.mc.root_directory_main
+
+        self.folder_data = curation_dict['folder_data']
+        self.folder_ual_rdm = curation_dict['folder_ual_rdm']
+
+        self.algorithms = algorithms
+        self.n_processes = n_processes
+        self.executor = None
+
+    def manifest(self, depositor_name, stage=None):
+        """
+        Purpose:
+          Hash ORIGINAL_DATA of a deposit and write manifests to UAL_RDM
+
+        :param depositor_name: Exact name of the data curation folder with spaces
+        :param stage: str containing stage name. Default: current stage of deposit
+
+        :return digest_dict: dict mapping path (relative to ORIGINAL_DATA) to
+                dict of checksums
+        """
+
+        if stage is None:
+            stage = self.mc.get_source_stage(depositor_name)
+
+        folder_path = join(self.root_directory_main, stage, depositor_name)
+        data_path = join(folder_path, self.folder_data)
+        out_path = join(folder_path, self.folder_ual_rdm)
+
+        with self.mc.lock(depositor_name, shared=True, operation='fixity'):
+            self.log.info(f"Computing checksums : {data_path}")
+            digest_dict = hash_tree(data_path, algorithms=self.algorithms,
+                                    executor=self.executor, n_processes=self.n_processes)
+
+            if not exists(out_path):
+                makedirs(out_path)
+                chmod(out_path, 0o777)
+            for algorithm in self.algorithms:
+                filename = write_manifest(digest_dict, out_path, algorithm,
+                                          prefix=self.folder_data)
+                self.log.info(f"Writing manifest : {filename}")
+
+        return digest_dict
+
+    def main(self, stage):
+        """
+        Purpose:
+          Write manifests for all deposits in a stage
+
+        :param stage: str containing stage name
+
+        :return n_files: Number of files hashed
+        """
+
+        n_files = 0
+        with ProcessPoolExecutor(max_workers=self.n_processes) as self.executor:
+            for depositor_name in self.mc.list_stage(stage):
+                n_files += len(self.manifest(depositor_name, stage=stage))
+        self.executor = None
+
+        return n_files
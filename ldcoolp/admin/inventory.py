@@ -0,0 +1,196 @@
+from os.path import join, exists
+from os import scandir, stat, chmod, replace, getpid
+import json
+from time import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# Logging
+from ..logger import log_stdout
+
+from .move import MoveClass
+
+# Read in default configuration settings
+from ..config import config_default_dict
+
+
+def scan_folder(path):
+    """
+    Purpose:
+      Total the files directly in [path] with a single os.scandir pass
+
+    :param path: Full path of folder
+
+    :return folder_dict: dict with 'size' (bytes), 'usage' (allocated bytes),
+            'n_files', 'newest' (latest file mtime) and 'subdirs' (list of names)
+    """
+
+    folder_dict = {'size': 0, 'usage': 0, 'n_files': 0, 'newest': 0, 'subdirs': []}
+
+    with scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                folder_dict['subdirs'].append(entry.name)
+            elif entry.is_file(follow_symlinks=False):
+                entry_stat = entry.stat(follow_symlinks=False)
+                folder_dict['size'] += entry_stat.st_size
+                folder_dict['usage'] += entry_stat.st_blocks * 512
+                folder_dict['n_files'] += 1
+                folder_dict['newest'] = max(folder_dict['newest'], entry_stat.st_mtime)
+
+    return folder_dict
+
+
+class InventoryClass:
+    """
+    Purpose:
+      Storage inventory of the curation server. Deposits in each curation
+      stage are totalled in parallel. Per-folder totals are cached with
+      the folder mtime, so re-runs only re-list folders whose entries
+      changed. Files modified in place without a change to their folder
+      are not detected until the folder changes
+
+    :param curation_dict: Dict that contains curation configuration
+    :param n_threads: Number of deposits to scan in parallel. Default: 8
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    Methods
+    -------
+    scan_deposit(stage, depositor_name)
+      Return totals for a deposit
+
+    main()
+      Return pandas DataFrame with size, file count and age for each deposit
+    """
+
+    def __init__(self, curation_dict=config_default_dict['curation'], n_threads=8, log=None):
+
+        if isinstance(log, type(None)):
+            self.log = log_stdout()
+        else:
+            self.log = log
+
+        self.mc = MoveClass(curation_dict=curation_dict, log=self.log)
+        self.root_directory_main = self.mc.root_directory_main
+        self.stage_list = self.mc.stage_list + [self.mc.rejected_folder]
+
+        self.n_threads = n_threads
+
+        self.cache_file = join(self.root_directory_main, curation_dict['inventory_file'])
+        self.cache = dict()
+        self.seen = set()
+        self.n_scanned = 0
+
+    def load(self):
+        """Read per-folder cache from JSON file"""
+
+        if not exists(self.cache_file):
+            return
+
+        try:
+            with open(self.cache_file, 'r') as f:
+                self.cache = json.load(f)
+        except (OSError, ValueError):
+            self.log.debug(f"Unable to read inventory cache: {self.cache_file}")
+
+    def save(self):
+        """Write per-folder cache for folders seen in this run to JSON file"""
+
+        self.cache = {key: value for key, value in self.cache.items() if key in self.seen}
+
+        temp_filename = f"{self.cache_file}.{getpid()}.tmp"
+        try:
+            with open(temp_filename, 'w') as f:
+                json.dump(self.cache, f)
+            chmod(temp_filename, 0o666)
+            replace(temp_filename, self.cache_file)  # atomic
+        except OSError:
+            self.log.debug(f"Unable to write inventory cache: {self.cache_file}")
+
+    def scan_deposit(self, stage, depositor_name):
+        """
+        Purpose:
+          Return totals for a deposit. Folders with an unchanged mtime use
+          cached totals and only need a stat
+
+        :param stage: str containing stage name
+        :param depositor_name: Exact name of the data curation folder with spaces
+
+        :return deposit_dict: dict with 'size', 'usage', 'n_files' and 'newest'
+        """
+
+        deposit_dict = {'size': 0, 'usage': 0, 'n_files': 0, 'newest': 0}
+
+        stack = [join(stage, depositor_name)]
+        while stack:
+            rel_dir = stack.pop()
+            path = join(self.root_directory_main, rel_dir)
+
+            try:
+                mtime = stat(path).st_mtime
+            except FileNotFoundError:
+                continue
+
+            folder_dict = self.cache.get(rel_dir)
+            if not folder_dict or folder_dict['mtime'] != mtime:
+                folder_dict = {**scan_folder(path), 'mtime': mtime}
+                self.cache[rel_dir] = folder_dict
+                self.n_scanned += 1
+            self.seen.add(rel_dir)
+
+            for key in ['size', 'usage', 'n_files']:
+                deposit_dict[key] += folder_dict[key]
+            deposit_dict['newest'] = max(deposit_dict['newest'], folder_dict['newest'])
+
+            stack.extend([join(rel_dir, subdir) for subdir in folder_dict['subdirs']])
+
+        return deposit_dict
+
+    def main(self):
+        """
+        Purpose:
+          Return pandas DataFrame with stage, depositor_name, size, usage,
+          n_files, modified (latest file modification) and age_days for
+          each deposit
+        """
+
+        self.load()
+        self.seen = set()
+        self.n_scanned = 0
+
+        deposit_list = [(stage, depositor_name) for stage in self.stage_list
+                        for depositor_name in self.mc.list_stage(stage)]
+        self.log.info(f"Scanning {len(deposit_list)} deposits ...")
+
+        with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+            totals = list(executor.map(lambda item: self.scan_deposit(*item), deposit_list))
+
+        self.save()
+        self.log.info(f"Listed {self.n_scanned} of {len(self.seen)} folders " +
+                      "(others unchanged since last run)")
+
+        now = time()
+        row_list = []
+        for (stage, depositor_name), deposit_dict in zip(deposit_list, totals):
+            newest = deposit_dict['newest'] or None
+            row_list.append({
+                'stage': stage,
+                'depositor_name': depositor_name,
+                'size': deposit_dict['size'],
+                'usage': deposit_dict['usage'],
+                'n_files': deposit_dict['n_files'],
+                'modified': pd.to_datetime(newest, unit='s') if newest else pd.NaT,
+                'age_days': int((now - newest) // 86400) if newest else None,
+            })
+
+        return pd.DataFrame(row_list, columns=['stage', 'depositor_name', 'size', 'usage',
+                                               'n_files', 'modified', 'age_days'])
+
+
+def summarize(inventory_df):
+    """Return pandas DataFrame with totals for each curation stage"""
+
+    return inventory_df.groupby('stage', sort=False).agg(
+        deposits=('depositor_name', 'count'), size=('size', 'sum'),
+        usage=('usage', 'sum'), n_files=('n_files', 'sum'))
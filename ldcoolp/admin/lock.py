@@ -0,0 +1,256 @@
+"""
+Per-deposit advisory locks so that multiple curators and batch workers can
+safely work on different deposits of the same curation server at once
+"""
+
+from os.path import join, exists
+from os import makedirs, chmod, fchmod, getpid, kill, ftruncate, lseek, write, \
+    read, close, SEEK_SET, O_RDWR, O_CREAT
+from os import open as os_open
+import json
+import socket
+import getpass
+from datetime import datetime
+from threading import RLock, get_ident
+from time import monotonic, sleep
+
+try:
+    import fcntl
+except ImportError:  # Non-POSIX systems
+    fcntl = None
+
+# Logging
+from ..logger import log_stdout
+
+# Locks held by threads of this process: (lock filename, thread) -> {'fd', 'modes'}.
+# Each thread uses its own file descriptor, so flock also excludes other threads
+_held = dict()
+_held_lock = RLock()
+
+
+def get_lock_filename(lock_directory, depositor_name):
+    """Return lock filename for a deposit (e.g., "Name_12345678/v2" -> Name_12345678.v2.lock)"""
+
+    return join(lock_directory, depositor_name.replace('/', '.') + '.lock')
+
+
+def get_lock_root(curation_dict):
+    """Return curation root directory for lock files (local_path or remote_path
+    by source). Unlike parent_dir, it is not redirected to scratch_path"""
+
+    return curation_dict[f"{curation_dict['source']}_path"]
+
+
+def pid_exists(pid):
+    """Return True if a process with [pid] runs on this host"""
+
+    try:
+        kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class DepositLock:
+    """
+    Purpose:
+      Advisory lock for a single deposit using fcntl.flock on a lock file
+      in the [lock_folder] of the curation root directory. Exclusive locks
+      are used for operations that change a deposit (set-up, README
+      generation, moves) and shared locks for read-only operations.
+
+      Locks are reentrant within a thread, so a move requested during
+      the workflow re-uses the workflow's lock. The lock is released by
+      the kernel if the process dies. The holder (user, host, pid,
+      operation) is recorded in the lock file, which is used to report
+      who holds a lock and to flag stale holders
+
+    :param root_directory_main: Full path of curation parent/root directory
+    :param depositor_name: Exact name of the data curation folder with spaces
+    :param shared: bool for a shared (read-only) lock. Default: False (exclusive)
+    :param timeout: Seconds to wait for the lock. None waits indefinitely,
+           0 does not wait. Default: None
+    :param operation: str describing the operation holding the lock
+    :param lock_folder: Folder for lock files in root_directory_main. Default: .locks
+    :param poll_interval: Seconds between attempts to acquire the lock. Default: 1
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    Methods
+    -------
+    acquire()
+      Acquire the lock. Raises TimeoutError if it cannot be acquired in time
+
+    release()
+      Release the lock
+
+    holder()
+      Return dict of the recorded holder of the lock
+    """
+
+    def __init__(self, root_directory_main, depositor_name, shared=False, timeout=None,
+                 operation='', lock_folder='.locks', poll_interval=1.0, log=None):
+
+        if isinstance(log, type(None)):
+            self.log = log_stdout()
+        else:
+            self.log = log
+
+        self.depositor_name = depositor_name
+        self.shared = shared
+        self.timeout = timeout
+        self.operation = operation
+        self.poll_interval = poll_interval
+
+        self.lock_directory = join(root_directory_main, lock_folder)
+        self.filename = get_lock_filename(self.lock_directory, depositor_name)
+
+        self.acquired = False
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def open(self):
+        """Open (and create) lock file. Return file descriptor"""
+
+        if not exists(self.lock_directory):
+            makedirs(self.lock_directory, exist_ok=True)
+            chmod(self.lock_directory, 0o777)
+
+        fd = os_open(self.filename, O_RDWR | O_CREAT, 0o666)
+        try:
+            fchmod(fd, 0o666)
+        except PermissionError:  # Lock file created by another user
+            pass
+        return fd
+
+    def flock(self, fd, shared):
+        """Wait for flock on [fd] up to timeout. Return True if acquired"""
+
+        operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+
+        t_start = monotonic()
+        warned = False
+        while True:
+            try:
+                fcntl.flock(fd, operation | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                pass
+
+            if self.timeout is not None and monotonic() - t_start >= self.timeout:
+                return False
+
+            if not warned:
+                self.log.info(f"Waiting for lock on {self.depositor_name} : {self.describe()}")
+                warned = True
+            sleep(self.poll_interval)
+
+    def write_holder(self, fd):
+        """Record this process as holder of the lock"""
+
+        holder_dict = {
+            'user': getpass.getuser(),
+            'hostname': socket.gethostname(),
+            'pid': getpid(),
+            'operation': self.operation,
+            'timestamp': datetime.now().isoformat(),
+        }
+        ftruncate(fd, 0)
+        lseek(fd, 0, SEEK_SET)
+        write(fd, json.dumps(holder_dict).encode())
+
+    def holder(self):
+        """Return dict of the recorded holder of the lock. Empty dict if unknown"""
+
+        try:
+            fd = os_open(self.filename, O_RDWR)
+        except OSError:
+            return dict()
+
+        try:
+            return json.loads(read(fd, 4096).decode() or '{}')
+        except ValueError:
+            return dict()
+        finally:
+            close(fd)
+
+    def describe(self):
+        """Return str describing the recorded holder of the lock"""
+
+        holder_dict = self.holder()
+        if not holder_dict:
+            return "held by unknown process"
+
+        message = f"held by {holder_dict['user']} on {holder_dict['hostname']} " + \
+                  f"(pid {holder_dict['pid']}, {holder_dict['operation']}) " + \
+                  f"since {holder_dict['timestamp']}"
+        if holder_dict['hostname'] == socket.gethostname() and \
+                not pid_exists(holder_dict['pid']):
+            message += " [STALE: process no longer exists]"
+        return message
+
+    def acquire(self):
+        """Acquire the lock. Raises TimeoutError if it cannot be acquired in time"""
+
+        if fcntl is None:  # Non-POSIX systems: locking is not available
+            return
+
+        self.key = (self.filename, get_ident())
+        with _held_lock:
+            entry = _held.get(self.key)
+
+        # Wait outside of _held_lock so other deposits and threads are not blocked
+        if entry is None:
+            fd = self.open()
+            if not self.flock(fd, self.shared):
+                message = f"Unable to lock {self.depositor_name} : {self.describe()}"
+                close(fd)
+                raise TimeoutError(message)
+
+            entry = {'fd': fd, 'modes': []}
+            with _held_lock:
+                _held[self.key] = entry
+        elif not self.shared and 'exclusive' not in entry['modes']:
+            # Upgrade shared lock held by this thread. flock may drop the
+            # shared lock during the upgrade, so it is restored on failure
+            if not self.flock(entry['fd'], False):
+                message = f"Unable to lock {self.depositor_name} : {self.describe()}"
+                fcntl.flock(entry['fd'], fcntl.LOCK_SH)
+                raise TimeoutError(message)
+
+        if not self.shared and 'exclusive' not in entry['modes']:
+            self.write_holder(entry['fd'])
+
+        entry['modes'].append('shared' if self.shared else 'exclusive')
+        self.acquired = True
+
+        self.log.debug(f"Acquired {'shared' if self.shared else 'exclusive'} lock " +
+                       f"for {self.depositor_name}")
+
+    def release(self):
+        """Release the lock"""
+
+        if not self.acquired:
+            return
+
+        entry = _held[self.key]
+        entry['modes'].remove('shared' if self.shared else 'exclusive')
+
+        if not entry['modes']:
+            fcntl.flock(entry['fd'], fcntl.LOCK_UN)
+            close(entry['fd'])
+            with _held_lock:
+                del _held[self.key]
+        elif 'exclusive' not in entry['modes'] and not self.shared:
+            # Downgrade to shared lock held by this thread
+            fcntl.flock(entry['fd'], fcntl.LOCK_SH)
+
+        self.acquired = False
+
+        self.log.debug(f"Released lock for {self.depositor_name}")
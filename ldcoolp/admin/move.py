@@ -1,11 +1,17 @@
-from os.path import join, dirname, exists
-from os import makedirs, chmod, listdir, rmdir
+from os.path import join, dirname, basename, exists, isdir
+from os import makedirs, chmod, listdir, rmdir, rename, stat
 import shutil
-from glob import glob
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
 
 # Logging
 from ..logger import log_stdout
 
+from .catalog import CatalogClass, get_version
+from .copy import move_tree
+from .lock import DepositLock
+from .archive import archive_deposit
+
 # Read in default configuration settings
 from ..config import config_default_dict
 
@@ -46,6 +52,24 @@ class MoveClass:
                            self.reviewed_folder,
                            self.published_folder]
 
+        # Catalog of deposits and their curation stage
+        self.catalog = CatalogClass(self.root_directory_main,
+                                    filename=join(self.root_directory_main,
+                                                  curation_dict['catalog_file']),
+                                    lock_folder=curation_dict['folder_locks'], log=self.log)
+
+        self.lock_folder = curation_dict['folder_locks']
+
+        # Folder for archives of published deposits. Empty to disable
+        self.archive_path = curation_dict['archive_path']
+
+    def lock(self, depositor_name, shared=False, timeout=None, operation='move'):
+        """Return DepositLock for a deposit. See admin.lock"""
+
+        return DepositLock(self.root_directory_main, depositor_name, shared=shared,
+                           timeout=timeout, operation=operation,
+                           lock_folder=self.lock_folder, log=self.log)
+
     def get_source_stage(self, depositor_name, verbose=True):
         """
         Purpose:
@@ -58,7 +82,19 @@ class MoveClass:
         :return source_stage: str containing source stage name
         """
 
-        source_path = glob(join(self.root_directory_main, '?.*', depositor_name))
+        stage_list = self.stage_list + [self.rejected_folder]
+
+        # Use catalog if its entry is still valid and the deposit is in no
+        # other stage (e.g., after an interrupted move)
+        source_stage = self.catalog.lookup(depositor_name)
+        if source_stage and \
+                not any([exists(join(self.root_directory_main, stage, depositor_name)) for
+                         stage in stage_list if stage != source_stage]):
+            return source_stage
+
+        source_path = [join(self.root_directory_main, stage, depositor_name) for
+                       stage in stage_list if
+                       exists(join(self.root_directory_main, stage, depositor_name))]
         if len(source_path) == 0:
             err = f"Unable to find source_path for {depositor_name}"
             if verbose:
@@ -71,9 +107,47 @@ class MoveClass:
             raise ValueError(err)
         if len(source_path) == 1:
             source_stage = source_path[0].replace(join(self.root_directory_main, ''), '').split('/')[0]
+            self.catalog.update(depositor_name, source_stage)
 
             return source_stage
 
+    def list_stage(self, stage):
+        """
+        Purpose:
+          Retrieve all deposits in a curation stage
+
+        :param stage: folder name either folder_todo, folder_underreview,
+                      folder_reviewed, folder_published, or folder_rejected
+
+        :return: sorted list of data curation folders (e.g., "Name_12345678/v2")
+        """
+
+        return self.catalog.list_stage(stage)
+
+    def get_previous_versions(self, depositor_name):
+        """
+        Purpose:
+          Retrieve earlier versions of a deposit that are on the curation server
+          from the catalog of curation stages
+
+        :param depositor_name: Exact name of the data curation folder with spaces
+               (includes the version folder, e.g., "Name_12345678/v2")
+
+        :return version_paths: list containing full paths of earlier version
+                folders. The most recent version is first
+        """
+
+        current_version = get_version(depositor_name)
+
+        version_dict = self.catalog.list_versions(dirname(depositor_name),
+                                                  self.stage_list + [self.rejected_folder])
+        version_list = sorted([name for name in version_dict if
+                               get_version(name) != current_version],
+                              key=get_version, reverse=True)
+
+        return [join(self.root_directory_main, version_dict[name], name) for
+                name in version_list]
+
     def main(self, depositor_name, source_stage, dest_stage):
         """
         Purpose:
@@ -90,17 +164,38 @@ class MoveClass:
         source_path = join(self.root_directory_main, source_stage, depositor_name)
         # Strip out version folder convention for proper move with shutil.move
         dest_path = dirname(join(self.root_directory_main, dest_stage, depositor_name))
+        # Source folder set aside by move_tree before it is removed
+        trash_path = join(dirname(source_path), f".{basename(source_path)}.moved")
 
         # Move folder
-        if exists(source_path):
-            self.log.info(f"Moving: {depositor_name} from {source_stage} to ...")
-            self.log.info(f" ... {dest_stage} on {self.root_directory_main}")
-            if not exists(dest_path):
-                self.log.info(f"Path does not exist! {dest_path}")
-                self.log.info("Creating...")
-                makedirs(dest_path)
-                chmod(dest_path, 0o777)
-            shutil.move(source_path, dest_path)
+        with self.lock(depositor_name):
+            if exists(source_path):
+                self.log.info(f"Moving: {depositor_name} from {source_stage} to ...")
+                self.log.info(f" ... {dest_stage} on {self.root_directory_main}")
+                if not exists(dest_path):
+                    self.log.info(f"Path does not exist! {dest_path}")
+                    self.log.info("Creating...")
+                    makedirs(dest_path)
+                    chmod(dest_path, 0o777)
+                if stat(source_path).st_dev == stat(dest_path).st_dev:
+                    shutil.move(source_path, dest_path)
+                else:
+                    # Different volumes: parallel copy with verification. Resumes
+                    # from a partial folder or a destination left by an earlier move
+                    move_tree(source_path, join(dest_path, basename(source_path)),
+                              log=self.log)
+            elif exists(trash_path) and exists(join(dest_path, basename(source_path))):
+                # Interrupted after the destination was in place and before the
+                # source was removed
+                self.log.info(f"Resuming move: {depositor_name} from {source_stage} " +
+                              f"to {dest_stage}")
+                move_tree(source_path, join(dest_path, basename(source_path)),
+                          log=self.log)
+            else:
+                self.log.info(f"WARNING: Unable to find source_path for {depositor_name}")
+                return
+
+            self.catalog.update(depositor_name, dest_stage)
 
             # Remove source_path parent folder if empty
             parent_dir = dirname(source_path)
@@ -110,8 +205,6 @@ class MoveClass:
                 rmdir(parent_dir)
             else:
                 self.log.debug(f"Non-empty directory. Unable to remove : {parent_dir}")
-        else:
-            self.log.info(f"WARNING: Unable to find source_path for {depositor_name}")
 
     def move_to_next(self, depositor_name, verbose=True):
         """
@@ -174,20 +267,58 @@ class MoveClass:
         :param verbose: bool that warns source_path does not exist.  Default: True
         """
 
+        moved = False
         try:
             # Get current path
             source_stage = self.get_source_stage(depositor_name, verbose=verbose)
 
             if source_stage == self.published_folder:
                 self.log.warn(f"Already in {source_stage} !!!")
+            elif not self.check_archive_path():
+                self.log.warn(f"Not moving {depositor_name} to {self.published_folder}")
             else:
                 # Get destination path
                 dest_stage = self.published_folder
 
                 # Move folder
                 self.main(depositor_name, source_stage, dest_stage)
+                moved = exists(join(self.root_directory_main, dest_stage, depositor_name))
         except FileNotFoundError:
             self.log.warn(f"Unable to find source_path for {depositor_name}")
+            return
+
+        # Package published deposit for archiving. Errors do not undo the move
+        if self.archive_path and moved:
+            self.archive(depositor_name)
+
+    def check_archive_path(self):
+        """Return False if archive_path is set but does not exist"""
+
+        if self.archive_path and not isdir(self.archive_path):
+            self.log.warn(f"Archive folder not found : {self.archive_path}")
+            return False
+
+        return True
+
+    def archive(self, depositor_name):
+        """
+        Purpose:
+          Package a published deposit as a tar.gz archive with parallel block
+          compression and an index of member offsets in archive_path
+
+        :param depositor_name: Exact name of the data curation folder with spaces
+
+        :return filename: Full filename of archive. None if it exists or failed
+        """
+
+        folder_path = join(self.root_directory_main, self.published_folder, depositor_name)
+        try:
+            with self.lock(depositor_name, shared=True, operation='archive'):
+                return archive_deposit(folder_path, self.archive_path, depositor_name,
+                                       log=self.log)
+        except (OSError, tarfile.TarError) as err:
+            self.log.warn(f"Unable to archive {depositor_name} : {err}")
+            return None
 
     def reject(self, depositor_name, verbose=True):
         """
@@ -206,3 +337,180 @@ class MoveClass:
             self.main(depositor_name, source_stage, self.rejected_folder)
         except FileNotFoundError:
             self.log.warn(f"Unable to find source_path for {depositor_name}")
+
+    def get_dest_stage(self, source_stage, target):
+        """
+        Purpose:
+          Determine destination stage for a move
+
+        :param source_stage: Current stage folder name
+        :param target: Either 'next', 'back', 'publish', 'reject' or a stage folder name
+
+        :return dest_stage: str containing destination stage name
+        :raises ValueError: If the move is not possible
+        """
+
+        if target == 'next':
+            if source_stage not in self.stage_list[:-1]:
+                raise ValueError(f"Cannot moved to next stage! Currently in {source_stage}")
+            return self.stage_list[self.stage_list.index(source_stage) + 1]
+
+        if target == 'back':
+            if source_stage not in self.stage_list[1:]:
+                raise ValueError(f"Cannot moved to previous stage! Currently in {source_stage}")
+            return self.stage_list[self.stage_list.index(source_stage) - 1]
+
+        if target == 'publish':
+            dest_stage = self.published_folder
+        elif target == 'reject':
+            dest_stage = self.rejected_folder
+        elif target in self.stage_list + [self.rejected_folder]:
+            dest_stage = target
+        else:
+            raise ValueError(f"Unknown target: {target}")
+
+        if source_stage == dest_stage:
+            raise ValueError(f"Already in {source_stage} !!!")
+
+        return dest_stage
+
+    def batch_move(self, move_list, n_threads=4):
+        """
+        Purpose:
+          Move multiple deposits between curation stages in a single call.
+          All moves are planned first. Moves within the same filesystem are
+          performed as renames, and moves across filesystems are performed
+          in parallel with main()
+
+        :param move_list: list of (depositor_name, target) tuples, where target is
+               either 'next', 'back', 'publish', 'reject' or a stage folder name
+        :param n_threads: Number of parallel cross-device moves. Default: 4
+
+        :return result_list: list of dict for each item with 'depositor_name',
+                'source_stage', 'dest_stage', 'status' (moved, skipped or failed)
+                and 'message'. Deposits locked by another process and
+                repeated entries are skipped.
+                Deposits moved to the published stage are archived if
+                archive_path is set
+        """
+
+        result_list = []
+        rename_list = []
+        copy_list = []
+
+        # Plan moves
+        device_dict = dict()
+        planned = set()
+        for depositor_name, target in move_list:
+            result = {'depositor_name': depositor_name, 'source_stage': None,
+                      'dest_stage': None, 'status': 'skipped', 'message': ''}
+            result_list.append(result)
+
+            # A deposit is moved once per call
+            if depositor_name in planned:
+                result['message'] = "Duplicate entry"
+                self.log.warn(f"{depositor_name}: {result['message']}")
+                continue
+            planned.add(depositor_name)
+
+            try:
+                result['source_stage'] = self.get_source_stage(depositor_name, verbose=False)
+                result['dest_stage'] = self.get_dest_stage(result['source_stage'], target)
+            except (FileNotFoundError, ValueError) as err:
+                result['message'] = str(err)
+                self.log.warn(f"{depositor_name}: {err}")
+                continue
+
+            if result['dest_stage'] == self.published_folder and not self.check_archive_path():
+                result['status'] = 'failed'
+                result['message'] = f"Archive folder not found: {self.archive_path}"
+                continue
+
+            for stage in [result['source_stage'], result['dest_stage']]:
+                if stage not in device_dict:
+                    stage_path = join(self.root_directory_main, stage)
+                    if not exists(stage_path):
+                        makedirs(stage_path)
+                        chmod(stage_path, 0o777)
+                    device_dict[stage] = stat(stage_path).st_dev
+
+            same_device = device_dict[result['source_stage']] == device_dict[result['dest_stage']]
+
+            # Across filesystems, move_tree resumes a move interrupted after
+            # the destination was put in place
+            dest_path = join(self.root_directory_main, result['dest_stage'], depositor_name)
+            if exists(dest_path) and same_device:
+                result['status'] = 'failed'
+                result['message'] = f"Destination exists: {dest_path}"
+                self.log.warn(result['message'])
+                continue
+
+            if same_device:
+                rename_list.append(result)
+            else:
+                copy_list.append(result)
+
+        self.log.info(f"Planned moves: {len(rename_list)} renames, " +
+                      f"{len(copy_list)} cross-device moves")
+
+        # Same filesystem: rename
+        stage_dict = dict()
+        for result in rename_list:
+            depositor_name = result['depositor_name']
+            source_path = join(self.root_directory_main, result['source_stage'], depositor_name)
+            dest_path = join(self.root_directory_main, result['dest_stage'], depositor_name)
+            try:
+                with self.lock(depositor_name, timeout=0):
+                    if not exists(dirname(dest_path)):
+                        makedirs(dirname(dest_path))
+                        chmod(dirname(dest_path), 0o777)
+                    rename(source_path, dest_path)
+            except TimeoutError as err:
+                result['message'] = str(err)
+                self.log.warn(result['message'])
+                continue
+            except OSError as err:
+                result['status'] = 'failed'
+                result['message'] = str(err)
+                self.log.warn(f"{depositor_name}: {err}")
+                continue
+
+            self.log.info(f"Moved: {depositor_name} from {result['source_stage']} " +
+                          f"to {result['dest_stage']}")
+            result['status'] = 'moved'
+            stage_dict[depositor_name] = result['dest_stage']
+
+            # Remove source_path parent folder if empty
+            try:
+                rmdir(dirname(source_path))
+            except OSError:
+                pass
+
+        if stage_dict:
+            self.catalog.update_many(stage_dict)
+
+        # Across filesystems: copy and delete in parallel
+        def cross_device_move(result):
+            try:
+                with self.lock(result['depositor_name'], timeout=0):
+                    self.main(result['depositor_name'], result['source_stage'],
+                              result['dest_stage'])
+                result['status'] = 'moved'
+            except TimeoutError as err:
+                result['message'] = str(err)
+                self.log.warn(result['message'])
+            except (OSError, shutil.Error) as err:
+                result['status'] = 'failed'
+                result['message'] = str(err)
+                self.log.warn(f"{result['depositor_name']}: {err}")
+
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            list(executor.map(cross_device_move, copy_list))
+
+        # Package published deposits for archiving
+        if self.archive_path:
+            for result in result_list:
+                if result['status'] == 'moved' and result['dest_stage'] == self.published_folder:
+                    self.archive(result['depositor_name'])
+
+        return result_list
@@ -1,6 +1,4 @@
-from os.path import join, isdir, isfile
-
-from os import chown, walk
+from .permissions import apply
 
 
 def curation(path, user):
@@ -11,16 +9,10 @@ def curation(path, user):
 
     :param path: Parent location path
     :param user: The user name or UID (this will probably need to change)
+
+    :return: Number of entries changed
     """
 
     group = 0  # Placeholder
 
-    if isdir(path) or isfile(path):
-        chown(path, user, group)
-
-    for dir_path, dir_names, files in walk(path):
-        for dir_name in dir_names:
-            chown(join(dir_path, dir_name), user, group)
-
-        for file in files:
-            chown(join(dir_path, file), user, group)
+    return apply(path, uid=user, gid=group)
@@ -4,8 +4,127 @@ curation backend support
 """
 
 from os.path import join, isdir, isfile
+from os import chmod, chown, stat, scandir, open as os_open, close, O_RDONLY
+import os
+import stat as st
+from concurrent.futures import ThreadPoolExecutor
 
-from os import chmod, walk
+O_DIRECTORY = getattr(os, 'O_DIRECTORY', 0)
+
+
+def apply_entry(name, entry_stat, mode=None, uid=-1, gid=-1, dir_fd=None):
+    """
+    Purpose:
+      Set mode and/or ownership of a single folder or file if it differs
+      from the target
+
+    :param name: Name of entry (relative to dir_fd if provided)
+    :param entry_stat: os.stat_result for entry
+    :param mode: Mode. Default: None (unchanged)
+    :param uid: User ID. Default: -1 (unchanged)
+    :param gid: Group ID. Default: -1 (unchanged)
+    :param dir_fd: File descriptor of parent folder. Default: None
+
+    :return: bool. True if entry was changed
+    """
+
+    changed = False
+
+    if mode is not None and st.S_IMODE(entry_stat.st_mode) != mode:
+        chmod(name, mode, dir_fd=dir_fd)
+        changed = True
+
+    if (uid != -1 and entry_stat.st_uid != uid) or \
+            (gid != -1 and entry_stat.st_gid != gid):
+        chown(name, uid, gid, dir_fd=dir_fd, follow_symlinks=False)
+        changed = True
+
+    return changed
+
+
+def apply_folder(dir_path, mode=None, uid=-1, gid=-1):
+    """
+    Purpose:
+      Set mode and/or ownership for the entries of a single folder using
+      os.scandir and the folder's file descriptor. Symbolic links are skipped
+
+    :return n_changed, subdirs: Number of entries changed and list of
+            sub-folder paths
+    """
+
+    n_changed = 0
+    subdirs = []
+
+    dir_fd = os_open(dir_path, O_RDONLY | O_DIRECTORY)
+    try:
+        with scandir(dir_fd) as it:
+            for entry in it:
+                if entry.is_symlink():
+                    continue
+                if apply_entry(entry.name, entry.stat(follow_symlinks=False),
+                               mode=mode, uid=uid, gid=gid, dir_fd=dir_fd):
+                    n_changed += 1
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(join(dir_path, entry.name))
+    finally:
+        close(dir_fd)
+
+    return n_changed, subdirs
+
+
+def apply_subtree(path, mode=None, uid=-1, gid=-1):
+    """
+    Purpose:
+      Set mode and/or ownership for all folders and files under [path]
+      (not including [path])
+
+    :return n_changed: Number of entries changed
+    """
+
+    n_changed = 0
+
+    stack = [path]
+    while stack:
+        folder_changed, subdirs = apply_folder(stack.pop(), mode=mode, uid=uid, gid=gid)
+        n_changed += folder_changed
+        stack.extend(subdirs)
+
+    return n_changed
+
+
+def apply(path, mode=None, uid=-1, gid=-1, n_threads=8):
+    """
+    Purpose:
+      Set mode and/or ownership for [path] and all folders and files under
+      it in a single pass. Entries that already have the target mode and
+      ownership are skipped, and sub-folders are processed in parallel
+
+    :param path: Parent location path
+    :param mode: Mode. Default: None (unchanged)
+    :param uid: User ID. Default: -1 (unchanged)
+    :param gid: Group ID. Default: -1 (unchanged)
+    :param n_threads: Number of sub-folders to process in parallel. Default: 8
+
+    :return n_changed: Number of entries changed
+    """
+
+    if not (isdir(path) or isfile(path)):
+        return 0
+
+    n_changed = int(apply_entry(path, stat(path), mode=mode, uid=uid, gid=gid))
+
+    if isfile(path):
+        return n_changed
+
+    folder_changed, subdirs = apply_folder(path, mode=mode, uid=uid, gid=gid)
+    n_changed += folder_changed
+
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        n_changed += sum(executor.map(lambda subdir: apply_subtree(subdir, mode=mode,
+                                                                   uid=uid, gid=gid),
+                                      subdirs))
+
+    return n_changed
 
 
 def curation(path, mode=0o777):
@@ -16,14 +135,8 @@ def curation(path, mode=0o777):
 
     :param path: Parent location path
     :param mode: Mode. Default is rwx with '0o777'
-    """
 
-    if isdir(path) or isfile(path):
-        chmod(path, mode)
-
-    for dir_path, dir_names, files in walk(path):
-        for dir_name in dir_names:
-            chmod(join(dir_path, dir_name), mode)
+    :return: Number of entries changed
+    """
 
-        for file in files:
-            chmod(join(dir_path, file), mode)
+    return apply(path, mode=mode)
@@ -0,0 +1,268 @@
+from os.path import join, exists, relpath, basename
+from os import walk, stat, makedirs, chmod, replace, getpid
+import json
+import tarfile
+import zipfile
+
+# Logging
+from ldcoolp.logger import log_stdout
+
+from .index import zip_format
+
+# File extensions of archives and compressed files
+archive_extensions = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz',
+                      '.txz', '.gz', '.bz2', '.xz', '.7z', '.rar')
+
+# Compressed tar archives must be decompressed to read their headers
+tar_compressed_extensions = ('.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+
+def is_archive_name(name):
+    """Return True if [name] has an archive or compressed file extension"""
+    return name.lower().endswith(archive_extensions)
+
+
+def archive_type(filename):
+    """
+    Purpose:
+      Identify archive type from the first bytes of a file. Zip-based
+      documents and packages (Office Open XML, OpenDocument, Java archive)
+      are not archives
+
+    :param filename: Full filename
+
+    :return: str. Either 'zip', 'tar', 'tar-compressed', 'compressed' or None
+    """
+
+    with open(filename, 'rb') as f:
+        header = f.read(512)
+
+    if header[:4] in [b'PK\x03\x04', b'PK\x05\x06']:
+        return 'zip' if zip_format(filename) == 'zip' else None
+    if header[257:262] == b'ustar':
+        return 'tar'
+    if header[:2] == b'\x1f\x8b' or header[:3] == b'BZh' or header[:6] == b'\xfd7zXZ\x00':
+        if filename.lower().endswith(tar_compressed_extensions):
+            return 'tar-compressed'
+        return 'compressed'
+    if header[:6] == b'7z\xbc\xaf\x27\x1c' or header[:4] == b'Rar!':
+        return 'compressed'
+
+    return None
+
+
+def list_zip(filename):
+    """List members of a zip archive by reading only its central directory"""
+
+    with zipfile.ZipFile(filename) as zf:
+        return [{'name': info.filename, 'size': info.file_size,
+                 'compressed_size': info.compress_size}
+                for info in zf.infolist() if not info.is_dir()]
+
+
+def list_tar(filename, stream=False):
+    """
+    List members of a tar archive from its headers. Data of uncompressed
+    tar archives is skipped with seeks. Compressed tar archives are read as
+    a stream ([stream]=True)
+    """
+
+    member_list = []
+    with tarfile.open(filename, mode='r|*' if stream else 'r:') as tar:
+        for tarinfo in tar:
+            if tarinfo.isreg():
+                member_list.append({'name': tarinfo.name, 'size': tarinfo.size,
+                                    'compressed_size': None})
+
+    return member_list
+
+
+def list_archive(filename, stream_compressed=False):
+    """
+    Purpose:
+      List the contents of an archive without extracting it
+
+    :param filename: Full filename of archive
+    :param stream_compressed: bool to list compressed tar archives, which
+           requires decompressing them in full. Default: False
+
+    :return archive_dict: dict with 'type', 'members' (list of dict with
+            'name', 'size', 'compressed_size' and 'nested'), 'n_files',
+            'total_size' and 'ratio' (compressed/uncompressed size)
+    """
+
+    a_type = archive_type(filename)
+
+    if a_type == 'zip':
+        member_list = list_zip(filename)
+    elif a_type == 'tar':
+        member_list = list_tar(filename)
+    elif a_type == 'tar-compressed' and stream_compressed:
+        member_list = list_tar(filename, stream=True)
+    else:
+        member_list = None
+
+    archive_dict = {'type': a_type, 'members': member_list, 'n_files': None,
+                    'total_size': None, 'ratio': None}
+
+    if member_list is not None:
+        for member in member_list:
+            member['nested'] = is_archive_name(member['name'])
+
+        total_size = sum([member['size'] for member in member_list])
+        archive_dict['n_files'] = len(member_list)
+        archive_dict['total_size'] = total_size
+        if total_size > 0:
+            archive_dict['ratio'] = round(stat(filename).st_size / total_size, 3)
+
+    return archive_dict
+
+
+class ArchiveInspector:
+    """
+    Purpose:
+      Inventory of archives (zip, tar) in ORIGINAL_DATA of a deposit without
+      extraction. Listings are cached in UAL_RDM keyed by each archive's size
+      and mtime, so unchanged archives are not read again. Compressed tar
+      archives are only listed if archive_list_compressed is set, as the
+      whole archive must be decompressed
+
+    :param folder_path: Full path of deposit folder (e.g., 1.ToDo/Name_12345678/v1)
+    :param curation_dict: Dict that contains curation configuration
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    Methods
+    -------
+    find_archives()
+      Return list of archives in ORIGINAL_DATA
+
+    main()
+      List all archives and write report to UAL_RDM
+    """
+
+    def __init__(self, folder_path, curation_dict, log=None):
+
+        if isinstance(log, type(None)):
+            self.log = log_stdout()
+        else:
+            self.log = log
+
+        self.data_path = join(folder_path, curation_dict['folder_data'])
+        self.out_path = join(folder_path, curation_dict['folder_ual_rdm'])
+        self.cache_file = join(self.out_path, '.archive_cache.json')
+        self.report_file = join(self.out_path, 'archive_contents.txt')
+
+        self.stream_compressed = curation_dict['archive_list_compressed']
+
+        self.cache = dict()
+
+    def find_archives(self):
+        """Return list of full paths of archives in ORIGINAL_DATA"""
+
+        archive_list = []
+        for dir_path, _, filenames in walk(self.data_path):
+            for filename in sorted(filenames):
+                full_path = join(dir_path, filename)
+                try:
+                    if archive_type(full_path):
+                        archive_list.append(full_path)
+                except OSError:
+                    continue
+
+        return archive_list
+
+    def load(self):
+        if exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r') as f:
+                    self.cache = json.load(f)
+            except (OSError, ValueError):
+                self.cache = dict()
+
+    def save(self):
+        temp_filename = f"{self.cache_file}.{getpid()}.tmp"
+        with open(temp_filename, 'w') as f:
+            json.dump(self.cache, f)
+        chmod(temp_filename, 0o666)
+        replace(temp_filename, self.cache_file)
+
+    def write_report(self, result_dict):
+        with open(self.report_file, 'w') as f:
+            f.write(f"Archives: {len(result_dict)}\n")
+            for path, archive_dict in result_dict.items():
+                f.write(f"\n{path} ({archive_dict['type']})\n")
+                if archive_dict['members'] is None:
+                    if archive_dict['type'] == 'tar-compressed':
+                        f.write("  Contents not listed (see archive_list_compressed)\n")
+                    else:
+                        f.write("  Contents not listed\n")
+                    continue
+                f.write(f"  Files: {archive_dict['n_files']}, " +
+                        f"uncompressed size: {archive_dict['total_size']} bytes, " +
+                        f"compression ratio: {archive_dict['ratio']}\n")
+                for member in archive_dict['members']:
+                    ratio = ''
+                    if member['compressed_size'] is not None and member['size'] > 0:
+                        ratio = f" ({member['compressed_size'] / member['size']:.3f})"
+                    nested = ' [NESTED ARCHIVE]' if member['nested'] else ''
+                    f.write(f"  {member['name']} : {member['size']} bytes{ratio}{nested}\n")
+        chmod(self.report_file, 0o777)
+
+    def main(self):
+        """
+        Purpose:
+          List all archives in ORIGINAL_DATA and write report to UAL_RDM
+
+        :return result_dict: dict mapping archive path (relative to
+                ORIGINAL_DATA) to dict from list_archive()
+        """
+
+        if not exists(self.out_path):
+            makedirs(self.out_path)
+            chmod(self.out_path, 0o777)
+
+        self.load()
+
+        result_dict = dict()
+        new_cache = dict()
+        for full_path in self.find_archives():
+            path = relpath(full_path, self.data_path)
+            file_stat = stat(full_path)
+            signature = [file_stat.st_size, file_stat.st_mtime_ns]
+
+            # Compressed tar archives skipped earlier are listed once enabled
+            entry = self.cache.get(path)
+            if entry and entry['signature'] == signature and \
+                    not (self.stream_compressed and entry['archive']['members'] is None and
+                         entry['archive']['type'] == 'tar-compressed'):
+                archive_dict = entry['archive']
+            else:
+                self.log.info(f"Listing archive : {basename(full_path)}")
+                try:
+                    archive_dict = list_archive(full_path,
+                                                stream_compressed=self.stream_compressed)
+                except (OSError, zipfile.BadZipFile, tarfile.TarError, EOFError) as err:
+                    self.log.warn(f"Unable to read archive {path} : {err}")
+                    archive_dict = {'type': 'unreadable', 'members': None, 'n_files': None,
+                                    'total_size': None, 'ratio': None}
+
+            new_cache[path] = {'signature': signature, 'archive': archive_dict}
+            result_dict[path] = archive_dict
+
+            nested = [member['name'] for member in archive_dict['members'] or []
+                      if member['nested']]
+            if nested:
+                self.log.warn(f"{path} contains {len(nested)} nested archives")
+
+        self.cache = new_cache
+        self.save()
+        self.write_report(result_dict)
+        self.log.info(f"Writing archive report : {self.report_file}")
+
+        return result_dict
+
+
+def inspect(folder_path, curation_dict, log=None):
+    """Inventory archives in ORIGINAL_DATA of a deposit. See ArchiveInspector"""
+
+    return ArchiveInspector(folder_path, curation_dict, log=log).main()
@@ -0,0 +1,171 @@
+from os.path import join, exists, relpath
+from os import scandir, makedirs, chmod
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Logging
+from ldcoolp.logger import log_stdout
+
+from ldcoolp.admin.fixity import file_digests
+
+# Bytes read from the start and end of a file for the partial hash
+sample_size = 64 * 1024
+
+
+def group_by_size(data_path):
+    """
+    Purpose:
+      Group files under [data_path] by size with a single os.scandir pass.
+      Hard links to the same file are counted once and empty files are ignored
+
+    :param data_path: Full path of folder (e.g., ORIGINAL_DATA)
+
+    :return size_dict: dict mapping size to list of full paths
+    """
+
+    size_dict = dict()
+    inodes = set()
+
+    stack = [data_path]
+    while stack:
+        with scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    entry_stat = entry.stat(follow_symlinks=False)
+                    key = (entry_stat.st_dev, entry_stat.st_ino)
+                    if entry_stat.st_size == 0 or key in inodes:
+                        continue
+                    inodes.add(key)
+                    size_dict.setdefault(entry_stat.st_size, []).append(entry.path)
+
+    return size_dict
+
+
+def partial_hash(filename, size, sample_size=sample_size):
+    """
+    Purpose:
+      Hash the first and last [sample_size] bytes of a file. Files of up to
+      twice [sample_size] are hashed entirely
+
+    :return: str containing hexadecimal checksum
+    """
+
+    hash_obj = hashlib.blake2b()
+    with open(filename, 'rb') as f:
+        if size <= 2 * sample_size:
+            hash_obj.update(f.read())
+        else:
+            hash_obj.update(f.read(sample_size))
+            f.seek(-sample_size, 2)
+            hash_obj.update(f.read(sample_size))
+
+    return hash_obj.hexdigest()
+
+
+def regroup(group_list, key_function, n_threads):
+    """Split each group by key_function (computed in parallel) and keep collisions"""
+
+    path_list = [(size, path) for size, paths in group_list for path in paths]
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        keys = list(executor.map(lambda item: key_function(*item), path_list))
+
+    key_dict = dict()
+    for (size, path), key in zip(path_list, keys):
+        key_dict.setdefault((size, key), []).append(path)
+
+    return [(size, paths) for (size, _), paths in key_dict.items() if len(paths) > 1]
+
+
+def find_duplicates(data_path, n_threads=8, log=None):
+    """
+    Purpose:
+      Find duplicate files under [data_path]. Files are grouped by size,
+      then by a partial hash of their start and end, and only the remaining
+      collisions are fully hashed
+
+    :param data_path: Full path of folder (e.g., ORIGINAL_DATA)
+    :param n_threads: Number of files hashed in parallel. Default: 8
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    :return duplicate_list: list of (size, list of relative paths) for each
+            set of identical files, largest first
+    """
+
+    if isinstance(log, type(None)):
+        log = log_stdout()
+
+    size_dict = group_by_size(data_path)
+    group_list = [(size, paths) for size, paths in size_dict.items() if len(paths) > 1]
+    log.info(f"Duplicate check : {sum([len(paths) for paths in size_dict.values()])} files, " +
+             f"{sum([len(paths) for _, paths in group_list])} with the same size")
+
+    group_list = regroup(group_list, lambda size, path: partial_hash(path, size), n_threads)
+
+    # Files up to 2 * sample_size were hashed entirely
+    full_list = [group for group in group_list if group[0] <= 2 * sample_size]
+    group_list = [group for group in group_list if group[0] > 2 * sample_size]
+    log.info(f"Duplicate check : {sum([len(paths) for _, paths in group_list])} " +
+             "files to fully hash")
+
+    full_list += regroup(group_list,
+                         lambda size, path: file_digests(path, algorithms=['sha256'])['sha256'],
+                         n_threads)
+
+    duplicate_list = [(size, sorted([relpath(path, data_path) for path in paths]))
+                      for size, paths in full_list]
+    duplicate_list.sort(key=lambda group: (-group[0], group[1]))
+
+    log.info(f"Duplicate check : {len(duplicate_list)} sets of duplicate files")
+
+    return duplicate_list
+
+
+def write_report(duplicate_list, out_path, filename='duplicate_files.txt'):
+    """
+    Purpose:
+      Write duplicate report to [out_path] (e.g., UAL_RDM)
+
+    :return: Full filename of report
+    """
+
+    if not exists(out_path):
+        makedirs(out_path)
+        chmod(out_path, 0o777)
+
+    report_file = join(out_path, filename)
+    with open(report_file, 'w') as f:
+        f.write(f"Duplicate files: {len(duplicate_list)} sets, " +
+                f"{sum([size * (len(paths) - 1) for size, paths in duplicate_list])} " +
+                "redundant bytes\n")
+        for ii, (size, paths) in enumerate(duplicate_list):
+            f.write(f"\nSet {ii + 1}: {len(paths)} copies of {size} bytes\n")
+            for path in paths:
+                f.write(f"  {path}\n")
+    chmod(report_file, 0o777)
+
+    return report_file
+
+
+def inspect(folder_path, curation_dict, log=None):
+    """
+    Purpose:
+      Find duplicate files in ORIGINAL_DATA of a deposit and write the
+      report to UAL_RDM
+
+    :param folder_path: Full path of deposit folder (e.g., 1.ToDo/Name_12345678/v1)
+    :param curation_dict: Dict that contains curation configuration
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    :return duplicate_list: See find_duplicates()
+    """
+
+    if isinstance(log, type(None)):
+        log = log_stdout()
+
+    duplicate_list = find_duplicates(join(folder_path, curation_dict['folder_data']), log=log)
+    report_file = write_report(duplicate_list, join(folder_path, curation_dict['folder_ual_rdm']))
+    log.info(f"Writing duplicate report : {report_file}")
+
+    return duplicate_list
@@ -0,0 +1,281 @@
+from os.path import join, exists, dirname, relpath
+from os import scandir, makedirs, chmod, replace, getpid
+import codecs
+import json
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# Logging
+from ldcoolp.logger import log_stdout
+
+# Number of bytes read to identify a file format
+header_size = 512
+
+# (offset, magic bytes, format) in order of precedence
+magic_list = [
+    (0, b'%PDF', 'PDF'),
+    (0, b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (0, b'\xff\xd8\xff', 'JPEG'),
+    (0, b'GIF87a', 'GIF'),
+    (0, b'GIF89a', 'GIF'),
+    (0, b'II*\x00', 'TIFF'),
+    (0, b'MM\x00*', 'TIFF'),
+    (0, b'\x89HDF\r\n\x1a\n', 'HDF5'),
+    (0, b'CDF\x01', 'NetCDF'),
+    (0, b'CDF\x02', 'NetCDF'),
+    (0, b'SIMPLE  =', 'FITS'),
+    (0, b'SQLite format 3\x00', 'SQLite'),
+    (0, b'PAR1', 'Parquet'),
+    (0, b'\x93NUMPY', 'NumPy'),
+    (0, b'MATLAB 5.0 MAT-file', 'MATLAB'),
+    (0, b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'MS-Office (legacy)'),
+    (0, b'\x1f\x8b', 'gzip'),
+    (0, b'BZh', 'bzip2'),
+    (0, b'\xfd7zXZ\x00', 'xz'),
+    (0, b"7z\xbc\xaf'\x1c", '7-Zip'),
+    (0, b'Rar!', 'RAR'),
+    (0, b'ID3', 'MP3'),
+    (0, b'fLaC', 'FLAC'),
+    (0, b'OggS', 'Ogg'),
+    (0, b'\x7fELF', 'ELF executable'),
+    (4, b'ftyp', 'MP4/QuickTime'),
+    (257, b'ustar', 'tar'),
+]
+
+
+def zip_format(filename):
+    """
+    Purpose:
+      Identify a zip-based format (Office Open XML, OpenDocument, Java
+      archive) from the member names in the central directory of a zip
+      file. Member data is not read
+
+    :param filename: Full filename
+
+    :return: str with format name. 'zip' for other or unreadable zip files
+    """
+
+    try:
+        with zipfile.ZipFile(filename) as zf:
+            name_set = set(zf.namelist())
+    except (zipfile.BadZipFile, OSError):
+        return 'zip'
+
+    if '[Content_Types].xml' in name_set:
+        return 'MS-Office (OOXML)'
+    if 'mimetype' in name_set:
+        return 'OpenDocument'
+    if 'META-INF/MANIFEST.MF' in name_set:
+        return 'Java archive'
+    return 'zip'
+
+
+def identify(filename):
+    """
+    Purpose:
+      Identify file format from magic bytes. Zip-based formats (Office Open
+      XML, OpenDocument, Java archive) are recognized from the central
+      directory. Files without a known signature are classified as text
+      (UTF-8 without NUL bytes) or binary
+
+    :param filename: Full filename
+
+    :return: str with format name
+    """
+
+    with open(filename, 'rb') as f:
+        header = f.read(header_size)
+
+    if not header:
+        return 'empty'
+
+    if header[:4] in [b'PK\x03\x04', b'PK\x05\x06']:
+        return zip_format(filename)
+
+    if header[:4] == b'RIFF':
+        return {b'WAVE': 'WAV', b'AVI ': 'AVI', b'WEBP': 'WebP'}.get(header[8:12], 'RIFF')
+
+    for offset, magic, file_format in magic_list:
+        if header[offset:offset + len(magic)] == magic:
+            return file_format
+
+    if b'\x00' not in header:
+        try:
+            # Incremental decoder allows a character split at header_size
+            codecs.getincrementaldecoder('utf-8')().decode(header, final=False)
+            return 'text'
+        except UnicodeDecodeError:
+            pass
+
+    return 'binary'
+
+
+def scan_tree(path):
+    """
+    Purpose:
+      Retrieve (size, inode, mtime_ns) of all files under [path] with os.scandir
+
+    :return: dict mapping full path to [size, inode, mtime_ns]
+    """
+
+    file_dict = dict()
+
+    stack = [path]
+    while stack:
+        with scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    entry_stat = entry.stat(follow_symlinks=False)
+                    file_dict[entry.path] = [entry_stat.st_size, entry_stat.st_ino,
+                                             entry_stat.st_mtime_ns]
+
+    return file_dict
+
+
+class ContentIndex:
+    """
+    Purpose:
+      Content index of the DATA folder of a deposit for the curation report.
+      File formats are identified from magic bytes, and counts and sizes are
+      aggregated per format and per folder. Per-file results are cached in
+      UAL_RDM keyed by (inode, size, mtime), so re-indexing after curator
+      edits only reads changed files
+
+    :param folder_path: Full path of deposit folder (e.g., 1.ToDo/Name_12345678/v1)
+    :param curation_dict: Dict that contains curation configuration
+    :param n_threads: Number of folders and files read in parallel. Default: 8
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    Methods
+    -------
+    index()
+      Return pandas DataFrame with path, folder, size and format of each file
+
+    main()
+      Index DATA and write report to UAL_RDM
+    """
+
+    def __init__(self, folder_path, curation_dict, n_threads=8, log=None):
+
+        if isinstance(log, type(None)):
+            self.log = log_stdout()
+        else:
+            self.log = log
+
+        self.data_path = join(folder_path, curation_dict['folder_copy_data'])
+        self.out_path = join(folder_path, curation_dict['folder_ual_rdm'])
+        self.cache_file = join(self.out_path, '.content_index_cache.json')
+        self.report_file = join(self.out_path, 'content_index.txt')
+
+        self.n_threads = n_threads
+        self.cache = dict()
+        self.n_identified = 0
+
+    def load(self):
+        if exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r') as f:
+                    self.cache = json.load(f)
+            except (OSError, ValueError):
+                self.cache = dict()
+
+    def save(self):
+        if not exists(self.out_path):
+            makedirs(self.out_path)
+            chmod(self.out_path, 0o777)
+
+        temp_filename = f"{self.cache_file}.{getpid()}.tmp"
+        with open(temp_filename, 'w') as f:
+            json.dump(self.cache, f)
+        chmod(temp_filename, 0o666)
+        replace(temp_filename, self.cache_file)
+
+    def index(self):
+        """Return pandas DataFrame with path, folder, size and format of each file"""
+
+        self.load()
+
+        # Walk top-level folders in parallel
+        file_dict = dict()
+        top_dirs = []
+        with scandir(self.data_path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    top_dirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    entry_stat = entry.stat(follow_symlinks=False)
+                    file_dict[entry.path] = [entry_stat.st_size, entry_stat.st_ino,
+                                             entry_stat.st_mtime_ns]
+        with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+            for sub_dict in executor.map(scan_tree, top_dirs):
+                file_dict.update(sub_dict)
+
+        # Identify new and changed files in parallel
+        new_cache = dict()
+        identify_list = []
+        for full_path, signature in file_dict.items():
+            path = relpath(full_path, self.data_path)
+            entry = self.cache.get(path)
+            if entry and entry[:3] == signature:
+                new_cache[path] = entry
+            else:
+                identify_list.append((path, full_path, signature))
+
+        def identify_one(item):
+            try:
+                return identify(item[1])
+            except OSError:
+                return 'unreadable'
+
+        with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+            for (path, _, signature), file_format in zip(identify_list,
+                                                         executor.map(identify_one,
+                                                                      identify_list)):
+                new_cache[path] = signature + [file_format]
+
+        self.n_identified = len(identify_list)
+        self.cache = new_cache
+        self.save()
+        self.log.info(f"Indexed {len(new_cache)} files ({self.n_identified} new or changed)")
+
+        return pd.DataFrame([{'path': path, 'folder': dirname(path) or '.',
+                              'size': entry[0], 'format': entry[3]}
+                             for path, entry in sorted(new_cache.items())],
+                            columns=['path', 'folder', 'size', 'format'])
+
+    def main(self):
+        """
+        Purpose:
+          Index DATA and write per-format and per-folder counts and sizes
+          to UAL_RDM
+
+        :return format_df, folder_df: pandas DataFrames aggregated by format and folder
+        """
+
+        index_df = self.index()
+
+        format_df = index_df.groupby('format').agg(
+            n_files=('path', 'count'), size=('size', 'sum')).sort_values('size', ascending=False)
+        folder_df = index_df.groupby(['folder', 'format']).agg(
+            n_files=('path', 'count'), size=('size', 'sum'))
+
+        with open(self.report_file, 'w') as f:
+            f.write(f"Files: {len(index_df)}, total size: {index_df['size'].sum()} bytes\n\n")
+            f.write("By format:\n")
+            f.write(format_df.to_markdown() + "\n\n")
+            f.write("By folder:\n")
+            f.write(folder_df.to_markdown() + "\n")
+        chmod(self.report_file, 0o777)
+        self.log.info(f"Writing content index : {self.report_file}")
+
+        return format_df, folder_df
+
+
+def inspect(folder_path, curation_dict, log=None):
+    """Index contents of DATA of a deposit. See ContentIndex"""
+
+    return ContentIndex(folder_path, curation_dict, log=log).main()
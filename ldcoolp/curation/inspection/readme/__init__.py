@@ -1,5 +1,5 @@
 from os.path import exists, join, dirname, basename
-from os import walk, stat
+from os import walk, stat, chmod
 from datetime import datetime
 import shutil
 from glob import glob
@@ -11,7 +11,8 @@ from html2text import html2text
 # Logging
 from ldcoolp.logger import log_stdout
 
-from ....admin import permissions, move
+from ....admin import move
+from ....admin.lock import DepositLock, get_lock_root
 
 # Read in default configuration settings
 from ....config import config_default_dict
@@ -97,6 +98,9 @@ class ReadmeClass:
 
         curation_dict = self.config_dict['curation']
         self.root_directory_main = curation_dict[curation_dict['parent_dir']]
+        # Lock on the curation server during set-up on a local scratch disk
+        self.lock_root = get_lock_root(curation_dict)
+        self.lock_folder = curation_dict['folder_locks']
         if not update:
             # Use 1.ToDo
             self.root_directory = join(self.root_directory_main, curation_dict['folder_todo'])
@@ -140,6 +144,12 @@ class ReadmeClass:
             self.template_source = 'unknown'
             self.log.warn("More than one README files found!")
 
+    def lock(self):
+        """Return exclusive DepositLock for the deposit. See admin.lock"""
+
+        return DepositLock(self.lock_root, self.folderName, operation='readme',
+                           lock_folder=self.lock_folder, log=self.log)
+
     def get_readme_files(self):
         """Return list of README files in the ORIGINAL_DATA path"""
         README_files = glob(join(self.original_data_path, 'README*.txt'))
@@ -275,55 +285,57 @@ class ReadmeClass:
     def construct(self):
         """Create README.txt file with jinja2 README template and populate with metadata information"""
 
-        if not exists(self.readme_file_path):
-            self.log.info(f"Constructing README.txt file based on {self.template_source} template ...")
+        with self.lock():
+            if not exists(self.readme_file_path):
+                self.log.info(f"Constructing README.txt file based on {self.template_source} template ...")
 
-            # Write file
-            self.log.info(f"Writing file : {self.readme_file_path}")
-            f = open(self.readme_file_path, 'w')
+                # Write file
+                self.log.info(f"Writing file : {self.readme_file_path}")
+                f = open(self.readme_file_path, 'w')
 
-            content_list = self.jinja_template.render(figshare_dict=self.figshare_readme_dict,
-                                                      qualtrics_dict=self.qualtrics_readme_dict)
-            f.writelines(content_list)
-            f.close()
-        else:
-            self.log.warn("Default README.txt file found! Not overwriting with template!")
+                content_list = self.jinja_template.render(figshare_dict=self.figshare_readme_dict,
+                                                          qualtrics_dict=self.qualtrics_readme_dict)
+                f.writelines(content_list)
+                f.close()
+            else:
+                self.log.warn("Default README.txt file found! Not overwriting with template!")
 
-        # Set permission for rwx
-        permissions.curation(self.readme_file_path)
+            # Set permission for rwx
+            chmod(self.readme_file_path, 0o777)
 
     def update(self):
         """Update README.txt file for changes in figshare or Qualtrics dictionary"""
 
-        # Retrieve new README.txt file first
-        content_list = self.jinja_template.render(figshare_dict=self.figshare_readme_dict,
-                                                  qualtrics_dict=self.qualtrics_readme_dict)
-        if exists(self.readme_file_path):
-            f = open(self.readme_file_path, 'r')
-            readme_old = ''.join(f.readlines())
+        with self.lock():
+            # Retrieve new README.txt file first
+            content_list = self.jinja_template.render(figshare_dict=self.figshare_readme_dict,
+                                                      qualtrics_dict=self.qualtrics_readme_dict)
+            if exists(self.readme_file_path):
+                f = open(self.readme_file_path, 'r')
+                readme_old = ''.join(f.readlines())
 
-            if content_list == readme_old:
-                self.log.warn("README.txt did not change")
-                self.log.info("Not replacing file")
+                if content_list == readme_old:
+                    self.log.warn("README.txt did not change")
+                    self.log.info("Not replacing file")
+                else:
+                    self.log.info("README.txt changed. Updating!")
+                    st = stat(self.readme_file_path)
+                    mod_time_str = datetime.fromtimestamp(st.st_mtime).strftime('%Y-%m-%d_%H:%M:%S')
+                    backup_copy_filename = self.readme_file_path.replace('.txt', f'_{mod_time_str}.txt')
+                    self.log.info(f"Saving previous copy as : {basename(backup_copy_filename)}")
+                    shutil.copyfile(self.readme_file_path, backup_copy_filename)
+
+                    self.log.info(f"Writing updated README.txt file : {self.readme_file_path}")
+                    f = open(self.readme_file_path, 'w')
+                    f.writelines(content_list)
+                    f.close()
             else:
-                self.log.info("README.txt changed. Updating!")
-                st = stat(self.readme_file_path)
-                mod_time_str = datetime.fromtimestamp(st.st_mtime).strftime('%Y-%m-%d_%H:%M:%S')
-                backup_copy_filename = self.readme_file_path.replace('.txt', f'_{mod_time_str}.txt')
-                self.log.info(f"Saving previous copy as : {basename(backup_copy_filename)}")
-                shutil.copyfile(self.readme_file_path, backup_copy_filename)
-
-                self.log.info(f"Writing updated README.txt file : {self.readme_file_path}")
+                self.log.info("README.txt does not exist. Creating new one")
+
+                self.log.info(f"Writing README.txt file : {self.readme_file_path}")
                 f = open(self.readme_file_path, 'w')
                 f.writelines(content_list)
                 f.close()
-        else:
-            self.log.info("README.txt does not exist. Creating new one")
-
-            self.log.info(f"Writing README.txt file : {self.readme_file_path}")
-            f = open(self.readme_file_path, 'w')
-            f.writelines(content_list)
-            f.close()
 
     def main(self):
         """Main function for README file construction"""
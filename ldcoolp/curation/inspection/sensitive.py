@@ -0,0 +1,243 @@
+from os.path import join, exists, relpath
+from os import walk, makedirs, chmod
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+# Logging
+from ldcoolp.logger import log_stdout
+
+# Patterns of sensitive data. Matches must start and end at token boundaries.
+# Payment card numbers must have a known issuer prefix (IIN) and length
+# (Visa, Mastercard, Discover: 16 digits, American Express: 15 digits) with
+# consistent separators, and pass the Luhn checksum
+pattern_dict = {
+    'email': rb'[\w.%+-]{1,64}@[A-Za-z0-9-]{1,63}(?:\.[A-Za-z0-9-]{1,63}){0,4}\.[A-Za-z]{2,24}',
+    'ssn': rb'(?!000|666|9\d\d)\d{3}-(?!00)\d{2}-(?!0000)\d{4}',
+    'credit_card': rb'(?:4\d{3}|5[1-5]\d\d|2(?:2[2-9]\d|[3-6]\d\d|7[01]\d|720)'
+                   rb'|6(?:011|5\d\d|4[4-9]\d))'
+                   rb'(?P<sep>[ -]?)\d{4}(?P=sep)\d{4}(?P=sep)\d{4}'
+                   rb'|3[47]\d\d(?P<sep_amex>[ -]?)\d{6}(?P=sep_amex)\d{5}',
+    'phone': rb'(?:\+?1[ .-]?)?(?:\(\d{3}\) ?|\d{3}[ .-])\d{3}[ .-]\d{4}'
+             rb'|\+\d{1,3}[ .-]\d{1,4}(?:[ .-]\d{2,4}){2,3}',
+}
+
+# Bytes read at a time, and bytes kept between chunks so that matches
+# straddling a chunk boundary are found. overlap must exceed the longest
+# match: an email of at most 64 + 1 + 63 + 4 * 64 + 1 + 24 = 409 bytes
+chunk_size = 1024 ** 2  # 1 MB
+overlap = 512
+
+# Maximum number of findings listed per file
+max_findings = 100
+
+
+def compile_patterns(pattern_dict=pattern_dict):
+    """
+    Compile all patterns into a single regex with one named group per
+    pattern. A single token boundary check precedes all patterns, so the
+    patterns are only tried at the start of tokens
+    """
+
+    return re.compile(rb'(?<![\w.%+-])(?:' +
+                      b'|'.join([b'(?P<%s>%s)' % (name.encode(), pattern)
+                                 for name, pattern in pattern_dict.items()]) +
+                      rb')(?![\w-]|\.\d)')
+
+
+combined_re = compile_patterns()
+
+
+def luhn(digits):
+    """Return True if [digits] passes the Luhn checksum of payment card numbers"""
+
+    total = 0
+    for ii, digit in enumerate(reversed(digits)):
+        value = int(digit)
+        if ii % 2 == 1:
+            value = value * 2 - 9 if value > 4 else value * 2
+        total += value
+
+    return total % 10 == 0
+
+
+def mask(value):
+    """Mask all but the first and last two characters of a finding"""
+
+    if len(value) <= 6:
+        return '*' * len(value)
+    return value[:2] + '*' * (len(value) - 4) + value[-2:]
+
+
+def is_binary(filename, n_bytes=8192):
+    """Return True if the start of a file contains NUL bytes"""
+
+    with open(filename, 'rb') as f:
+        return b'\x00' in f.read(n_bytes)
+
+
+def scan_file(filename, regex=combined_re, chunk_size=chunk_size):
+    """
+    Purpose:
+      Scan a text file for sensitive data in fixed-size chunks with a single
+      combined regex. The end of each chunk is kept and scanned again with
+      the next chunk, so a match straddling a boundary is found once
+
+    :param filename: Full filename
+    :param regex: Compiled regex with one named group per pattern
+    :param chunk_size: Bytes read at a time. Default: 1 MB
+
+    :return result_dict: dict with 'filename', 'skipped', 'counts' (dict of
+            pattern name and number of matches) and 'findings' (list of
+            dict with 'type', 'line', 'offset' and masked 'value')
+    """
+
+    if is_binary(filename):
+        return {'filename': filename, 'skipped': 'binary', 'counts': {}, 'findings': []}
+
+    counts = dict()
+    findings = []
+
+    buffer = b''
+    offset = 0  # File offset of buffer[0]
+    start = 0  # Position in buffer from which matches are new
+    line_no, line_pos = 1, 0  # Line number at file offset line_pos
+
+    with open(filename, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            final = not chunk
+            buffer += chunk
+
+            # Matches starting at or after cut are scanned again with the next chunk
+            cut = len(buffer) if final else max(len(buffer) - overlap, start)
+
+            for match in regex.finditer(buffer, start):
+                if match.start() >= cut:
+                    break
+                start = match.end()
+
+                name = match.lastgroup
+                value = match.group()
+                if name == 'credit_card' and \
+                        not luhn(re.sub(rb'[ -]', b'', value).decode()):
+                    continue
+
+                counts[name] = counts.get(name, 0) + 1
+                if len(findings) < max_findings:
+                    line_no += buffer.count(b'\n', line_pos - offset, match.start())
+                    line_pos = offset + match.start()
+                    findings.append({'type': name, 'line': line_no,
+                                     'offset': offset + match.start(),
+                                     'value': mask(value.decode('utf-8', errors='replace'))})
+
+            if final:
+                break
+
+            # Keep a little context before cut for lookbehinds
+            line_no += buffer.count(b'\n', line_pos - offset, cut)
+            line_pos = offset + cut
+            keep = max(cut - 64, 0)
+            start = max(start, cut) - keep
+            buffer = buffer[keep:]
+            offset += keep
+
+    return {'filename': filename, 'skipped': None, 'counts': counts, 'findings': findings}
+
+
+def _scan_file(filename):
+    """Wrapper of scan_file for process pool. Unreadable files are reported"""
+
+    try:
+        return scan_file(filename)
+    except OSError as err:
+        return {'filename': filename, 'skipped': f"unreadable ({err})", 'counts': {},
+                'findings': []}
+
+
+def scan(data_path, n_processes=None, log=None):
+    """
+    Purpose:
+      Scan all files under [data_path] for sensitive data with a process pool
+
+    :param data_path: Full path of folder (e.g., ORIGINAL_DATA)
+    :param n_processes: Number of processes. Default: number of CPUs
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    :return result_list: list of dict from scan_file() with 'path' relative to [data_path]
+    """
+
+    if isinstance(log, type(None)):
+        log = log_stdout()
+
+    file_list = []
+    for dir_path, _, filenames in walk(data_path):
+        file_list += [join(dir_path, filename) for filename in sorted(filenames)]
+    log.info(f"Scanning {len(file_list)} files for sensitive data ...")
+
+    with ProcessPoolExecutor(max_workers=n_processes) as executor:
+        result_list = list(executor.map(_scan_file, file_list, chunksize=8))
+
+    for result_dict in result_list:
+        result_dict['path'] = relpath(result_dict['filename'], data_path)
+
+    flagged = [result_dict for result_dict in result_list if result_dict['counts']]
+    if flagged:
+        log.warn(f"Sensitive data scan : {len(flagged)} of {len(result_list)} " +
+                 "files with possible sensitive data")
+    else:
+        log.info("Sensitive data scan : no findings")
+
+    return result_list
+
+
+def write_report(result_list, out_path, filename='sensitive_data.txt'):
+    """Write findings to [out_path] (e.g., UAL_RDM). Return full filename"""
+
+    if not exists(out_path):
+        makedirs(out_path)
+        chmod(out_path, 0o777)
+
+    flagged = [result_dict for result_dict in result_list if result_dict['counts']]
+    skipped = [result_dict for result_dict in result_list if result_dict['skipped']]
+
+    report_file = join(out_path, filename)
+    with open(report_file, 'w') as f:
+        f.write(f"Files scanned: {len(result_list) - len(skipped)}, " +
+                f"skipped (binary or unreadable): {len(skipped)}, " +
+                f"with possible sensitive data: {len(flagged)}\n")
+        for result_dict in flagged:
+            counts = ', '.join([f"{name}: {count}" for name, count in
+                                sorted(result_dict['counts'].items())])
+            f.write(f"\n{result_dict['path']} ({counts})\n")
+            for finding in result_dict['findings']:
+                f.write(f"  Line {finding['line']} : {finding['type']} : {finding['value']}\n")
+            n_total = sum(result_dict['counts'].values())
+            if n_total > len(result_dict['findings']):
+                f.write(f"  ... {n_total - len(result_dict['findings'])} more\n")
+    chmod(report_file, 0o777)
+
+    return report_file
+
+
+def inspect(folder_path, curation_dict, log=None):
+    """
+    Purpose:
+      Scan ORIGINAL_DATA of a deposit for sensitive data (emails, phone
+      numbers, social security and payment card numbers) and write the
+      findings to UAL_RDM. Values are masked in the report
+
+    :param folder_path: Full path of deposit folder (e.g., 1.ToDo/Name_12345678/v1)
+    :param curation_dict: Dict that contains curation configuration
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    :return result_list: See scan()
+    """
+
+    if isinstance(log, type(None)):
+        log = log_stdout()
+
+    result_list = scan(join(folder_path, curation_dict['folder_data']), log=log)
+    report_file = write_report(result_list, join(folder_path, curation_dict['folder_ual_rdm']))
+    log.info(f"Writing sensitive data report : {report_file}")
+
+    return result_list
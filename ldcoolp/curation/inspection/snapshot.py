@@ -0,0 +1,300 @@
+from os.path import join, exists
+from os import scandir, makedirs, chmod, replace, getpid
+import hashlib
+import json
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+# Logging
+from ldcoolp.logger import log_stdout
+
+from ldcoolp.admin.fixity import file_digests
+
+
+def _sha256(filename):
+    """Return sha256 checksum of a file. Wrapper of file_digests for process pool"""
+    return file_digests(filename, algorithms=['sha256'])['sha256']
+
+
+def scan_tree(path, previous=None, hash_list=None):
+    """
+    Purpose:
+      Build the Merkle tree of [path] without directory hashes. Digests of
+      files with the same (size, inode, mtime) as in [previous] are reused,
+      and the remaining files are added to [hash_list]
+
+    :param path: Full path of folder
+    :param previous: Tree of [path] from an earlier snapshot. Default: None
+    :param hash_list: list of (node, full path) of files to hash
+
+    :return node: dict with 'children' mapping names to file nodes (with
+            'size', 'inode', 'mtime_ns', 'hash') and folder nodes
+    """
+
+    previous_children = previous['children'] if previous and 'children' in previous else {}
+    children = dict()
+
+    with scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                children[entry.name] = scan_tree(entry.path, previous_children.get(entry.name),
+                                                 hash_list)
+            elif entry.is_file(follow_symlinks=False):
+                entry_stat = entry.stat(follow_symlinks=False)
+                node = {'size': entry_stat.st_size, 'inode': entry_stat.st_ino,
+                        'mtime_ns': entry_stat.st_mtime_ns, 'hash': None}
+                old = previous_children.get(entry.name)
+                if old and 'children' not in old and \
+                        [old['size'], old['inode'], old['mtime_ns']] == \
+                        [node['size'], node['inode'], node['mtime_ns']]:
+                    node['hash'] = old['hash']
+                else:
+                    hash_list.append((node, entry.path))
+                children[entry.name] = node
+
+    return {'children': children, 'hash': None}
+
+
+def hash_folders(node):
+    """Compute folder hashes bottom-up from the sorted names and hashes of children"""
+
+    hash_obj = hashlib.sha256()
+    for name in sorted(node['children']):
+        child = node['children'][name]
+        if 'children' in child:
+            hash_folders(child)
+            kind = 'd'
+        else:
+            kind = 'f'
+        hash_obj.update(f"{kind}\0{name}\0{child['hash']}\n".encode('utf-8',
+                                                                  errors='surrogateescape'))
+    node['hash'] = hash_obj.hexdigest()
+
+    return node['hash']
+
+
+def build_tree(path, previous=None, n_processes=None):
+    """
+    Purpose:
+      Build the Merkle tree of [path]: a sha256 digest for each file and a
+      hash for each folder over its children. Files unchanged since
+      [previous] are not read again and the rest are hashed with a process pool
+
+    :param path: Full path of folder
+    :param previous: Tree of [path] from an earlier snapshot. Default: None
+    :param n_processes: Number of processes. Default: number of CPUs
+
+    :return node, n_hashed: Tree and number of files hashed
+    """
+
+    hash_list = []
+    node = scan_tree(path, previous, hash_list)
+
+    if len(hash_list) > 1:
+        with ProcessPoolExecutor(max_workers=n_processes) as executor:
+            digests = list(executor.map(_sha256, [full_path for _, full_path in hash_list]))
+    else:
+        digests = [_sha256(full_path) for _, full_path in hash_list]
+
+    for (file_node, _), digest in zip(hash_list, digests):
+        file_node['hash'] = digest
+
+    hash_folders(node)
+
+    return node, len(hash_list)
+
+
+def list_files(node, prefix=''):
+    """Return list of relative paths of all files in a tree"""
+
+    if 'children' not in node:
+        return [prefix]
+
+    file_list = []
+    for name in sorted(node['children']):
+        file_list += list_files(node['children'][name], join(prefix, name) if prefix else name)
+
+    return file_list
+
+
+def diff_tree(old, new, prefix=''):
+    """
+    Purpose:
+      Compare two trees. Only folders whose hashes differ are descended into
+
+    :param old: Tree, e.g., of ORIGINAL_DATA or of an earlier snapshot
+    :param new: Tree, e.g., of DATA
+
+    :return diff_dict: dict with 'added', 'removed' and 'modified' lists of
+            relative paths of files
+    """
+
+    diff_dict = {'added': [], 'removed': [], 'modified': []}
+
+    if old['hash'] == new['hash']:
+        return diff_dict
+
+    old_dir = 'children' in old
+    new_dir = 'children' in new
+    if not old_dir and not new_dir:
+        diff_dict['modified'].append(prefix)
+    elif old_dir and new_dir:
+        for name in sorted(set(old['children']) | set(new['children'])):
+            path = join(prefix, name) if prefix else name
+            if name not in new['children']:
+                diff_dict['removed'] += list_files(old['children'][name], path)
+            elif name not in old['children']:
+                diff_dict['added'] += list_files(new['children'][name], path)
+            else:
+                for key, value in diff_tree(old['children'][name], new['children'][name],
+                                            path).items():
+                    diff_dict[key] += value
+    else:
+        # Replaced a file with a folder or vice versa
+        diff_dict['removed'] += list_files(old, prefix)
+        diff_dict['added'] += list_files(new, prefix)
+
+    return diff_dict
+
+
+class SnapshotClass:
+    """
+    Purpose:
+      Merkle snapshots of the DATA and ORIGINAL_DATA folders of a deposit to
+      report curator edits. Snapshots are stored in UAL_RDM and reused, so
+      only new or changed files are hashed. Trees are compared from the top
+      and unchanged folders are skipped by their hashes
+
+    :param folder_path: Full path of deposit folder (e.g., 1.ToDo/Name_12345678/v1)
+    :param curation_dict: Dict that contains curation configuration
+    :param n_processes: Number of processes for hashing. Default: number of CPUs
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    Methods
+    -------
+    load(folder)
+      Load stored snapshot of a folder
+
+    save(folder, tree)
+      Store snapshot of a folder
+
+    snapshot(folder)
+      Build tree of a folder reusing digests of its stored snapshot
+
+    main()
+      Compare DATA with ORIGINAL_DATA and with the last DATA snapshot, and
+      write report to UAL_RDM
+    """
+
+    def __init__(self, folder_path, curation_dict, n_processes=None, log=None):
+
+        if isinstance(log, type(None)):
+            self.log = log_stdout()
+        else:
+            self.log = log
+
+        self.folder_path = folder_path
+        self.data_folder = curation_dict['folder_data']
+        self.copy_data_folder = curation_dict['folder_copy_data']
+        self.out_path = join(folder_path, curation_dict['folder_ual_rdm'])
+        self.report_file = join(self.out_path, 'snapshot_diff.txt')
+
+        self.n_processes = n_processes
+
+    def snapshot_file(self, folder):
+        return join(self.out_path, f".snapshot_{folder}.json")
+
+    def load(self, folder):
+        """Return stored snapshot (dict with 'created' and 'tree') of [folder]. None if absent"""
+
+        snapshot_file = self.snapshot_file(folder)
+        if exists(snapshot_file):
+            try:
+                with open(snapshot_file, 'r') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                self.log.warn(f"Unable to read snapshot : {snapshot_file}")
+
+        return None
+
+    def save(self, folder, tree):
+        if not exists(self.out_path):
+            makedirs(self.out_path)
+            chmod(self.out_path, 0o777)
+
+        snapshot_file = self.snapshot_file(folder)
+        temp_filename = f"{snapshot_file}.{getpid()}.tmp"
+        with open(temp_filename, 'w') as f:
+            json.dump({'created': datetime.now().isoformat(timespec='seconds'),
+                       'tree': tree}, f)
+        chmod(temp_filename, 0o666)
+        replace(temp_filename, snapshot_file)
+
+    def snapshot(self, folder):
+        """
+        Purpose:
+          Build tree of [folder] reusing digests of its stored snapshot
+
+        :return tree, previous: Tree and stored snapshot (None if absent)
+        """
+
+        previous = self.load(folder)
+        tree, n_hashed = build_tree(join(self.folder_path, folder),
+                                    previous['tree'] if previous else None,
+                                    n_processes=self.n_processes)
+        self.log.info(f"Snapshot of {folder} : {n_hashed} new or changed files hashed")
+
+        return tree, previous
+
+    def write_report(self, section_list):
+        with open(self.report_file, 'w') as f:
+            for title, diff_dict in section_list:
+                f.write(f"{title}\n")
+                if diff_dict is None:
+                    f.write("  No earlier snapshot\n\n")
+                    continue
+                if not any(diff_dict.values()):
+                    f.write("  No changes\n\n")
+                    continue
+                for key in ['added', 'removed', 'modified']:
+                    for path in diff_dict[key]:
+                        f.write(f"  {key.upper()}: {path}\n")
+                f.write("\n")
+        chmod(self.report_file, 0o777)
+
+    def main(self):
+        """
+        Purpose:
+          Snapshot DATA and ORIGINAL_DATA, compare DATA with ORIGINAL_DATA
+          and with the last DATA snapshot, and write report to UAL_RDM
+
+        :return original_diff, session_diff: dicts from diff_tree(). session_diff
+                is None without an earlier DATA snapshot
+        """
+
+        data_tree, _ = self.snapshot(self.data_folder)
+        copy_data_tree, previous = self.snapshot(self.copy_data_folder)
+
+        original_diff = diff_tree(data_tree, copy_data_tree)
+        session_diff = diff_tree(previous['tree'], copy_data_tree) if previous else None
+
+        self.save(self.data_folder, data_tree)
+        self.save(self.copy_data_folder, copy_data_tree)
+
+        session_title = f"Changes in {self.copy_data_folder} since last snapshot"
+        if previous:
+            session_title += f" ({previous['created']})"
+        self.write_report([
+            (f"Changes in {self.copy_data_folder} compared with {self.data_folder}",
+             original_diff),
+            (session_title, session_diff),
+        ])
+        self.log.info(f"Writing snapshot report : {self.report_file}")
+
+        return original_diff, session_diff
+
+
+def inspect(folder_path, curation_dict, log=None):
+    """Report curator edits in DATA of a deposit. See SnapshotClass"""
+
+    return SnapshotClass(folder_path, curation_dict, log=log).main()
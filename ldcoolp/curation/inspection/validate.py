@@ -0,0 +1,316 @@
+from os.path import join, exists, relpath
+from os import walk, makedirs, chmod
+import codecs
+import csv
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+# Logging
+from ldcoolp.logger import log_stdout
+
+# Files validated and their delimiters. None: detect from the first chunk
+extension_dict = {'.csv': ',', '.tsv': '\t', '.tab': '\t', '.psv': '|',
+                  '.txt': None, '.dat': None}
+
+# Bytes read at a time
+chunk_size = 1024 ** 2  # 1 MB
+
+# Maximum line length (characters). Longer lines are not held in memory and
+# the file is reported as invalid
+max_line_length = 16 * 1024 ** 2  # 16 MB
+
+# Maximum number of issues listed per file
+max_issues = 20
+
+line_ending_re = re.compile(r'\r\n|\r|\n')
+invalid_byte_re = re.compile('[\udc80-\udcff]')  # From surrogateescape decoding
+non_ascii_re = re.compile('[\x80-\udc7f\udd00-\U0010ffff]')
+
+
+def read_lines(filename, state, chunk_size=chunk_size, max_line_length=max_line_length):
+    """
+    Purpose:
+      Generator of lines (with line endings) of a file read in fixed-size
+      chunks. Encoding and line-ending statistics are collected in [state]
+
+    :param filename: Full filename
+    :param state: dict updated with 'bytes', 'invalid_bytes', 'first_invalid',
+           'non_ascii', 'line_endings' (Counter) and 'bom'
+    :param max_line_length: Maximum line length (characters)
+
+    :raises ValueError: If a line is longer than [max_line_length]
+    """
+
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='surrogateescape')
+    carry = ''
+
+    with open(filename, 'rb') as f:
+        first = True
+        while True:
+            chunk = f.read(chunk_size)
+            final = not chunk
+
+            if first:
+                state['bom'] = chunk.startswith(codecs.BOM_UTF8)
+                if state['bom']:
+                    chunk = chunk[len(codecs.BOM_UTF8):]
+                    state['bytes'] += len(codecs.BOM_UTF8)
+                first = False
+
+            text = decoder.decode(chunk, final=final)
+
+            invalid = invalid_byte_re.search(text)
+            if invalid:
+                n_invalid = len(invalid_byte_re.findall(text))
+                if not state['invalid_bytes']:
+                    state['first_invalid'] = state['bytes'] + len(
+                        text[:invalid.start()].encode('utf-8', errors='surrogateescape'))
+                state['invalid_bytes'] += n_invalid
+            if not state['non_ascii'] and non_ascii_re.search(text):
+                state['non_ascii'] = True
+            state['bytes'] += len(chunk)
+
+            text = carry + text
+            carry = ''
+
+            # A CR at the end of a chunk may be followed by LF in the next chunk
+            if text.endswith('\r') and not final:
+                carry = '\r'
+                text = text[:-1]
+
+            start = 0
+            for match in line_ending_re.finditer(text):
+                state['line_endings'][match.group()] += 1
+                yield text[start:match.end()]
+                start = match.end()
+            carry = text[start:] + carry
+            if len(carry) > max_line_length:
+                raise ValueError(f"Line {sum(state['line_endings'].values()) + 1} is longer " +
+                                 f"than {max_line_length} characters")
+
+            if final:
+                if carry:
+                    state['missing_final_newline'] = True
+                    yield carry
+                break
+
+
+def detect_delimiter(filename, n_bytes=64 * 1024, min_fraction=0.8):
+    """Detect delimiter from the start of a file. None if not delimited"""
+
+    with open(filename, 'rb') as f:
+        sample = f.read(n_bytes).decode('utf-8', errors='replace')
+
+    lines = [line for line in line_ending_re.split(sample)[:-1] if line.strip()][:50]
+    if len(lines) < 2:
+        return None
+
+    # Delimiter with the same (non-zero) count in most lines
+    best, best_fraction = None, min_fraction
+    for delimiter in [',', '\t', ';', '|']:
+        count, frequency = Counter([line.count(delimiter) for line in lines]).most_common(1)[0]
+        if count > 0 and frequency / len(lines) >= best_fraction:
+            best, best_fraction = delimiter, frequency / len(lines)
+
+    return best
+
+
+def validate_file(filename, delimiter=None, chunk_size=chunk_size,
+                  max_line_length=max_line_length):
+    """
+    Purpose:
+      Validate a text or tabular file read in fixed-size chunks. Checks
+      encoding (UTF-8, invalid or mixed bytes), line endings, malformed
+      (quoted) rows and column counts
+
+    :param filename: Full filename
+    :param delimiter: Column delimiter. Default: detect
+    :param chunk_size: Bytes read at a time. Default: 1 MB
+    :param max_line_length: Maximum line length (characters). Files with
+           longer lines are reported as invalid. Default: 16 MB
+
+    :return result_dict: dict with validation results and 'issues'
+    """
+
+    with open(filename, 'rb') as f:
+        if b'\x00' in f.read(8192):
+            return {'filename': filename, 'skipped': 'binary', 'issues': []}
+
+    if delimiter is None:
+        delimiter = detect_delimiter(filename)
+
+    state = {'bytes': 0, 'invalid_bytes': 0, 'first_invalid': None, 'non_ascii': False,
+             'line_endings': Counter(), 'bom': False, 'missing_final_newline': False}
+    issues = []
+    column_counts = Counter()
+    column_rows = dict()
+    n_rows = 0
+
+    lines = read_lines(filename, state, chunk_size=chunk_size,
+                       max_line_length=max_line_length)
+    try:
+        if delimiter:
+            reader = csv.reader(lines, delimiter=delimiter, strict=True)
+            while True:
+                try:
+                    row = next(reader)
+                except StopIteration:
+                    break
+                except csv.Error as err:
+                    if len(issues) < max_issues:
+                        issues.append(f"Line {reader.line_num}: malformed row ({err})")
+                    continue
+                if not row:
+                    continue  # Blank line
+                n_rows += 1
+                column_counts[len(row)] += 1
+                rows = column_rows.setdefault(len(row), [])
+                if len(rows) < max_issues:
+                    rows.append(reader.line_num)
+        else:
+            for _ in lines:
+                n_rows += 1
+    except ValueError as err:
+        return {'filename': filename, 'skipped': f"invalid ({err})",
+                'issues': [f"{err}. Not validated further"]}
+
+    result_dict = {
+        'filename': filename,
+        'skipped': None,
+        'bytes': state['bytes'],
+        'rows': n_rows,
+        'delimiter': delimiter,
+        'encoding': 'ascii',
+        'bom': state['bom'],
+        'line_endings': dict(state['line_endings']),
+        'columns': None,
+        'inconsistent_rows': 0,
+    }
+
+    if state['invalid_bytes']:
+        result_dict['encoding'] = 'mixed' if state['non_ascii'] else 'non-utf-8'
+        issues.append(f"{state['invalid_bytes']} bytes are not valid UTF-8 " +
+                      f"(first at byte {state['first_invalid']})")
+    elif state['non_ascii']:
+        result_dict['encoding'] = 'utf-8'
+
+    if len(state['line_endings']) > 1:
+        issues.append(f"Mixed line endings: {dict(state['line_endings'])}")
+    if state['missing_final_newline'] and state['line_endings']:
+        issues.append("No line ending at end of file")
+
+    if column_counts:
+        columns = column_counts.most_common(1)[0][0]
+        result_dict['columns'] = columns
+        result_dict['inconsistent_rows'] = n_rows - column_counts[columns]
+        for count in sorted(column_counts):
+            if count != columns:
+                issues.append(f"{column_counts[count]} rows with {count} columns " +
+                              f"(expected {columns}), e.g., lines {column_rows[count][:5]}")
+
+    result_dict['issues'] = issues[:max_issues]
+
+    return result_dict
+
+
+def _validate_file(args):
+    """Wrapper of validate_file for process pool. Unreadable files are reported"""
+
+    try:
+        return validate_file(*args)
+    except OSError as err:
+        return {'filename': args[0], 'skipped': f"unreadable ({err})", 'issues': []}
+
+
+def find_files(data_path):
+    """Return list of (full path, delimiter) of files to validate under [data_path]"""
+
+    file_list = []
+    for dir_path, _, filenames in walk(data_path):
+        for filename in sorted(filenames):
+            for extension, delimiter in extension_dict.items():
+                if filename.lower().endswith(extension):
+                    file_list.append((join(dir_path, filename), delimiter))
+                    break
+
+    return file_list
+
+
+def validate(data_path, n_processes=None, log=None):
+    """
+    Purpose:
+      Validate all text and tabular files under [data_path] with a process pool
+
+    :param data_path: Full path of folder (e.g., DATA)
+    :param n_processes: Number of processes. Default: number of CPUs
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    :return result_list: list of dict from validate_file()
+    """
+
+    if isinstance(log, type(None)):
+        log = log_stdout()
+
+    file_list = find_files(data_path)
+    log.info(f"Validating {len(file_list)} text and tabular files ...")
+
+    with ProcessPoolExecutor(max_workers=n_processes) as executor:
+        result_list = list(executor.map(_validate_file, file_list))
+
+    for result_dict in result_list:
+        result_dict['path'] = relpath(result_dict['filename'], data_path)
+
+    n_issues = len([result_dict for result_dict in result_list if result_dict['issues']])
+    log.info(f"Validation : {n_issues} of {len(result_list)} files with issues")
+
+    return result_list
+
+
+def write_report(result_list, out_path, filename='validation_report.txt'):
+    """Write validation report to [out_path] (e.g., UAL_RDM). Return full filename"""
+
+    if not exists(out_path):
+        makedirs(out_path)
+        chmod(out_path, 0o777)
+
+    report_file = join(out_path, filename)
+    with open(report_file, 'w') as f:
+        f.write(f"Files validated: {len(result_list)}\n")
+        for result_dict in result_list:
+            f.write(f"\n{result_dict['path']}\n")
+            if result_dict['skipped']:
+                f.write(f"  Skipped: {result_dict['skipped']}\n")
+                continue
+            delimiter = repr(result_dict['delimiter']) if result_dict['delimiter'] else 'none'
+            f.write(f"  Rows: {result_dict['rows']}, columns: {result_dict['columns']}, " +
+                    f"delimiter: {delimiter}, encoding: {result_dict['encoding']}, " +
+                    f"line endings: {result_dict['line_endings']}\n")
+            for issue in result_dict['issues']:
+                f.write(f"  ISSUE: {issue}\n")
+    chmod(report_file, 0o777)
+
+    return report_file
+
+
+def inspect(folder_path, curation_dict, log=None):
+    """
+    Purpose:
+      Validate text and tabular files in DATA of a deposit and write the
+      report to UAL_RDM
+
+    :param folder_path: Full path of deposit folder (e.g., 1.ToDo/Name_12345678/v1)
+    :param curation_dict: Dict that contains curation configuration
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    :return result_list: See validate()
+    """
+
+    if isinstance(log, type(None)):
+        log = log_stdout()
+
+    result_list = validate(join(folder_path, curation_dict['folder_copy_data']), log=log)
+    report_file = write_report(result_list, join(folder_path, curation_dict['folder_ual_rdm']))
+    log.info(f"Writing validation report : {report_file}")
+
+    return result_list
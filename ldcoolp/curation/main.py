@@ -1,17 +1,22 @@
-from os.path import join, exists
-from os import makedirs, chmod
+from os.path import join, exists, dirname, basename
+from os import makedirs, chmod, listdir, rmdir, rename
+import errno
+import shutil
 
 # Logging
 from ldcoolp.logger import log_stdout
 
 # Admin
-from ldcoolp.admin import move
+from ldcoolp.admin import move, permissions
+from ldcoolp.admin.copy import copy_tree, populate_tree, supports_reflink
 
 # Curation
-from ldcoolp.curation.retrieve import download_files
+from ldcoolp.curation.retrieve import download_files, check_disk_space
 from ldcoolp.curation.reports import review_report
 from ldcoolp.curation.depositor_name import DepositorName
 from ldcoolp.curation.inspection.readme import ReadmeClass
+from ldcoolp.curation.inspection import sensitive
+from ldcoolp.curation.staging import adopt
 
 # API
 from figshare.figshare import Figshare
@@ -46,9 +51,11 @@ class PrerequisiteWorkflow:
         self.mc = move.MoveClass(curation_dict=config_dict['curation'], log=self.log)
 
         self.root_directory = join(self.mc.root_directory_main, self.mc.todo_folder)
+        self.remote_directory = self.root_directory
 
         self.article_id = article_id
 
+        self.config_dict = config_dict
         self.curation_dict = config_dict['curation']
         self.figshare_dict = config_dict['figshare']
 
@@ -63,15 +70,73 @@ class PrerequisiteWorkflow:
                                         self.curation_dict['folder_copy_data'])
         self.url_open = url_open
 
-        # Check if dataset has been retrieved
+        # Hold the deposit lock through set-up. Released by workflow() or release()
+        self.lock = self.mc.lock(self.dn.folderName, operation='workflow')
+        self.lock.acquire()
+
+        # workflow() only releases the lock of a constructed object
         try:
-            source_stage = self.mc.get_source_stage(self.dn.folderName, verbose=False)
-            self.log.warn(f"Curation folder exists in {source_stage}. Will not retrieve!")
-            self.new_set = False
-        except FileNotFoundError:
-            self.new_set = True
-            # Create folders
-            self.make_folders()
+            # Check if dataset has been retrieved
+            try:
+                source_stage = self.mc.get_source_stage(self.dn.folderName, verbose=False)
+                self.log.warn(f"Curation folder exists in {source_stage}. Will not retrieve!")
+                self.new_set = False
+            except FileNotFoundError:
+                self.new_set = True
+                # Adopt data retrieved in advance with prefetch_data script
+                prefetched = adopt(self.dn.folderName, self.root_directory,
+                                   curation_dict=self.curation_dict, log=self.log)
+
+                # Set up on local scratch disk for a remote curation server
+                if self.curation_dict['source'] == 'remote' and \
+                        self.curation_dict['scratch_path'] and not prefetched:
+                    self.use_scratch()
+
+                # Create folders
+                self.make_folders()
+        except BaseException:
+            self.lock.release()
+            raise
+
+    def use_scratch(self):
+        """Perform set-up on local scratch disk. See transfer_scratch()"""
+
+        self.config_dict = {**self.config_dict,
+                            'curation': {**self.curation_dict, 'parent_dir': 'scratch_path'}}
+        self.curation_dict = self.config_dict['curation']
+
+        self.root_directory = join(self.curation_dict['scratch_path'], self.mc.todo_folder)
+        self.log.info(f"Using local scratch folder : {self.root_directory}")
+
+    def transfer_scratch(self):
+        """Transfer deposit set up on local scratch disk to the curation server"""
+
+        if self.root_directory == self.remote_directory:
+            return
+
+        scratch_path = join(self.root_directory, self.dn.folderName)
+        remote_path = join(self.remote_directory, self.dn.folderName)
+
+        # Copy to a hidden folder first so an interrupted transfer is not
+        # mistaken for a retrieved deposit
+        partial_path = join(dirname(remote_path), f".{basename(remote_path)}.partial")
+        if exists(partial_path):
+            permissions.curation(partial_path)
+            shutil.rmtree(partial_path)
+
+        makedirs(dirname(remote_path), exist_ok=True)
+        self.log.info(f"Transferring to curation server : {remote_path}")
+        # Contents are compared as the scratch copy is removed afterwards
+        n_files = copy_tree(scratch_path, partial_path, compare=True, log=self.log)
+        rename(partial_path, remote_path)
+        self.log.info(f"Transferred {n_files} files")
+
+        permissions.curation(scratch_path)
+        shutil.rmtree(scratch_path)
+        if len(listdir(dirname(scratch_path))) == 0:
+            rmdir(dirname(scratch_path))
+
+        self.root_directory = self.remote_directory
 
     def reserve_doi(self):
         # Mint DOI if this has not been done
@@ -95,10 +160,90 @@ class PrerequisiteWorkflow:
 
     def download_data(self):
         if self.new_set:
-            download_files(self.article_id, self.fs,
-                           root_directory=self.root_directory,
-                           data_directory=self.data_directory,
-                           log=self.log, url_open=self.url_open)
+            # Unchanged files from earlier versions are linked, not retrieved
+            previous_directories = [join(version_path, self.curation_dict['folder_data']) for
+                                    version_path in self.mc.get_previous_versions(self.dn.folderName)]
+
+            try:
+                # Retrieval to scratch only checks the scratch volume
+                if self.root_directory != self.remote_directory:
+                    self.preflight_remote()
+
+                download_files(self.article_id, self.fs,
+                               root_directory=self.root_directory,
+                               data_directory=self.data_directory,
+                               log=self.log, url_open=self.url_open,
+                               previous_directories=previous_directories,
+                               bundle_url=self.figshare_dict['bundle_url'],
+                               manifest_folder=self.curation_dict['folder_ual_rdm'])
+            except OSError as error:
+                # Insufficient disk space. Remove empty folders so that a later
+                # run does not consider the deposit retrieved
+                if error.errno == errno.ENOSPC:
+                    self.remove_folders()
+                raise
+
+    def preflight_remote(self):
+        """
+        Check that the curation server can hold a deposit set up on local
+        scratch disk. DATA is only populated with reflinks, which take no space
+
+        :raises OSError: errno.ENOSPC if there is insufficient space
+        """
+
+        required = sum([file_dict['size'] for file_dict in
+                        self.fs.list_files(self.article_id)])
+
+        self.log.info("Checking disk space on curation server ...")
+        check_disk_space(join(self.remote_directory, self.dn.folderName), required,
+                         log=self.log)
+
+    def populate_data(self):
+        """Populate DATA working copy from ORIGINAL_DATA where reflinks are supported"""
+
+        if self.new_set and self.curation_dict['populate_data']:
+            # Full copies would double the storage of every deposit
+            if not supports_reflink(self.root_directory):
+                self.log.info("Reflinks are not supported on the curation volume. " +
+                              "Not populating working copy")
+                return
+
+            self.log.info("Populating working copy from ORIGINAL_DATA ...")
+            populate_tree(join(self.root_directory, self.data_directory),
+                          join(self.root_directory, self.copy_data_directory),
+                          log=self.log)
+
+    def scan_sensitive(self):
+        """
+        Scan ORIGINAL_DATA of a new deposit for sensitive data, wherever it is
+        after the workflow. Findings are written to UAL_RDM. Deposits scanned
+        during prefetch are not scanned again
+        """
+
+        if not (self.new_set and self.curation_dict['scan_sensitive']):
+            return
+
+        with self.mc.lock(self.dn.folderName, shared=True, operation='inspect'):
+            stage = self.mc.get_source_stage(self.dn.folderName, verbose=False)
+            folder_path = join(self.mc.root_directory_main, stage, self.dn.folderName)
+
+            report_file = join(folder_path, self.curation_dict['folder_ual_rdm'],
+                               'sensitive_data.txt')
+            if exists(report_file):
+                self.log.info(f"Sensitive data report exists : {report_file}")
+                return
+
+            sensitive.inspect(folder_path, self.curation_dict, log=self.log)
+
+    def remove_folders(self):
+        # Remove empty folders created by make_folders
+        for folder in [join(self.root_directory, self.data_directory),
+                       join(self.root_directory, self.copy_data_directory),
+                       join(self.root_directory, self.dn.folderName),
+                       join(self.root_directory, dirname(self.dn.folderName))]:
+            if exists(folder) and len(listdir(folder)) == 0:
+                self.log.info(f"Removing empty folder : {folder}")
+                rmdir(folder)
 
     def download_report(self):
         if self.new_set:
@@ -108,6 +253,10 @@ class PrerequisiteWorkflow:
     def move_to_next(self):
         self.mc.move_to_next(self.dn.folderName)
 
+    def release(self):
+        """Release the deposit lock"""
+        self.lock.release()
+
 
 def workflow(article_id, url_open=False, browser=True, log=None,
              config_dict=config_default_dict):
@@ -135,31 +284,44 @@ def workflow(article_id, url_open=False, browser=True, log=None,
     pw = PrerequisiteWorkflow(article_id, url_open=url_open, log=log,
                               config_dict=config_dict)
 
-    # Perform prerequisite workflow if dataset is entirely new
-    if pw.new_set:
-        # Check if a DOI is reserved. If not, reserve DOI
-        pw.reserve_doi()
-
-        # Retrieve data and place in 1.ToDo curation folder
-        pw.download_data()
-
-        # Download curation report
-        pw.download_report()
-
-        # Download Qualtrics deposit agreement form
-        q = Qualtrics(qualtrics_dict=config_dict['qualtrics'], log=log)
-        q.retrieve_deposit_agreement(pw.dn.name_dict, browser=browser)
-
-        # Check for README file and create one if it does not exist
-        rc = ReadmeClass(pw.dn, log=log, config_dict=config_dict)
-        rc.main()
-
-        # Move to next curation stage, 2.UnderReview curation folder
-        if rc.template_source != 'unknown':
-            log.info("PROMPT: Do you wish to move deposit to the next curation stage?")
-            user_response = input("PROMPT: Type 'Yes'/'yes'. Anything else will skip : ")
-            log.info(f"RESPONSE: {user_response}")
-            if user_response.lower() == 'yes':
-                pw.move_to_next()
-            else:
-                print("Skipping move ...")
+    try:
+        # Perform prerequisite workflow if dataset is entirely new
+        if pw.new_set:
+            # Check if a DOI is reserved. If not, reserve DOI
+            pw.reserve_doi()
+
+            # Retrieve data and place in 1.ToDo curation folder
+            pw.download_data()
+
+            # Download curation report
+            pw.download_report()
+
+            # Download Qualtrics deposit agreement form
+            q = Qualtrics(qualtrics_dict=config_dict['qualtrics'], log=log)
+            q.retrieve_deposit_agreement(pw.dn.name_dict, browser=browser)
+
+            # Check for README file and create one if it does not exist
+            rc = ReadmeClass(pw.dn, log=log, config_dict=pw.config_dict)
+            rc.main()
+
+            # Transfer to curation server if set up on local scratch disk
+            pw.transfer_scratch()
+
+            # Populate DATA working copy on the curation server
+            pw.populate_data()
+
+            # Move to next curation stage, 2.UnderReview curation folder
+            if rc.template_source != 'unknown':
+                log.info("PROMPT: Do you wish to move deposit to the next curation stage?")
+                user_response = input("PROMPT: Type 'Yes'/'yes'. Anything else will skip : ")
+                log.info(f"RESPONSE: {user_response}")
+                if user_response.lower() == 'yes':
+                    pw.move_to_next()
+                else:
+                    print("Skipping move ...")
+    finally:
+        pw.release()
+
+    # Screen for sensitive data once the curator is done with the prompts.
+    # Only a shared lock is held, so the deposit can be moved meanwhile
+    pw.scan_sensitive()
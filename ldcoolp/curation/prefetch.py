@@ -0,0 +1,112 @@
+import errno
+
+# Logging
+from ldcoolp.logger import log_stdout
+
+# Admin
+from ldcoolp.admin import move
+
+# Curation
+from ldcoolp.curation.depositor_name import DepositorName
+from ldcoolp.curation.staging import stage, clean, get_staging_directories
+
+# API
+from figshare.figshare import Figshare
+from ldcoolp.curation.api.figshare import FigshareInstituteAdmin
+
+# Read in default configuration settings
+from ..config import config_default_dict
+
+
+class PrefetchClass:
+    """
+    Purpose:
+      Speculatively retrieve data for pending curation items into a hidden
+      staging area on the curation server. PrerequisiteWorkflow adopts the
+      staged data with a rename so that curators do not wait on retrieval
+
+    :param config_dict: dict of dict with hierarchy of sections
+           (figshare, curation, qualtrics) follow by options
+    :param log: logger.LogClass object. Default is stdout via python logging
+    :param url_open: bool indicates using urlopen over urlretrieve. Default: False
+
+    Attributes
+    ----------
+    prefetch_directory : str
+      Full path of staging area with completed retrievals
+
+    partial_directory : str
+      Full path of staging area with retrievals in progress
+
+    Methods
+    -------
+    get_pending_list()
+      Return list of article IDs for pending curation
+
+    retrieve(article_id)
+      Retrieve data for a deposit into the staging area under its deposit lock
+
+    main()
+      Remove stale data from the staging area and retrieve data for all
+      pending curation
+    """
+
+    def __init__(self, config_dict=config_default_dict, log=None, url_open=False):
+
+        if isinstance(log, type(None)):
+            self.log = log_stdout()
+        else:
+            self.log = log
+
+        self.curation_dict = config_dict['curation']
+        self.figshare_dict = config_dict['figshare']
+        self.url_open = url_open
+
+        self.mc = move.MoveClass(curation_dict=self.curation_dict, log=self.log)
+
+        self.prefetch_directory, self.partial_directory = \
+            get_staging_directories(self.curation_dict)
+
+        self.fs = Figshare(token=self.figshare_dict['api_token'], private=True,
+                           stage=self.figshare_dict['stage'])
+        self.fs_admin = FigshareInstituteAdmin(figshare_dict=self.figshare_dict, log=self.log)
+
+    def get_pending_list(self):
+        """Return list of article IDs for pending curation"""
+
+        curation_df = self.fs_admin.get_curation_list()
+        pending_curation_df = curation_df.loc[curation_df['status'] == 'pending']
+
+        return pending_curation_df['article_id'].unique().tolist()
+
+    def retrieve(self, article_id):
+        """
+        Retrieve data for a deposit into the staging area. Deposits locked
+        by a curator or another worker are skipped. See staging.stage()
+        """
+
+        dn = DepositorName(article_id, self.fs_admin, verbose=False, log=self.log)
+
+        return stage(article_id, dn.folderName, self.fs, curation_dict=self.curation_dict,
+                     mc=self.mc, url_open=self.url_open,
+                     bundle_url=self.figshare_dict['bundle_url'], log=self.log)
+
+    def main(self):
+        """Remove stale data from the staging area and retrieve data for all pending curation"""
+
+        pending_list = self.get_pending_list()
+        self.log.info(f"Number of pending curation: {len(pending_list)}")
+
+        # Remove data of deposits set up by curators or no longer pending
+        clean(curation_dict=self.curation_dict, pending_list=pending_list, mc=self.mc,
+              log=self.log)
+
+        for article_id in pending_list:
+            try:
+                self.retrieve(article_id)
+            except OSError as error:
+                if error.errno != errno.ENOSPC:
+                    raise
+                self.log.warning("Insufficient disk space. Stopping prefetch!")
+                break
+
@@ -1,9 +1,8 @@
 from os.path import exists, join
-from os import makedirs
+from os import makedirs, chmod
 
 from urllib.request import urlretrieve
 
-from ldcoolp.admin import permissions
 from ldcoolp.logger import log_stdout
 
 from ..config import config_default_dict
@@ -30,6 +29,7 @@ def review_report(depositor_name='', curation_dict=config_default_dict['curation
     if not exists(out_path):
         log.info(f"Creating folder : {out_path}")
         makedirs(out_path, mode=0o777, exist_ok=True)
+        chmod(out_path, 0o777)  # makedirs mode is subject to umask
     else:
         log.warn(f"!!!! Folder exists, not creating : {out_path}")
 
@@ -43,7 +43,7 @@ def review_report(depositor_name='', curation_dict=config_default_dict['curation
         log.info(f"Saving ReDATA Curation Report to: {out_path}")
         log.info(f"Saving as : {filename}")
         urlretrieve(report_url, out_file)
-        permissions.curation(out_path)
+        chmod(out_file, 0o777)
     else:
         log.info(f"!!!! ReDATA Curation Report exists in {out_path} !!!!")
         log.info("!!!! Will not override !!!!")
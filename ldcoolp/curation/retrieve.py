@@ -1,33 +1,119 @@
 import os
-from os.path import exists
+from os.path import exists, getsize, dirname, basename, join
+import errno
+import hashlib
+import shutil
+import zipfile
+from statistics import median
+from tempfile import TemporaryFile
 
 from urllib.request import Request, urlopen, build_opener, install_opener, urlretrieve
-from urllib.error import HTTPError
+from urllib.error import HTTPError, URLError
+from http.client import IncompleteRead
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
 
-from ldcoolp.admin import permissions
+from ldcoolp.admin.copy import clone
+from ldcoolp.admin.fixity import file_digests, read_manifest
 
 # Logging
 from ldcoolp.logger import log_stdout
+from ldcoolp.curation.telemetry import TelemetryClass
+
+# Thresholds for retrieving many small files as a single archive (bundle)
+bundle_min_files = 100
+bundle_max_median_size = 1024 * 1024  # 1 MB
+
+# Files at or above this size are retrieved with parallel byte-range segments
+segment_min_size = 1024 ** 3  # 1 GB
+segment_connections = 8
+segment_retries = 3
+
+# Fraction of the curation volume to keep free after a retrieval
+disk_headroom = 0.05
 
 
 def private_file_retrieve(url, filename=None, token=None, url_open=False,
-                          log=None):
+                          log=None, size=None, md5=None, mode=None):
     """
     Purpose:
       Custom Request to privately retrieve a file with a token.
       This was built off of the figshare Python code, but a urlretrieve
       did not handle providing a token in the header.
+      The file is written to a hidden partial file and renamed to [filename]
+      only once its size and MD5 checksum are verified. The partial file is
+      removed if the retrieval fails
 
     :param url: Full URL (str)
     :param filename: Full filename for file to be written (str)
     :param token: API token (str)
     :param url_open: Boolean to indicate whether to use urlopen. Default: False
     :param log: logger.LogClass object. Default is stdout via python logging
+    :param size: File size in bytes. The file is preallocated at this size and
+           files larger than segment_min_size are retrieved with
+           segmented_file_retrieve(). Default: None
+    :param md5: Expected MD5 checksum. Default: None (no verification)
+    :param mode: Mode to set on the completed file. Default: None (unchanged)
+
+    :return stats: dict with retrieval 'method', 'ttfb' (seconds to first byte)
+            and number of 'retries'
+    :raises ValueError: If the size or checksum does not match
     """
 
     if isinstance(log, type(None)):
         log = log_stdout()
 
+    # Retrieve to a hidden partial file that is renamed once verified, so an
+    # interrupted retrieval is not mistaken for a retrieved file
+    partial = partial_filename(filename)
+    if exists(partial):
+        os.remove(partial)
+
+    try:
+        stats = _private_file_retrieve(url, partial, token=token, url_open=url_open,
+                                       log=log, size=size, md5=md5, mode=mode)
+        os.replace(partial, filename)
+    except BaseException:
+        if exists(partial):
+            os.remove(partial)
+        raise
+
+    return stats
+
+
+def partial_filename(filename):
+    """Return full filename of the hidden partial file used during retrieval"""
+    return join(dirname(filename), f".{basename(filename)}.partial")
+
+
+def verify_file(filename, size=None, md5=None):
+    """
+    Purpose:
+      Check the size and MD5 checksum of a retrieved file
+
+    :raises ValueError: If the size or checksum does not match
+    """
+
+    if size is not None and getsize(filename) != size:
+        raise ValueError(f"Size mismatch for {filename} : {getsize(filename)} != {size} bytes")
+    if md5 and md5_checksum(filename) != md5:
+        raise ValueError(f"MD5 checksum mismatch for {filename}")
+
+
+def _private_file_retrieve(url, filename, token=None, url_open=False,
+                           log=None, size=None, md5=None, mode=None):
+    """Retrieve and verify a file. See private_file_retrieve()"""
+
+    if size is not None and size >= segment_min_size and not url_open:
+        if supports_ranges(url, token=token):
+            return segmented_file_retrieve(url, filename, size, token=token,
+                                           md5=md5, log=log, mode=mode)
+        else:
+            log.info("Server does not support byte ranges. Using single stream")
+
+    stats = {'method': 'stream', 'ttfb': None, 'retries': 0}
+    start_time = monotonic()
+
     if not url_open:
         if token:
             opener = build_opener()
@@ -38,26 +124,468 @@ def private_file_retrieve(url, filename=None, token=None, url_open=False,
             install_opener(opener)
 
         try:
-            urlretrieve(url, filename)
+            if size is None:
+                def reporthook(block_num, block_size, total_size):
+                    if block_num == 1:
+                        stats['ttfb'] = monotonic() - start_time
+
+                urlretrieve(url, filename, reporthook=reporthook)
+                verify_file(filename, md5=md5)
+                if mode is not None:
+                    os.chmod(filename, mode)
+            else:
+                with opener.open(url) as response:
+                    first_byte_time = stream_to_file(response, filename, size,
+                                                     md5=md5, mode=mode)
+                if first_byte_time is not None:
+                    stats['ttfb'] = first_byte_time - start_time
         except HTTPError as error:
             log.warning(f"Caught an HTTPError: {error}")
             raise
     else:
+        stats['method'] = 'urlopen'
         req = Request(url)
         if token:
             req.add_header('Authorization', f'token {token}')
 
         response = urlopen(req)
+        stats['ttfb'] = monotonic() - start_time
         content = response.read()
         print(url)
 
-        f = open(filename, 'wb')
-        f.write(content)
-        f.close()
+        with open(filename, 'wb') as f:
+            f.write(content)
+        verify_file(filename, size=size, md5=md5)
+        if mode is not None:
+            os.chmod(filename, mode)
+
+    return stats
+
+
+def preallocate(fd, size):
+    """
+    Purpose:
+      Allocate [size] bytes on disk for an open file to avoid fragmentation
+      from incremental growth
+
+    :param fd: File descriptor (int)
+    :param size: File size in bytes (int)
+    """
+
+    if size <= 0:
+        return
+
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError as error:
+            if error.errno == errno.ENOSPC:
+                raise
+    os.ftruncate(fd, size)
+
+
+def stream_to_file(response, filename, size, blocksize=1024*1024, md5=None, mode=None):
+    """
+    Purpose:
+      Write an HTTP response into a file preallocated at its final size.
+      The size and MD5 checksum are verified as the file is written
+
+    :param response: File-like HTTP response
+    :param filename: Full filename for file to be written (str)
+    :param size: Expected file size in bytes (int)
+    :param blocksize: Number of bytes to read at a time. Default: 1 MB
+    :param md5: Expected MD5 checksum. Default: None (no verification)
+    :param mode: Mode to set on the completed file. Default: None (unchanged)
+
+    :return first_byte_time: time.monotonic() when the first block was read.
+            None for an empty response
+    :raises ValueError: If the size or checksum does not match
+    """
+
+    first_byte_time = None
+    n_bytes = 0
+    hash_obj = hashlib.md5()
+    with open(filename, 'wb') as f:
+        preallocate(f.fileno(), size)
+        for block in iter(lambda: response.read(blocksize), b''):
+            if first_byte_time is None:
+                first_byte_time = monotonic()
+            f.write(block)
+            n_bytes += len(block)
+            if md5:
+                hash_obj.update(block)
+        f.truncate()  # In case the response is shorter than expected
+        if mode is not None:
+            os.fchmod(f.fileno(), mode)
+
+    if n_bytes != size:
+        raise ValueError(f"Size mismatch for {filename} : {n_bytes} != {size} bytes")
+    if md5 and hash_obj.hexdigest() != md5:
+        raise ValueError(f"MD5 checksum mismatch for {filename}")
+
+    return first_byte_time
+
+
+def existing_parent(path):
+    """Return [path] or its nearest existing parent folder"""
+
+    while not exists(path) and dirname(path) != path:
+        path = dirname(path)
+
+    return path
+
+
+def check_disk_space(path, required, headroom=disk_headroom, log=None):
+    """
+    Purpose:
+      Check that the volume containing [path] has enough free space for
+      [required] bytes while keeping a fraction of the volume free
+
+    :param path: Full path on the target volume. Need not exist yet (str)
+    :param required: Number of bytes to be written (int)
+    :param headroom: Fraction of volume to keep free. Default: disk_headroom
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    :raises OSError: errno.ENOSPC if there is insufficient space
+    """
+
+    if isinstance(log, type(None)):
+        log = log_stdout()
+
+    path = existing_parent(path)
+    usage = shutil.disk_usage(path)
+    available = usage.free - int(headroom * usage.total)
+
+    log.info(f"Disk space required: {required} bytes, available: {available} bytes")
+    if required > available:
+        err = f"Insufficient disk space on {path} : {required} > {available} bytes"
+        log.warning(err)
+        raise OSError(errno.ENOSPC, err)
+
+
+def supports_ranges(url, token=None):
+    """
+    Purpose:
+      Check whether a server honors byte-range requests for [url]
+
+    :param url: Full URL (str)
+    :param token: API token (str)
+
+    :return: bool. True if a partial content (206) response is returned
+    """
+
+    req = Request(url, headers={'Range': 'bytes=0-0'})
+    if token:
+        req.add_header('Authorization', f'token {token}')
+
+    with urlopen(req) as response:
+        return response.status == 206
+
+
+def segmented_file_retrieve(url, filename, size, token=None, md5=None,
+                            n_connections=segment_connections,
+                            retries=segment_retries, log=None,
+                            blocksize=1024*1024, mode=None):
+    """
+    Purpose:
+      Retrieve a large file with parallel byte-range requests. Each
+      segment is written in place into a preallocated file with pwrite,
+      and a failed segment is resumed from its last written byte
+
+    :param url: Full URL (str)
+    :param filename: Full filename for file to be written (str)
+    :param size: File size in bytes (int)
+    :param token: API token (str)
+    :param md5: Expected MD5 checksum. Default: None (no verification)
+    :param n_connections: Number of parallel connections
+    :param retries: Number of retries for each segment. Client errors
+           (HTTP 4xx other than 408 and 429) are not retried
+    :param log: logger.LogClass object. Default is stdout via python logging
+    :param blocksize: Number of bytes to read at a time. Default: 1 MB
+    :param mode: Mode to set on the completed file. Default: None (unchanged)
+
+    :return stats: dict with retrieval 'method', 'ttfb' (seconds to first byte)
+            and number of 'retries' across all segments
+    """
+
+    if isinstance(log, type(None)):
+        log = log_stdout()
+
+    stats = {'method': 'segmented', 'ttfb': None, 'retries': 0}
+    start_time = monotonic()
+
+    segment_size = -(-size // n_connections)  # Ceiling division
+    segments = [(start, min(start + segment_size, size) - 1) for
+                start in range(0, size, segment_size)]
+
+    def retrieve_segment(fd, start, end):
+        offset = start
+        attempt = 0
+        while offset <= end:
+            req = Request(url, headers={'Range': f'bytes={offset}-{end}'})
+            if token:
+                req.add_header('Authorization', f'token {token}')
+
+            try:
+                with urlopen(req) as response:
+                    if response.status != 206:
+                        raise ValueError(f"Byte ranges not honored for {url}")
+                    for block in iter(lambda: response.read(min(blocksize, end - offset + 1)), b''):
+                        if stats['ttfb'] is None:
+                            stats['ttfb'] = monotonic() - start_time
+                        os.pwrite(fd, block, offset)
+                        offset += len(block)
+                        if offset > end:
+                            break
+                if offset <= end:
+                    raise IncompleteRead(b'', end - offset + 1)
+            except (URLError, IncompleteRead, ConnectionError, TimeoutError) as error:
+                # Client errors (e.g., 401, 403, 404) are not transient
+                if isinstance(error, HTTPError) and 400 <= error.code < 500 and \
+                        error.code not in [408, 429]:
+                    raise
+                attempt += 1
+                stats['retries'] += 1
+                if attempt > retries:
+                    raise
+                log.warning(f"Segment {start}-{end} failed at {offset}: {error}. Retrying ...")
+
+    log.info(f"Retrieving in {len(segments)} segments with {n_connections} connections")
+
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT, 0o666)
+    try:
+        preallocate(fd, size)
+
+        with ThreadPoolExecutor(max_workers=n_connections) as executor:
+            futures = [executor.submit(retrieve_segment, fd, start, end) for
+                       start, end in segments]
+            for future in futures:
+                future.result()
+
+        if mode is not None:
+            os.fchmod(fd, mode)
+    except Exception:
+        os.close(fd)
+        os.remove(filename)
+        raise
+    else:
+        os.close(fd)
+
+    if md5 and md5_checksum(filename) != md5:
+        os.remove(filename)
+        err = f"MD5 checksum mismatch for {filename}"
+        log.warning(err)
+        raise ValueError(err)
+
+    return stats
+
+
+def md5_checksum(filename, blocksize=1024*1024):
+    """
+    Purpose:
+      Compute the MD5 checksum of a file by reading in blocks
+
+    :param filename: Full filename (str)
+    :param blocksize: Number of bytes to read at a time. Default: 1 MB
+
+    :return: str containing hexadecimal MD5 checksum
+    """
+
+    return file_digests(filename, algorithms=['md5'], blocksize=blocksize)['md5']
+
+
+def is_complete(filename, file_dict):
+    """Return True if [filename] exists and matches the size and MD5 checksum in [file_dict]"""
+
+    if not exists(filename) or getsize(filename) != file_dict['size']:
+        return False
+
+    return not file_dict.get('computed_md5') or \
+        md5_checksum(filename) == file_dict['computed_md5']
+
+
+def read_recorded_checksums(previous_directory, manifest_folder='UAL_RDM'):
+    """
+    Purpose:
+      Read MD5 checksums recorded for a previous version in its fixity
+      manifest (see admin.fixity.FixityClass)
+
+    :param previous_directory: Full path of ORIGINAL_DATA folder for a previous version
+    :param manifest_folder: Folder with manifests, alongside ORIGINAL_DATA. Default: UAL_RDM
+
+    :return: tuple of dict mapping path (relative to ORIGINAL_DATA) to MD5
+             checksum and modification time of the manifest. None if there
+             is no manifest
+    """
+
+    previous_directory = os.path.normpath(previous_directory)
+    manifest_file = join(dirname(previous_directory), manifest_folder, 'manifest-md5.txt')
+    if not exists(manifest_file):
+        return None
+
+    prefix = basename(previous_directory) + os.sep
+    checksum_dict = {path[len(prefix):]: checksum for path, checksum in
+                     read_manifest(manifest_file).items() if path.startswith(prefix)}
+
+    return checksum_dict, os.stat(manifest_file).st_mtime
+
+
+def find_previous_file(file_dict, previous_directories, recorded_dict=None):
+    """
+    Purpose:
+      Find an unchanged copy of a Figshare file among previous versions of
+      a deposit by comparing name, size and MD5 checksum. The checksum
+      recorded in the fixity manifest is used if the file has not been
+      modified since the manifest was written. Otherwise the file is read
+
+    :param file_dict: dict from Figshare file listing
+    :param previous_directories: list of full paths of ORIGINAL_DATA folders
+           for previous versions
+    :param recorded_dict: dict mapping previous directory to output of
+           read_recorded_checksums(). Default: None (files are read)
+
+    :return: str containing full filename of unchanged copy. None if not found
+    """
+
+    if recorded_dict is None:
+        recorded_dict = dict()
+
+    for previous_directory in previous_directories:
+        previous_file = os.path.join(previous_directory, file_dict['name'])
+        if not exists(previous_file):
+            continue
+        previous_stat = os.stat(previous_file)
+        if previous_stat.st_size != file_dict['size']:
+            continue
+
+        recorded = recorded_dict.get(previous_directory)
+        if recorded and file_dict['name'] in recorded[0] and \
+                previous_stat.st_mtime <= recorded[1]:
+            checksum = recorded[0][file_dict['name']]
+        else:
+            checksum = md5_checksum(previous_file)
+        if checksum == file_dict.get('computed_md5'):
+            return previous_file
+
+    return None
+
+
+def select_mode(file_list, min_files=bundle_min_files,
+                max_median_size=bundle_max_median_size):
+    """
+    Purpose:
+      Select between per-file retrieval and a single archive (bundle)
+      retrieval. Deposits with many small files are retrieved as a bundle
+      to avoid per-file request overhead
+
+    :param file_list: list of dict from Figshare file listing
+    :param min_files: Minimum number of files for bundle retrieval
+    :param max_median_size: Maximum median file size (bytes) for bundle retrieval
+
+    :return mode: str. Either 'bundle' or 'file'
+    """
+
+    if len(file_list) < min_files:
+        return 'file'
+
+    median_size = median([file_dict['size'] for file_dict in file_list])
+    if median_size <= max_median_size:
+        return 'bundle'
+    else:
+        return 'file'
+
+
+def bundle_retrieve(url, file_list, dir_path, token=None, log=None,
+                    blocksize=1024*1024, mode=None):
+    """
+    Purpose:
+      Retrieve all files for a deposit with a single archive request, and
+      extract the members into [dir_path]. Each member is verified against
+      the Figshare file listing (size and MD5 checksum) as it is extracted
+
+    :param url: Full URL of the article's archive (str)
+    :param file_list: list of dict from Figshare file listing to extract
+    :param dir_path: Full path to extract files into (str)
+    :param token: API token (str)
+    :param log: logger.LogClass object. Default is stdout via python logging
+    :param blocksize: Number of bytes to read at a time. Default: 1 MB
+    :param mode: Mode to set on each extracted file. Default: None (unchanged)
+
+    :return remaining_list: list of dict for files that were not extracted
+            or did not pass verification
+    """
+
+    if isinstance(log, type(None)):
+        log = log_stdout()
+
+    manifest = {file_dict['name']: file_dict for file_dict in file_list}
+    completed = set()
+
+    req = Request(url)
+    if token:
+        req.add_header('Authorization', f'token {token}')
+
+    # A zip archive can only be read once its central directory (at the end)
+    # is available. Spool it to a temporary file next to the data folder
+    with TemporaryFile(dir=os.path.dirname(os.path.normpath(dir_path))) as tmp:
+        try:
+            with urlopen(req) as response:
+                shutil.copyfileobj(response, tmp, blocksize)
+        except HTTPError as error:
+            log.warning(f"Caught an HTTPError: {error}")
+            return file_list
+
+        try:
+            zf = zipfile.ZipFile(tmp)
+        except zipfile.BadZipFile:
+            log.warning(f"Archive is not a valid zip file: {url}")
+            return file_list
+
+        with zf:
+            for info in zf.infolist():
+                name = os.path.basename(info.filename)
+                if info.is_dir() or name not in manifest or name in completed:
+                    continue
+
+                file_dict = manifest[name]
+                filename = os.path.join(dir_path, name)
+
+                partial = partial_filename(filename)
+                md5 = hashlib.md5()
+                try:
+                    with zf.open(info) as src, open(partial, 'wb') as dst:
+                        preallocate(dst.fileno(), info.file_size)
+                        for block in iter(lambda: src.read(blocksize), b''):
+                            md5.update(block)
+                            dst.write(block)
+                        dst.truncate()
+                        if mode is not None:
+                            os.fchmod(dst.fileno(), mode)
+                except BaseException:
+                    if exists(partial):
+                        os.remove(partial)
+                    raise
+
+                if info.file_size != file_dict['size'] or \
+                        md5.hexdigest() != file_dict.get('computed_md5'):
+                    log.warning(f"Verification failed for : {name}")
+                    os.remove(partial)
+                else:
+                    os.replace(partial, filename)
+                    completed.add(name)
+
+    log.info(f"Extracted {len(completed)} of {len(file_list)} files from archive")
+
+    remaining_list = [file_dict for file_dict in file_list if
+                      file_dict['name'] not in completed]
+    return remaining_list
 
 
 def download_files(article_id, fs, root_directory=None, data_directory=None,
-                   log=None, url_open=False):
+                   log=None, url_open=False, previous_directories=None,
+                   bundle_url=None, mode='auto', file_mode=0o555,
+                   manifest_folder='UAL_RDM'):
     """
     Purpose:
       Retrieve data for a Figshare deposit following data curation workflow
@@ -68,11 +596,26 @@ def download_files(article_id, fs, root_directory=None, data_directory=None,
     :param data_directory: Relative folder path for primary location of data (str)
     :param log: logger.LogClass object. Default is stdout via python logging
     :param url_open: bool indicates using urlopen over urlretrieve. Default: False
+    :param previous_directories: list of full paths of ORIGINAL_DATA folders for
+           previous versions. Unchanged files are linked instead of retrieved
+    :param bundle_url: URL template for the article's archive with {article_id}.
+           Default: None (per-file retrieval only)
+    :param mode: Either 'auto', 'bundle' or 'file'. Default: 'auto' uses
+           select_mode() to choose based on file count and median size
+    :param file_mode: Mode set on each file as it is completed and on the
+           folder once all files are retrieved. Default: 0o555 (read and execute only)
+    :param manifest_folder: Folder with fixity manifests of previous versions.
+           Recorded checksums are used to identify unchanged files. Default: UAL_RDM
+
+    :raises OSError: errno.ENOSPC if the deposit does not fit on the curation volume
     """
 
     if isinstance(log, type(None)):
         log = log_stdout()
 
+    if previous_directories is None:
+        previous_directories = []
+
     if root_directory is None:
         root_directory = os.getcwd()
 
@@ -87,34 +630,126 @@ def download_files(article_id, fs, root_directory=None, data_directory=None,
     else:
         dir_path = os.path.join(root_directory, data_directory)
 
+    # Files from an earlier run are kept only if their size and checksum match
+    complete = set([file_dict['name'] for file_dict in file_list if
+                    is_complete(os.path.join(dir_path, file_dict['name']), file_dict)])
+
+    missing_list = [file_dict for file_dict in file_list if
+                    file_dict['name'] not in complete]
+
+    # Unchanged files from previous versions are linked instead of retrieved
+    recorded_dict = {previous_directory: read_recorded_checksums(previous_directory,
+                                                                 manifest_folder)
+                     for previous_directory in previous_directories}
+    previous_dict = {file_dict['name']: find_previous_file(file_dict, previous_directories,
+                                                           recorded_dict=recorded_dict)
+                     for file_dict in missing_list}
+    pending_list = [file_dict for file_dict in missing_list if
+                    not previous_dict[file_dict['name']]]
+
+    if pending_list and bundle_url and mode == 'auto':
+        mode = select_mode(pending_list)
+
+    # Preflight: refuse retrieval if the curation volume cannot hold the deposit.
+    # Links on the same volume take no space, and a bundle is spooled to a
+    # temporary file on the same volume before it is extracted
+    device = os.stat(existing_parent(dir_path)).st_dev
+    required = sum([file_dict['size'] for file_dict in missing_list if
+                    not previous_dict[file_dict['name']] or
+                    os.stat(previous_dict[file_dict['name']]).st_dev != device])
+    if pending_list and bundle_url and mode == 'bundle':
+        required += sum([file_dict['size'] for file_dict in pending_list])
+    check_disk_space(dir_path, required, log=log)
+
+    # Folder is writable during retrieval and sealed once the last file completes
     os.makedirs(dir_path, exist_ok=True)  # This might require Python >=3.2
-    permissions.curation(dir_path)
+    os.chmod(dir_path, 0o777)
 
     log.info(f"Total number of files: {n_files}")
 
-    for n, file_dict in zip(range(n_files), file_list):
-        log.info(f"Retrieving {n+1} of {n_files} : {file_dict['name']} ({file_dict['size']})")
+    telemetry = TelemetryClass(article_id, sum([file_dict['size'] for file_dict in missing_list]),
+                               len(missing_list), log=log)
+
+    # Skip existing files and link unchanged files from previous versions
+    for file_dict in file_list:
+        filename = os.path.join(dir_path, file_dict['name'])
+        if file_dict['name'] in complete:
+            log.info(f"File exists! Not overwriting! {file_dict['name']}")
+            continue
+        if exists(filename):
+            log.warning(f"File exists but does not match. Retrieving again : {file_dict['name']}")
+            os.remove(filename)
+
+        start_time = monotonic()
+        previous_file = previous_dict[file_dict['name']]
+        if previous_file:
+            log.info(f"Unchanged from previous version : {previous_file}")
+            method = clone(previous_file, filename)
+            os.chmod(filename, file_mode)
+            log.info(f"Success! ({method})")
+            telemetry.record(file_dict['name'], file_dict['size'],
+                             monotonic() - start_time, method=method)
+
+    if pending_list and bundle_url:
+        if mode == 'bundle':
+            url = bundle_url.format(article_id=article_id)
+            log.info(f"Retrieving {len(pending_list)} files as a single archive")
+            log.info(f"URL: {url}")
+            start_time = monotonic()
+            remaining_list = bundle_retrieve(url, pending_list, dir_path,
+                                             token=fs.token, log=log, mode=file_mode)
+            # Archive retrieval time is apportioned evenly across extracted files
+            remaining_names = set([file_dict['name'] for file_dict in remaining_list])
+            duration = (monotonic() - start_time) / max(len(pending_list) - len(remaining_list), 1)
+            for file_dict in pending_list:
+                if file_dict['name'] not in remaining_names:
+                    telemetry.record(file_dict['name'], file_dict['size'],
+                                     duration, method='bundle')
+            pending_list = remaining_list
+
+    n_pending = len(pending_list)
+    for n, file_dict in zip(range(n_pending), pending_list):
+        log.info(f"Retrieving {n+1} of {n_pending} : {file_dict['name']} ({file_dict['size']})")
         log.info(f"URL: {file_dict['download_url']}")
         filename = os.path.join(dir_path, file_dict['name'])
-        if not exists(filename):
+        start_time = monotonic()
+        stats = {'method': 'stream', 'ttfb': None, 'retries': 0}
+        status = 'failed'
+        try:
+            stats = private_file_retrieve(file_dict['download_url'],
+                                          filename=filename, token=fs.token,
+                                          url_open=url_open, log=log,
+                                          size=file_dict['size'],
+                                          md5=file_dict.get('computed_md5'),
+                                          mode=file_mode)
+            log.info("Success!")
+            status = 'success'
+        except ValueError:
+            log.warning(f"Failed to retrieve: {filename}")
+        except HTTPError:
+            log.info(f"URL might be public: {file_dict['download_url']}")
+            log.info("Attempting retrieval without token")
+            stats['retries'] += 1
             try:
-                private_file_retrieve(file_dict['download_url'],
-                                      filename=filename, token=fs.token,
-                                      url_open=url_open, log=log)
+                stats = private_file_retrieve(file_dict['download_url'],
+                                              filename=filename,
+                                              url_open=url_open, log=log,
+                                              size=file_dict['size'],
+                                              md5=file_dict.get('computed_md5'),
+                                              mode=file_mode)
+                stats['retries'] += 1
                 log.info("Success!")
-            except HTTPError:
-                log.info(f"URL might be public: {file_dict['download_url']}")
-                log.info("Attempting retrieval without token")
-                try:
-                    private_file_retrieve(file_dict['download_url'],
-                                          filename=filename,
-                                          url_open=url_open, log=log)
-                    log.info("Success!")
-                except HTTPError:
-                    log.warning(f"Failed to retrieve: {filename}")
-        else:
-            log.info("File exists! Not overwriting!")
+                status = 'success'
+            except (HTTPError, ValueError):
+                log.warning(f"Failed to retrieve: {filename}")
+
+        telemetry.record(file_dict['name'],
+                         getsize(filename) if exists(filename) else 0,
+                         monotonic() - start_time, ttfb=stats['ttfb'],
+                         retries=stats['retries'], method=stats['method'],
+                         status=status)
+
+    telemetry.finish()
 
-    # Change permissions on folders and files
-    # permissions.curation(dir_path)
-    permissions.curation(dir_path, mode=0o555)  # read and execute only
+    # Seal folder: read and execute only
+    os.chmod(dir_path, file_mode)
@@ -0,0 +1,238 @@
+"""
+Hidden staging area on the curation server for data retrieved in advance
+of the curation workflow. See prefetch.PrefetchClass for the retrieval of
+pending curation items
+"""
+
+from os.path import join, exists, dirname, basename, isdir
+from os import makedirs, listdir, rmdir, nice
+import shutil
+
+# Logging
+from ldcoolp.logger import log_stdout
+
+# Admin
+from ldcoolp.admin import move, permissions
+
+# Curation
+from ldcoolp.curation.retrieve import download_files
+from ldcoolp.curation.inspection import sensitive
+
+# Read in default configuration settings
+from ..config import config_default_dict
+
+
+def set_low_priority(increment=19):
+    """
+    Purpose:
+      Lower the CPU priority of the current process. On Linux, the I/O
+      priority of a process without an explicit ioprio follows its nice
+      value, so this also lowers disk priority
+
+    :param increment: Increment for nice value. Default: 19 (lowest priority)
+    """
+
+    try:
+        nice(increment)
+    except OSError:
+        pass
+
+
+def remove_empty_parent(path, stop_path):
+    """Remove empty parent folders of [path] up to (not including) [stop_path]"""
+
+    parent_dir = dirname(path)
+    while parent_dir != stop_path and exists(parent_dir) and \
+            len(listdir(parent_dir)) == 0:
+        rmdir(parent_dir)
+        parent_dir = dirname(parent_dir)
+
+
+def get_staging_directories(curation_dict):
+    """Return full paths of staging area for completed retrievals and for
+    retrievals in progress"""
+
+    prefetch_directory = join(curation_dict[curation_dict['parent_dir']],
+                              curation_dict['folder_prefetch'])
+
+    return prefetch_directory, join(prefetch_directory, '.partial')
+
+
+def stage(article_id, folder_name, fs, curation_dict=config_default_dict['curation'],
+          mc=None, url_open=False, bundle_url=None, log=None):
+    """
+    Purpose:
+      Retrieve data for a deposit into the staging area under its deposit
+      lock and scan it for sensitive data if scan_sensitive is set.
+      Deposits that are locked, set up in a curation stage or already
+      staged are skipped
+
+    :param article_id: Figshare article ID (int)
+    :param folder_name: Exact name of the data curation folder with spaces
+    :param fs: Figshare object
+    :param curation_dict: Dict that contains curation configuration
+    :param mc: admin.move.MoveClass object. Default: constructed from curation_dict
+    :param url_open: bool indicates using urlopen over urlretrieve. Default: False
+    :param bundle_url: URL template for the article's archive. See retrieve.download_files
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    :return: bool. True if data was retrieved into the staging area
+    """
+
+    if isinstance(log, type(None)):
+        log = log_stdout()
+
+    if isinstance(mc, type(None)):
+        mc = move.MoveClass(curation_dict=curation_dict, log=log)
+
+    prefetch_directory, partial_directory = get_staging_directories(curation_dict)
+
+    lock = mc.lock(folder_name, timeout=0, operation='prefetch')
+    try:
+        lock.acquire()
+    except TimeoutError as err:
+        log.info(f"{err}. Skipping!")
+        return False
+
+    try:
+        try:
+            source_stage = mc.get_source_stage(folder_name, verbose=False)
+            log.debug(f"{folder_name} exists in {source_stage}. Skipping!")
+            return False
+        except FileNotFoundError:
+            pass
+
+        prefetch_path = join(prefetch_directory, folder_name)
+        if exists(prefetch_path):
+            log.debug(f"{folder_name} already prefetched. Skipping!")
+            return False
+
+        log.info(f"Prefetching: {article_id} ({folder_name})")
+
+        previous_directories = [join(version_path, curation_dict['folder_data']) for
+                                version_path in mc.get_previous_versions(folder_name)]
+
+        download_files(article_id, fs, root_directory=partial_directory,
+                       data_directory=join(folder_name, curation_dict['folder_data']),
+                       log=log, url_open=url_open,
+                       previous_directories=previous_directories,
+                       bundle_url=bundle_url,
+                       manifest_folder=curation_dict['folder_ual_rdm'])
+
+        partial_path = join(partial_directory, folder_name)
+
+        # Deposit may have been set up without the lock (e.g., folder_rename)
+        try:
+            mc.get_source_stage(folder_name, verbose=False)
+            log.info(f"{folder_name} set up during prefetch. Discarding!")
+            permissions.curation(partial_path)
+            shutil.rmtree(partial_path)
+            staged = False
+        except FileNotFoundError:
+            makedirs(dirname(prefetch_path), exist_ok=True)
+            shutil.move(partial_path, prefetch_path)
+            staged = True
+        remove_empty_parent(partial_path, partial_directory)
+
+        # Screen for sensitive data ahead of the workflow, which reuses the report
+        if staged and curation_dict['scan_sensitive']:
+            sensitive.inspect(prefetch_path, curation_dict, log=log)
+    finally:
+        lock.release()
+
+    return staged
+
+
+def adopt(folder_name, root_directory, curation_dict=config_default_dict['curation'],
+          log=None):
+    """
+    Purpose:
+      Adopt prefetched data for a deposit by moving it from the staging area
+
+    :param folder_name: Exact name of the data curation folder with spaces
+    :param root_directory: Full path of curation stage to move to (e.g., 1.ToDo)
+    :param curation_dict: Dict that contains curation configuration
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    :return: bool. True if prefetched data was adopted
+    """
+
+    if isinstance(log, type(None)):
+        log = log_stdout()
+
+    prefetch_directory, _ = get_staging_directories(curation_dict)
+    prefetch_path = join(prefetch_directory, folder_name)
+
+    if not exists(prefetch_path):
+        return False
+
+    dest_path = join(root_directory, folder_name)
+    log.info(f"Adopting prefetched data : {prefetch_path}")
+    makedirs(dirname(dest_path), exist_ok=True)
+    shutil.move(prefetch_path, dest_path)  # rename on the same filesystem
+    remove_empty_parent(prefetch_path, prefetch_directory)
+
+    return True
+
+
+def list_staged(staging_directory):
+    """Return list of deposit folders (e.g., "Name_12345678/v2") in a staging folder"""
+
+    if not isdir(staging_directory):
+        return []
+
+    return sorted([join(parent, version) for parent in listdir(staging_directory)
+                   if parent[0] != '.' and isdir(join(staging_directory, parent))
+                   for version in listdir(join(staging_directory, parent))])
+
+
+def clean(curation_dict=config_default_dict['curation'], pending_list=None, mc=None,
+          log=None):
+    """
+    Purpose:
+      Remove entries of the staging area (completed and in progress) whose
+      deposit has been set up in a curation stage, or whose article is no
+      longer pending curation. Locked deposits are left in place
+
+    :param curation_dict: Dict that contains curation configuration
+    :param pending_list: list of article IDs for pending curation.
+           Default: None (entries are kept regardless of curation status)
+    :param mc: admin.move.MoveClass object. Default: constructed from curation_dict
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    :return removed_list: list of removed deposit folders
+    """
+
+    if isinstance(log, type(None)):
+        log = log_stdout()
+
+    if isinstance(mc, type(None)):
+        mc = move.MoveClass(curation_dict=curation_dict, log=log)
+
+    pending_set = None if pending_list is None else \
+        set([str(article_id) for article_id in pending_list])
+
+    removed_list = []
+    for staging_directory in get_staging_directories(curation_dict):
+        for folder_name in list_staged(staging_directory):
+            try:
+                reason = f"set up in {mc.get_source_stage(folder_name, verbose=False)}"
+            except FileNotFoundError:
+                article_id = basename(dirname(folder_name)).rsplit('_', 1)[-1]
+                if pending_set is None or article_id in pending_set:
+                    continue
+                reason = "no longer pending curation"
+
+            try:
+                with mc.lock(folder_name, timeout=0, operation='prefetch'):
+                    staged_path = join(staging_directory, folder_name)
+                    log.info(f"Removing prefetched data ({reason}) : {staged_path}")
+                    permissions.curation(staged_path)
+                    shutil.rmtree(staged_path)
+                    remove_empty_parent(staged_path, staging_directory)
+            except TimeoutError as err:
+                log.info(f"{err}. Skipping!")
+                continue
+            removed_list.append(folder_name)
+
+    return removed_list
@@ -0,0 +1,177 @@
+from os.path import splitext, exists
+from os import chmod
+import json
+import logging
+from datetime import datetime
+from statistics import median
+from threading import Lock
+from time import monotonic
+
+# Logging
+from ldcoolp.logger import log_stdout
+
+
+def get_telemetry_filename(log):
+    """
+    Purpose:
+      Determine telemetry filename next to the logfile of a logger
+
+    :param log: logger.LogClass object
+
+    :return: str with full filename (e.g., logs/prereq_script.2021-01-11.telemetry.jsonl).
+             None if the logger does not write to a file
+    """
+
+    for handler in log.handlers:
+        if isinstance(handler, logging.FileHandler):
+            return splitext(handler.baseFilename)[0] + '.telemetry.jsonl'
+
+    return None
+
+
+class TelemetryClass:
+    """
+    Purpose:
+      Collect per-file and per-deposit download telemetry (bytes, duration,
+      throughput, time to first byte, retries) and write machine-readable
+      records as JSON lines next to the logfile. Progress and estimated
+      time remaining are logged after each file
+
+    :param article_id: Figshare article ID (int)
+    :param total_bytes: Total number of bytes expected for the deposit
+    :param n_files: Total number of files for the deposit
+    :param filename: Full filename of JSON lines file. Default: next to logfile
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    Methods
+    -------
+    record(name, n_bytes, duration, ttfb, retries, method, status)
+      Record telemetry for a single file
+
+    summary()
+      Return dict of per-deposit aggregates
+
+    finish()
+      Record and log per-deposit aggregates
+    """
+
+    def __init__(self, article_id, total_bytes, n_files, filename=None, log=None):
+
+        if isinstance(log, type(None)):
+            self.log = log_stdout()
+        else:
+            self.log = log
+
+        self.article_id = article_id
+        self.total_bytes = total_bytes
+        self.n_files = n_files
+
+        if isinstance(filename, type(None)):
+            filename = get_telemetry_filename(self.log)
+        self.filename = filename
+
+        self.records = []
+        self.start_time = monotonic()
+        self.lock = Lock()
+
+    def write(self, record):
+        """Append record to JSON lines file"""
+
+        if not self.filename:
+            return
+
+        new_file = not exists(self.filename)
+        with open(self.filename, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+        if new_file:
+            chmod(self.filename, 0o666)
+
+    def record(self, name, n_bytes, duration, ttfb=None, retries=0,
+               method='stream', status='success'):
+        """
+        Purpose:
+          Record telemetry for a single file
+
+        :param name: File name
+        :param n_bytes: Number of bytes written
+        :param duration: Seconds to retrieve the file
+        :param ttfb: Seconds to first byte. Default: None (not measured)
+        :param retries: Number of retries
+        :param method: Retrieval method (e.g., stream, segmented, bundle, hardlink)
+        :param status: Either 'success' or 'failed'
+        """
+
+        record = {
+            'type': 'file',
+            'timestamp': datetime.now().isoformat(),
+            'article_id': self.article_id,
+            'name': name,
+            'bytes': n_bytes,
+            'duration': round(duration, 3),
+            'throughput': round(n_bytes / duration, 1) if duration > 0 else None,
+            'ttfb': round(ttfb, 3) if ttfb is not None else None,
+            'retries': retries,
+            'method': method,
+            'status': status,
+        }
+
+        with self.lock:
+            self.records.append(record)
+            self.write(record)
+            self.log.debug(f"Telemetry: {record}")
+            self.log_progress()
+
+    def log_progress(self):
+        """Log progress and estimated time remaining"""
+
+        done_bytes = sum([record['bytes'] for record in self.records])
+        elapsed = monotonic() - self.start_time
+
+        message = f"Progress: {len(self.records)} of {self.n_files} files, " + \
+                  f"{done_bytes} of {self.total_bytes} bytes"
+        if done_bytes > 0 and elapsed > 0:
+            rate = done_bytes / elapsed
+            eta = max(self.total_bytes - done_bytes, 0) / rate
+            message += f" ({rate / 1024**2:.2f} MB/s, ETA: {eta:.0f} s)"
+        self.log.info(message)
+
+    def summary(self):
+        """Return dict of per-deposit aggregates"""
+
+        transfers = [record for record in self.records if record['method'] in
+                     ['stream', 'segmented', 'urlopen', 'bundle']]
+        transfer_bytes = sum([record['bytes'] for record in transfers])
+        transfer_time = sum([record['duration'] for record in transfers])
+        ttfb_list = [record['ttfb'] for record in transfers if record['ttfb'] is not None]
+
+        summary_dict = {
+            'type': 'deposit',
+            'timestamp': datetime.now().isoformat(),
+            'article_id': self.article_id,
+            'files': len(self.records),
+            'failed': len([record for record in self.records if record['status'] != 'success']),
+            'bytes': sum([record['bytes'] for record in self.records]),
+            'transfer_bytes': transfer_bytes,
+            'duration': round(monotonic() - self.start_time, 3),
+            'throughput': round(transfer_bytes / transfer_time, 1) if transfer_time > 0 else None,
+            'median_ttfb': round(median(ttfb_list), 3) if ttfb_list else None,
+            'retries': sum([record['retries'] for record in self.records]),
+        }
+
+        return summary_dict
+
+    def finish(self):
+        """Record and log per-deposit aggregates"""
+
+        summary_dict = self.summary()
+        with self.lock:
+            self.write(summary_dict)
+
+        self.log.info(f"Retrieved {summary_dict['files']} files " +
+                      f"({summary_dict['failed']} failed), {summary_dict['bytes']} bytes " +
+                      f"in {summary_dict['duration']} s")
+        if summary_dict['throughput']:
+            self.log.info(f"Transfer throughput: {summary_dict['throughput'] / 1024**2:.2f} MB/s, " +
+                          f"median time to first byte: {summary_dict['median_ttfb']} s")
+
+        return summary_dict
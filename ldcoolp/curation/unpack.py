@@ -0,0 +1,249 @@
+from os.path import join, exists, dirname, basename, relpath, normpath, isabs
+from os import makedirs, chmod, fchmod, rename, walk, stat
+import stat as st
+import tarfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Logging
+from ldcoolp.logger import log_stdout
+
+from ldcoolp.admin.copy import remove_tree
+from ldcoolp.curation.inspection.archives import archive_type
+
+# Zip bomb guards: maximum uncompressed/compressed size ratio and
+# maximum uncompressed size of an archive
+max_ratio = 100
+max_total_size = 1024 ** 4  # 1 TB
+
+# Archive extensions stripped to name the extraction folder
+strip_extensions = ('.tar.gz', '.tar.bz2', '.tar.xz', '.tgz', '.tbz2', '.txz', '.tar', '.zip')
+
+
+def safe_path(destination, name):
+    """
+    Purpose:
+      Return full path of archive member [name] under [destination].
+      Raises ValueError for absolute paths and paths outside [destination]
+
+    :param destination: Full path of extraction folder
+    :param name: Member name in archive
+    """
+
+    norm_name = normpath(name.replace('\\', '/'))
+    if isabs(norm_name) or norm_name == '..' or norm_name.startswith('../') or \
+            ':' in norm_name.split('/')[0]:
+        raise ValueError(f"Unsafe path in archive: {name}")
+
+    return join(destination, norm_name)
+
+
+def check_sizes(total_size, archive_size, name):
+    """Raise ValueError if an archive expands beyond the zip bomb guards"""
+
+    if total_size > max_total_size:
+        raise ValueError(f"{name} expands to {total_size} bytes (limit: {max_total_size})")
+    if archive_size > 0 and total_size / archive_size > max_ratio:
+        raise ValueError(f"{name} has a compression ratio of {total_size / archive_size:.0f} " +
+                         f"(limit: {max_ratio})")
+
+
+def stream_member(src, filename, size, mode, blocksize=1024**2):
+    """
+    Purpose:
+      Stream an archive member to its final path and set permissions.
+      Raises ValueError if the member is larger than its declared size
+    """
+
+    n_bytes = 0
+    with open(filename, 'wb') as dst:
+        fchmod(dst.fileno(), mode)
+        for block in iter(lambda: src.read(blocksize), b''):
+            n_bytes += len(block)
+            if n_bytes > size:
+                raise ValueError(f"Member is larger than its declared size: {filename}")
+            dst.write(block)
+
+
+def unpack_zip(filename, destination, mode=0o777, n_threads=8):
+    """
+    Purpose:
+      Extract a zip archive with members extracted in parallel. Each thread
+      reads the archive through its own file handle
+
+    :return n_files: Number of files extracted
+    """
+
+    with zipfile.ZipFile(filename) as zf:
+        info_list = zf.infolist()
+
+    total_size = sum([info.file_size for info in info_list])
+    check_sizes(total_size, sum([info.compress_size for info in info_list]), basename(filename))
+
+    file_list = []
+    for info in info_list:
+        path = safe_path(destination, info.filename)
+        if info.is_dir():
+            makedirs(path, exist_ok=True)
+            chmod(path, mode)
+        elif st.S_ISLNK(info.external_attr >> 16):
+            continue  # Symbolic links are not extracted
+        else:
+            file_list.append((info, path))
+
+    for path in set([dirname(path) for _, path in file_list]):
+        makedirs(path, exist_ok=True)
+
+    local = threading.local()
+    handles = []
+
+    def extract(item):
+        info, path = item
+        if not hasattr(local, 'zf'):
+            local.zf = zipfile.ZipFile(filename)
+            handles.append(local.zf)
+        with local.zf.open(info) as src:
+            stream_member(src, path, info.file_size, mode)
+
+    try:
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            list(executor.map(extract, file_list))
+    finally:
+        for zf in handles:
+            zf.close()
+
+    return len(file_list)
+
+
+def unpack_tar(filename, destination, mode=0o777):
+    """
+    Purpose:
+      Extract a (compressed) tar archive as a single stream. Only regular
+      files and folders are extracted
+
+    :return n_files: Number of files extracted
+    """
+
+    n_files = 0
+    total_size = 0
+    archive_size = stat(filename).st_size
+
+    with tarfile.open(filename, mode='r|*') as tar:
+        for tarinfo in tar:
+            path = safe_path(destination, tarinfo.name)
+            if tarinfo.isdir():
+                makedirs(path, exist_ok=True)
+                chmod(path, mode)
+            elif tarinfo.isreg():
+                total_size += tarinfo.size
+                check_sizes(total_size, archive_size, basename(filename))
+                makedirs(dirname(path), exist_ok=True)
+                stream_member(tar.extractfile(tarinfo), path, tarinfo.size, mode)
+                n_files += 1
+
+    return n_files
+
+
+def unpack_archive(filename, destination, mode=0o777, n_threads=8, log=None):
+    """
+    Purpose:
+      Extract an archive into [destination]. Extraction goes to a hidden
+      partial folder that is renamed once complete, so an interrupted
+      extraction is not mistaken for an unpacked archive
+
+    :param filename: Full filename of archive
+    :param destination: Full path of extraction folder
+    :param mode: Mode for extracted folders and files. Default: 0o777
+    :param n_threads: Number of zip members extracted in parallel. Default: 8
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    :return n_files: Number of files extracted. None if skipped
+    """
+
+    if isinstance(log, type(None)):
+        log = log_stdout()
+
+    if exists(destination):
+        log.info(f"Already unpacked : {destination}")
+        return None
+
+    a_type = archive_type(filename)
+    if a_type not in ['zip', 'tar', 'tar-compressed']:
+        log.info(f"Not an archive that can be unpacked : {filename}")
+        return None
+
+    partial = join(dirname(destination), f".{basename(destination)}.partial")
+    if exists(partial):
+        remove_tree(partial)
+    makedirs(partial)
+    chmod(partial, mode)
+
+    log.info(f"Unpacking {basename(filename)} to {destination}")
+    try:
+        if a_type == 'zip':
+            n_files = unpack_zip(filename, partial, mode=mode, n_threads=n_threads)
+        else:
+            n_files = unpack_tar(filename, partial, mode=mode)
+    except Exception:
+        remove_tree(partial)
+        raise
+
+    # Folders created implicitly for members
+    for dir_path, _, _ in walk(partial):
+        chmod(dir_path, mode)
+
+    rename(partial, destination)
+    log.info(f"Unpacked {n_files} files from {basename(filename)}")
+
+    return n_files
+
+
+def unpack(folder_path, curation_dict, n_archives=4, log=None):
+    """
+    Purpose:
+      Extract all archives in ORIGINAL_DATA of a deposit into DATA, with
+      multiple archives extracted in parallel. Each archive is extracted to
+      a folder named after it (e.g., ORIGINAL_DATA/sub/data.zip -> DATA/sub/data)
+
+    :param folder_path: Full path of deposit folder (e.g., 1.ToDo/Name_12345678/v1)
+    :param curation_dict: Dict that contains curation configuration
+    :param n_archives: Number of archives extracted in parallel. Default: 4
+    :param log: logger.LogClass object. Default is stdout via python logging
+
+    :return result_dict: dict mapping archive path (relative to ORIGINAL_DATA)
+            to number of files extracted (None if skipped or failed)
+    """
+
+    if isinstance(log, type(None)):
+        log = log_stdout()
+
+    data_path = join(folder_path, curation_dict['folder_data'])
+    copy_data_path = join(folder_path, curation_dict['folder_copy_data'])
+
+    archive_list = []
+    for dir_path, _, filenames in walk(data_path):
+        for filename in sorted(filenames):
+            if filename.lower().endswith(strip_extensions):
+                archive_list.append(relpath(join(dir_path, filename), data_path))
+
+    def unpack_one(path):
+        name = path
+        for extension in strip_extensions:
+            if name.lower().endswith(extension):
+                name = name[:-len(extension)]
+                break
+        destination = join(copy_data_path, name)
+        makedirs(dirname(destination), exist_ok=True)
+        try:
+            return unpack_archive(join(data_path, path), destination, log=log)
+        except Exception as err:
+            # e.g., unsafe paths, zip bombs, corrupt archives, unsupported
+            # compression (NotImplementedError) or encryption (RuntimeError)
+            log.warn(f"Unable to unpack {path} : {err!r}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=n_archives) as executor:
+        result_list = list(executor.map(unpack_one, archive_list))
+
+    return dict(zip(archive_list, result_list))
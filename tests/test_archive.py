@@ -0,0 +1,91 @@
+from os.path import join, exists
+from os import makedirs, listdir
+import tarfile
+
+from ldcoolp.admin import archive
+from ldcoolp.admin.move import MoveClass
+
+from .test_move import make_curation_dict
+
+
+def test_package(tmp_path):
+    source = join(tmp_path, 'v1')
+    makedirs(join(source, 'ORIGINAL_DATA', 'subfolder'))
+    content_dict = {join('ORIGINAL_DATA', 'file1.bin'): bytes(range(256)) * 100,
+                    join('ORIGINAL_DATA', 'subfolder', 'file2.txt'): b'file2',
+                    join('ORIGINAL_DATA', 'empty.txt'): b''}
+    for filename, content in content_dict.items():
+        with open(join(source, filename), 'wb') as f:
+            f.write(content)
+
+    filename = join(tmp_path, 'v1.tar.gz')
+    index_dict = archive.package(source, filename, block_size=1000, n_threads=2)
+    assert len(index_dict['blocks']) > 10
+
+    # Readable as a standard tar.gz
+    with tarfile.open(filename, 'r:gz') as tar:
+        assert tar.extractfile(join('v1', 'ORIGINAL_DATA', 'subfolder', 'file2.txt')).read() == \
+            b'file2'
+
+    for name, content in content_dict.items():
+        assert archive.read_member(filename, join('v1', name)) == content
+        assert archive.read_member(filename, join('v1', name), index_dict=index_dict) == content
+
+
+def test_move_to_publish(tmp_path):
+    curation_dict = make_curation_dict(tmp_path)
+    curation_dict['archive_path'] = join(tmp_path, 'archive')
+    makedirs(curation_dict['archive_path'])
+    makedirs(join(tmp_path, '3.Reviewed', 'Name_12345678', 'v1', 'ORIGINAL_DATA'))
+
+    mc = MoveClass(curation_dict=curation_dict)
+    mc.move_to_publish('Name_12345678/v1')
+
+    assert exists(join(tmp_path, 'archive', 'Name_12345678_v1.tar.gz'))
+    assert exists(join(tmp_path, 'archive', 'Name_12345678_v1.tar.gz.index.json'))
+
+    # Top folder identifies the deposit
+    with tarfile.open(join(tmp_path, 'archive', 'Name_12345678_v1.tar.gz'), 'r:gz') as tar:
+        assert tar.getnames() == [join('Name_12345678', 'v1'),
+                                  join('Name_12345678', 'v1', 'ORIGINAL_DATA')]
+
+
+def test_package_error(tmp_path, monkeypatch):
+    source = join(tmp_path, 'v1')
+    makedirs(source)
+    makedirs(join(tmp_path, 'archive'))
+
+    def fail(self):
+        raise OSError('Disk failure')
+
+    monkeypatch.setattr(archive.BlockWriter, 'close', fail)
+    try:
+        archive.package(source, join(tmp_path, 'archive', 'v1.tar.gz'))
+        assert False
+    except OSError:
+        pass
+    assert listdir(join(tmp_path, 'archive')) == []
+
+
+def test_batch_move_to_publish(tmp_path):
+    curation_dict = make_curation_dict(tmp_path)
+    makedirs(join(tmp_path, '3.Reviewed', 'Name_12345678', 'v1', 'ORIGINAL_DATA'))
+    makedirs(join(tmp_path, '3.Reviewed', 'Name_87654321', 'v1', 'ORIGINAL_DATA'))
+
+    # Missing archive folder: nothing is published
+    curation_dict['archive_path'] = join(tmp_path, 'archive')
+    mc = MoveClass(curation_dict=curation_dict)
+    result_list = mc.batch_move([('Name_12345678/v1', 'publish')])
+    assert result_list[0]['status'] == 'failed'
+    mc.move_to_publish('Name_87654321/v1')
+    assert exists(join(tmp_path, '3.Reviewed', 'Name_12345678', 'v1'))
+    assert exists(join(tmp_path, '3.Reviewed', 'Name_87654321', 'v1'))
+
+    makedirs(curation_dict['archive_path'])
+    result_list = mc.batch_move([('Name_12345678/v1', 'publish'),
+                                 ('Name_87654321/v1', 'next')])
+    assert [result['status'] for result in result_list] == ['moved', 'moved']
+
+    for name in ['Name_12345678_v1', 'Name_87654321_v1']:
+        assert exists(join(tmp_path, 'archive', f"{name}.tar.gz"))
+        assert exists(join(tmp_path, 'archive', f"{name}.tar.gz.index.json"))
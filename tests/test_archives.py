@@ -0,0 +1,50 @@
+from os.path import join
+from os import makedirs
+import tarfile
+import zipfile
+
+from ldcoolp.curation.inspection import archives
+
+
+def test_ArchiveInspector(tmp_path):
+    folder_path = join(tmp_path, 'Name_12345678', 'v1')
+    data_path = join(folder_path, 'ORIGINAL_DATA')
+    makedirs(data_path)
+
+    with zipfile.ZipFile(join(data_path, 'data.zip'), 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('table.csv', 'a,b\n' * 1000)
+        zf.writestr('nested/inner.tar.gz', b'not read')
+
+    with open(join(tmp_path, 'file.txt'), 'w') as f:
+        f.write('content')
+    for mode, filename in [('w', 'data.tar'), ('w:gz', 'data.tar.gz')]:
+        with tarfile.open(join(data_path, filename), mode) as tar:
+            tar.add(join(tmp_path, 'file.txt'), arcname='file.txt')
+
+    with open(join(data_path, 'notes.txt'), 'w') as f:
+        f.write('not an archive')
+    with zipfile.ZipFile(join(data_path, 'document.docx'), 'w') as zf:
+        zf.writestr('word/document.xml', '<document/>')
+        zf.writestr('[Content_Types].xml', '<Types/>')
+
+    curation_dict = {'folder_data': 'ORIGINAL_DATA', 'folder_ual_rdm': 'UAL_RDM',
+                     'archive_list_compressed': False}
+    result_dict = archives.inspect(folder_path, curation_dict)
+
+    assert sorted(result_dict) == ['data.tar', 'data.tar.gz', 'data.zip']
+    assert result_dict['data.zip']['n_files'] == 2
+    assert result_dict['data.zip']['total_size'] == 4008
+    assert [member['nested'] for member in result_dict['data.zip']['members']] == [False, True]
+    assert result_dict['data.tar']['members'][0]['size'] == 7
+    assert result_dict['data.tar.gz']['type'] == 'tar-compressed'
+    assert result_dict['data.tar.gz']['members'] is None
+
+    # Cached listing
+    ai = archives.ArchiveInspector(folder_path, curation_dict)
+    ai.load()
+    assert ai.cache['data.zip']['archive']['n_files'] == 2
+
+    # Compressed tar archives are listed once enabled
+    curation_dict['archive_list_compressed'] = True
+    result_dict = archives.inspect(folder_path, curation_dict)
+    assert result_dict['data.tar.gz']['members'][0]['size'] == 7
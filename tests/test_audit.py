@@ -0,0 +1,54 @@
+from os.path import join
+from os import makedirs, remove, utime, stat
+
+from ldcoolp.admin.audit import AuditClass
+
+from .test_move import make_curation_dict
+
+
+def test_AuditClass(tmp_path):
+    curation_dict = make_curation_dict(tmp_path)
+    curation_dict.update({'audit_file': '.fixity_audit.sqlite', 'audit_stages': '4.Published',
+                          'audit_rate': '1000', 'audit_duration': '60', 'audit_cycle': '0'})
+
+    data_path = join(tmp_path, '4.Published', 'Name_12345678', 'v1', 'ORIGINAL_DATA')
+    makedirs(data_path)
+    for filename in ['file1.txt', 'file2.txt', 'file3.txt']:
+        with open(join(data_path, filename), 'w') as f:
+            f.write(filename)
+
+    # New files are checksummed within the I/O budget, oldest first
+    for ii, filename in enumerate(['file3.txt', 'file2.txt', 'file1.txt']):
+        utime(join(data_path, filename), ns=(ii * 10**9, ii * 10**9))
+    ac = AuditClass(curation_dict=curation_dict)
+    ac.duration = 0
+    summary_dict = ac.main()
+    assert summary_dict['new'] == 1
+    assert summary_dict['deferred'] == 2
+    assert ac.db.execute("SELECT path FROM files").fetchall() == \
+        [(join('4.Published', 'Name_12345678', 'v1', 'ORIGINAL_DATA', 'file3.txt'),)]
+
+    ac.duration = 3600
+    assert ac.main()['new'] == 2
+
+    # Silent corruption: content changed with the same stat signature
+    file_stat = stat(join(data_path, 'file1.txt'))
+    with open(join(data_path, 'file1.txt'), 'w') as f:
+        f.write('fileX.txt')
+    utime(join(data_path, 'file1.txt'), ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns))
+
+    remove(join(data_path, 'file3.txt'))
+
+    summary_dict = ac.main()
+    assert summary_dict['corrupt'] == 1
+    assert summary_dict['ok'] == 1
+    assert summary_dict['missing'] == 1
+
+    # Changed stat signature is checksummed right away
+    with open(join(data_path, 'file2.txt'), 'a') as f:
+        f.write(' changed')
+    ac.cycle = 3600
+    summary_dict = ac.main()
+    assert summary_dict['new'] == 1
+    assert summary_dict['ok'] == 0
+    ac.close()
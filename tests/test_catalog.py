@@ -0,0 +1,25 @@
+from os.path import join, exists
+from multiprocessing import get_context
+
+from ldcoolp.admin.catalog import CatalogClass
+
+
+def update_catalog(args):
+    root_directory, worker = args
+    catalog = CatalogClass(root_directory)
+    for ii in range(20):
+        catalog.update(f"Name_{worker}{ii:04d}/v1", '1.ToDo')
+
+
+def test_update_many(tmp_path):
+    # Concurrent updates from several processes are all kept
+    with get_context('fork').Pool(4) as pool:
+        pool.map(update_catalog, [(str(tmp_path), worker) for worker in range(4)])
+
+    catalog = CatalogClass(str(tmp_path))
+    assert len(catalog.deposits) == 80
+    assert catalog.deposits['Name_30019/v1'] == {'stage': '1.ToDo', 'version': 1}
+
+    catalog.update('Name_30019/v1', None)
+    assert len(CatalogClass(str(tmp_path)).deposits) == 79
+    assert exists(join(tmp_path, ".locks", ".catalog.lock"))
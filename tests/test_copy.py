@@ -0,0 +1,141 @@
+from os.path import join, exists
+from os import makedirs, chmod, stat, listdir
+import shutil
+
+from ldcoolp.admin import copy
+
+
+def test_clone(tmp_path):
+    source = join(tmp_path, 'source.txt')
+    with open(source, 'w') as f:
+        f.write('test content')
+
+    for hardlink in [True, False]:
+        destination = join(tmp_path, f'destination_{hardlink}.txt')
+        method = copy.clone(source, destination, hardlink=hardlink)
+
+        assert method in ['hardlink', 'reflink', 'copy']
+        if not hardlink:
+            assert method != 'hardlink'
+
+        with open(destination, 'r') as f:
+            assert f.read() == 'test content'
+
+
+def test_copy_tree(tmp_path):
+    source = join(tmp_path, 'source')
+    makedirs(join(source, 'ORIGINAL_DATA', 'subfolder'))
+    for filename in ['file1.txt', join('subfolder', 'file2.txt')]:
+        with open(join(source, 'ORIGINAL_DATA', filename), 'w') as f:
+            f.write(filename)
+    chmod(join(source, 'ORIGINAL_DATA'), 0o555)
+
+    destination = join(tmp_path, 'destination')
+    n_files = copy.copy_tree(source, destination, compare=True)
+
+    assert n_files == 2
+    with open(join(destination, 'ORIGINAL_DATA', 'subfolder', 'file2.txt')) as f:
+        assert f.read() == join('subfolder', 'file2.txt')
+    assert stat(join(destination, 'ORIGINAL_DATA')).st_mode & 0o777 == 0o555
+
+    chmod(join(source, 'ORIGINAL_DATA'), 0o755)
+    chmod(join(destination, 'ORIGINAL_DATA'), 0o755)
+
+
+def test_fast_copy(tmp_path):
+    source = join(tmp_path, 'source.txt')
+    with open(source, 'wb') as f:
+        f.write(b'0123456789' * 1000)
+
+    destination = join(tmp_path, 'destination.txt')
+    assert copy.fast_copy(source, destination) in ['reflink', 'copy_file_range', 'copy']
+    assert copy.file_checksum(destination) == copy.file_checksum(source)
+
+
+def test_move_tree(tmp_path):
+    source = join(tmp_path, 'source', 'v1')
+    makedirs(join(source, 'ORIGINAL_DATA'))
+    for filename in ['file1.txt', 'file2.txt']:
+        with open(join(source, 'ORIGINAL_DATA', filename), 'w') as f:
+            f.write(filename)
+    chmod(join(source, 'ORIGINAL_DATA'), 0o555)
+
+    # Interrupted move with one complete and one truncated file
+    partial = join(tmp_path, 'destination', '.v1.partial')
+    makedirs(join(partial, 'ORIGINAL_DATA'))
+    with open(join(partial, 'ORIGINAL_DATA', 'file1.txt'), 'w') as f:
+        f.write('file1.txt')
+    with open(join(partial, 'ORIGINAL_DATA', 'file2.txt'), 'w') as f:
+        f.write('file')
+
+    destination = join(tmp_path, 'destination', 'v1')
+    assert copy.move_tree(source, destination) == 2
+
+    assert not exists(source)
+    assert not exists(partial)
+    with open(join(destination, 'ORIGINAL_DATA', 'file2.txt')) as f:
+        assert f.read() == 'file2.txt'
+    assert stat(join(destination, 'ORIGINAL_DATA')).st_mode & 0o777 == 0o555
+
+    chmod(join(destination, 'ORIGINAL_DATA'), 0o755)
+
+    # Interrupted after the destination was put in place: source is removed
+    # once the destination is verified against it
+    copy.copy_tree(destination, source)
+    assert copy.move_tree(source, destination) == 0
+    assert not exists(source)
+
+    # Interrupted while removing the source
+    trash = join(tmp_path, 'source', '.v1.moved')
+    copy.copy_tree(destination, trash)
+    assert copy.move_tree(source, destination) == 0
+    assert not exists(trash)
+
+    # Destination that differs from the source is not overwritten
+    copy.copy_tree(destination, source)
+    with open(join(destination, 'ORIGINAL_DATA', 'file2.txt'), 'w') as f:
+        f.write('changed')
+    try:
+        copy.move_tree(source, destination)
+        assert False
+    except FileExistsError:
+        assert exists(source)
+
+
+def test_populate_tree(tmp_path):
+    source = join(tmp_path, 'ORIGINAL_DATA')
+    makedirs(join(source, 'subfolder'))
+    for filename in ['README.txt', join('subfolder', 'file1.txt')]:
+        with open(join(source, filename), 'w') as f:
+            f.write(filename)
+        chmod(join(source, filename), 0o444)
+
+    destination = join(tmp_path, 'DATA')
+    makedirs(destination)
+    with open(join(destination, 'README.txt'), 'w') as f:
+        f.write('curated README')
+
+    method_dict = copy.populate_tree(source, destination)
+    assert method_dict['exists'] == 1
+    assert sum(method_dict.values()) == 2
+
+    # Working copy is writable and independent of ORIGINAL_DATA
+    with open(join(destination, 'subfolder', 'file1.txt'), 'a') as f:
+        f.write(' changed')
+    with open(join(source, 'subfolder', 'file1.txt')) as f:
+        assert f.read() == join('subfolder', 'file1.txt')
+    with open(join(destination, 'README.txt')) as f:
+        assert f.read() == 'curated README'
+
+
+def test_supports_reflink(tmp_path, monkeypatch):
+    def unsupported(source, destination):
+        raise OSError('Operation not supported')
+
+    monkeypatch.setattr(copy, 'reflink', unsupported)
+    assert not copy.supports_reflink(str(tmp_path))
+    assert listdir(tmp_path) == []
+
+    monkeypatch.setattr(copy, 'reflink', shutil.copyfile)
+    assert copy.supports_reflink(str(tmp_path))
+    assert listdir(tmp_path) == []
@@ -0,0 +1,29 @@
+from os.path import join, exists
+from os import makedirs, link
+
+from ldcoolp.curation.inspection import duplicates
+
+
+def test_find_duplicates(tmp_path):
+    data_path = join(tmp_path, 'ORIGINAL_DATA')
+    makedirs(join(data_path, 'subfolder'))
+
+    large = bytes(range(256)) * 1024  # Larger than 2 * sample_size
+    large_diff = large[:100000] + b'X' + large[100001:]  # Same size, head and tail
+    content_dict = {'a.bin': large, join('subfolder', 'b.bin'): large, 'c.bin': large_diff,
+                    'small1.txt': b'small', 'small2.txt': b'small', 'other.txt': b'other',
+                    'empty1.txt': b'', 'empty2.txt': b''}
+    for filename, content in content_dict.items():
+        with open(join(data_path, filename), 'wb') as f:
+            f.write(content)
+    link(join(data_path, 'a.bin'), join(data_path, 'hardlink.bin'))
+
+    duplicate_list = duplicates.find_duplicates(data_path, n_threads=2)
+    assert len(duplicate_list) == 2
+    assert duplicate_list[0][0] == len(large)
+    assert len(duplicate_list[0][1]) == 2
+    assert join('subfolder', 'b.bin') in duplicate_list[0][1]
+    assert duplicate_list[1] == (5, ['small1.txt', 'small2.txt'])
+
+    report_file = duplicates.write_report(duplicate_list, join(tmp_path, 'UAL_RDM'))
+    assert exists(report_file)
@@ -0,0 +1,39 @@
+from os.path import join, exists
+from os import makedirs
+import hashlib
+
+from ldcoolp.admin import fixity
+
+from .test_move import make_curation_dict
+
+
+def test_file_digests(tmp_path):
+    filename = join(tmp_path, 'file.txt')
+    content = b'0123456789' * 1000
+    with open(filename, 'wb') as f:
+        f.write(content)
+
+    digests = fixity.file_digests(filename, blocksize=4096)
+    assert digests['md5'] == hashlib.md5(content).hexdigest()
+    assert digests['sha256'] == hashlib.sha256(content).hexdigest()
+
+
+def test_FixityClass(tmp_path):
+    curation_dict = make_curation_dict(tmp_path)
+    curation_dict.update({'folder_data': 'ORIGINAL_DATA', 'folder_ual_rdm': 'UAL_RDM'})
+
+    data_path = join(tmp_path, '4.Published', 'Name_12345678', 'v1', 'ORIGINAL_DATA')
+    makedirs(join(data_path, 'subfolder'))
+    for filename in ['file1.txt', join('subfolder', 'file 2.txt')]:
+        with open(join(data_path, filename), 'w') as f:
+            f.write(filename)
+
+    fc = fixity.FixityClass(curation_dict=curation_dict, n_processes=2)
+    assert fc.main('4.Published') == 2
+
+    out_path = join(tmp_path, '4.Published', 'Name_12345678', 'v1', 'UAL_RDM')
+    assert exists(join(out_path, 'manifest-md5.txt'))
+
+    manifest_dict = fixity.read_manifest(join(out_path, 'manifest-sha256.txt'))
+    assert manifest_dict[join('ORIGINAL_DATA', 'subfolder', 'file 2.txt')] == \
+        hashlib.sha256(join('subfolder', 'file 2.txt').encode()).hexdigest()
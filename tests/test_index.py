@@ -0,0 +1,56 @@
+from os.path import join
+from os import makedirs
+import zipfile
+
+from ldcoolp.curation.inspection import index
+
+
+def test_ContentIndex(tmp_path):
+    folder_path = join(tmp_path, 'Name_12345678', 'v1')
+    data_path = join(folder_path, 'DATA')
+    makedirs(join(data_path, 'images'))
+
+    content_dict = {'README.txt': 'Read me\n'.encode(),
+                    'table.dat': 'a,b\n1,2\n'.encode(),
+                    join('images', 'image.jpg'): b'\x89PNG\r\n\x1a\n' + bytes(100),
+                    join('images', 'image2.png'): b'\x89PNG\r\n\x1a\n' + bytes(50),
+                    'data.bin': bytes(range(256))}
+    for filename, content in content_dict.items():
+        with open(join(data_path, filename), 'wb') as f:
+            f.write(content)
+    with zipfile.ZipFile(join(data_path, 'document.docx'), 'w') as zf:
+        zf.writestr('[Content_Types].xml', '<Types/>')
+    # [Content_Types].xml is not required to be the first member
+    with zipfile.ZipFile(join(data_path, 'table.xlsx'), 'w') as zf:
+        zf.writestr('_rels/.rels', '<Relationships/>')
+        zf.writestr('[Content_Types].xml', '<Types/>')
+
+    curation_dict = {'folder_copy_data': 'DATA', 'folder_ual_rdm': 'UAL_RDM'}
+    ci = index.ContentIndex(folder_path, curation_dict)
+    format_df, folder_df = ci.main()
+
+    assert format_df.loc['PNG', 'n_files'] == 2
+    assert format_df.loc['PNG', 'size'] == 166
+    assert format_df.loc['text', 'n_files'] == 2
+    assert format_df.loc['MS-Office (OOXML)', 'n_files'] == 2
+    assert format_df.loc['binary', 'n_files'] == 1
+    assert folder_df.loc[('images', 'PNG'), 'n_files'] == 2
+
+    # Only changed files are read again
+    with open(join(data_path, 'table.dat'), 'wb') as f:
+        f.write(bytes(10))
+    ci = index.ContentIndex(folder_path, curation_dict)
+    format_df, _ = ci.main()
+    assert ci.n_identified == 1
+    assert format_df.loc['binary', 'n_files'] == 2
+
+
+def test_identify(tmp_path):
+    filename = join(tmp_path, 'library.jar')
+    with zipfile.ZipFile(filename, 'w') as zf:
+        zf.writestr('META-INF/MANIFEST.MF', 'Manifest-Version: 1.0\n')
+    assert index.identify(filename) == 'Java archive'
+
+    with zipfile.ZipFile(filename, 'w') as zf:
+        zf.writestr('table.csv', 'a,b\n')
+    assert index.identify(filename) == 'zip'
@@ -0,0 +1,36 @@
+from os.path import join
+from os import makedirs
+
+from ldcoolp.admin.inventory import InventoryClass, summarize
+
+from .test_move import make_curation_dict
+
+
+def test_InventoryClass(tmp_path):
+    curation_dict = make_curation_dict(tmp_path)
+    for stage, depositor_name in [('1.ToDo', 'Name_11111111/v1'),
+                                  ('4.Published', 'Name_22222222/v1')]:
+        makedirs(join(tmp_path, stage, depositor_name, 'ORIGINAL_DATA'))
+        with open(join(tmp_path, stage, depositor_name, 'ORIGINAL_DATA', 'file.txt'), 'w') as f:
+            f.write('0123456789')
+
+    ic = InventoryClass(curation_dict=curation_dict)
+    inventory_df = ic.main()
+
+    assert inventory_df['depositor_name'].tolist() == ['Name_11111111/v1', 'Name_22222222/v1']
+    assert inventory_df['size'].tolist() == [10, 10]
+    assert inventory_df['n_files'].tolist() == [1, 1]
+    assert ic.n_scanned == 4
+
+    # Re-run only re-lists changed folders
+    with open(join(tmp_path, '1.ToDo', 'Name_11111111/v1', 'ORIGINAL_DATA', 'file2.txt'), 'w') as f:
+        f.write('01234')
+
+    inventory_df = InventoryClass(curation_dict=curation_dict).main()
+    assert inventory_df['size'].tolist() == [15, 10]
+
+    ic = InventoryClass(curation_dict=curation_dict)
+    ic.main()
+    assert ic.n_scanned == 0
+
+    assert summarize(inventory_df).loc['1.ToDo', 'n_files'] == 2
@@ -0,0 +1,74 @@
+from os.path import join
+import fcntl
+from concurrent.futures import ThreadPoolExecutor
+
+from ldcoolp.admin.lock import DepositLock, get_lock_root
+
+
+def test_DepositLock(tmp_path):
+    lock = DepositLock(str(tmp_path), 'Name_12345678/v1', operation='test', timeout=0)
+    assert lock.filename == join(tmp_path, '.locks', 'Name_12345678.v1.lock')
+
+    with lock:
+        assert lock.holder()['operation'] == 'test'
+
+        # Reentrant within a process
+        with DepositLock(str(tmp_path), 'Name_12345678/v1', timeout=0):
+            pass
+        with DepositLock(str(tmp_path), 'Name_12345678/v1', shared=True, timeout=0):
+            pass
+
+        # Lock held for another process (separate open file)
+        with open(lock.filename) as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+                assert False
+            except BlockingIOError:
+                pass
+
+    # Another process holds a shared lock
+    with open(lock.filename) as f:
+        fcntl.flock(f, fcntl.LOCK_SH)
+
+        with DepositLock(str(tmp_path), 'Name_12345678/v1', shared=True, timeout=0):
+            pass
+
+        try:
+            lock.acquire()
+            assert False
+        except TimeoutError:
+            pass
+
+
+def test_DepositLock_threads(tmp_path):
+    lock = DepositLock(str(tmp_path), 'Name_12345678/v1', shared=True, timeout=0)
+
+    def acquire(shared):
+        try:
+            with DepositLock(str(tmp_path), 'Name_12345678/v1', shared=shared, timeout=0):
+                return True
+        except TimeoutError:
+            return False
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with lock:
+            # Another thread can share but not take or upgrade to an exclusive lock
+            assert executor.submit(acquire, True).result()
+            assert not executor.submit(acquire, False).result()
+
+            # This thread can upgrade its shared lock
+            with DepositLock(str(tmp_path), 'Name_12345678/v1', timeout=0):
+                assert not executor.submit(acquire, True).result()
+            assert executor.submit(acquire, True).result()
+
+        assert executor.submit(acquire, False).result()
+
+
+def test_get_lock_root():
+    curation_dict = {'local_path': '/curation', 'remote_path': '/mnt/curation',
+                     'scratch_path': '/scratch', 'source': 'remote',
+                     'parent_dir': 'remote_path'}
+    assert get_lock_root(curation_dict) == '/mnt/curation'
+
+    # Set-up on local scratch disk locks on the curation server
+    assert get_lock_root({**curation_dict, 'parent_dir': 'scratch_path'}) == '/mnt/curation'
@@ -0,0 +1,115 @@
+from os.path import join, exists
+from os import makedirs
+
+from ldcoolp.admin.move import MoveClass
+
+stages = ['1.ToDo', '2.UnderReview', '3.Reviewed', '4.Published', '5.Rejected']
+
+
+def make_curation_dict(root_directory):
+    curation_dict = {'local_path': str(root_directory), 'parent_dir': 'local_path',
+                     'catalog_file': '.stage_catalog.json', 'folder_locks': '.locks',
+                     'inventory_file': '.inventory_cache.json', 'archive_path': ''}
+    for key, stage in zip(['folder_todo', 'folder_underreview', 'folder_reviewed',
+                           'folder_published', 'folder_rejected'], stages):
+        curation_dict[key] = stage
+        makedirs(join(root_directory, stage))
+
+    return curation_dict
+
+
+def test_MoveClass(tmp_path):
+    curation_dict = make_curation_dict(tmp_path)
+    makedirs(join(tmp_path, '4.Published', 'Name_12345678', 'v1'))
+    makedirs(join(tmp_path, '1.ToDo', 'Name_12345678', 'v2'))
+
+    mc = MoveClass(curation_dict=curation_dict)
+
+    assert mc.get_source_stage('Name_12345678/v2') == '1.ToDo'
+    assert mc.get_previous_versions('Name_12345678/v2') == \
+        [join(tmp_path, '4.Published', 'Name_12345678', 'v1')]
+
+    mc.move_to_next('Name_12345678/v2')
+    assert exists(join(tmp_path, '2.UnderReview', 'Name_12345678', 'v2'))
+    assert not exists(join(tmp_path, '1.ToDo', 'Name_12345678'))
+    assert mc.get_source_stage('Name_12345678/v2') == '2.UnderReview'
+
+    assert mc.list_stage('2.UnderReview') == ['Name_12345678/v2']
+    assert mc.list_stage('4.Published') == ['Name_12345678/v1']
+
+    # Catalog is persistent
+    assert MoveClass(curation_dict=curation_dict).catalog.lookup('Name_12345678/v2') == \
+        '2.UnderReview'
+
+    try:
+        mc.get_source_stage('Unknown_87654321/v1', verbose=False)
+        assert False
+    except FileNotFoundError:
+        pass
+
+    # Catalogued deposit that also exists in another stage
+    makedirs(join(tmp_path, '5.Rejected', 'Name_12345678', 'v2'))
+    try:
+        mc.get_source_stage('Name_12345678/v2', verbose=False)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_get_previous_versions(tmp_path):
+    curation_dict = make_curation_dict(tmp_path)
+    makedirs(join(tmp_path, '4.Published', 'Name_12345678', 'v1'))
+    makedirs(join(tmp_path, '1.ToDo', 'Name_12345678', 'v3'))
+    makedirs(join(tmp_path, '1.ToDo', 'Name_87654321', 'v1'))
+
+    mc = MoveClass(curation_dict=curation_dict)
+    assert mc.get_previous_versions('Name_12345678/v3') == \
+        [join(tmp_path, '4.Published', 'Name_12345678', 'v1')]
+
+    # Versions added or moved since the catalog was built, most recent first
+    makedirs(join(tmp_path, '5.Rejected', 'Name_12345678', 'v2'))
+    mc.move_to_next('Name_12345678/v3')
+    assert mc.get_previous_versions('Name_12345678/v3') == \
+        [join(tmp_path, '5.Rejected', 'Name_12345678', 'v2'),
+         join(tmp_path, '4.Published', 'Name_12345678', 'v1')]
+
+    assert mc.get_previous_versions('Name_87654321/v1') == []
+
+
+def test_MoveClass_resume(tmp_path):
+    curation_dict = make_curation_dict(tmp_path)
+    mc = MoveClass(curation_dict=curation_dict)
+
+    # Cross-device move interrupted after the destination was in place and
+    # the source was set aside
+    makedirs(join(tmp_path, '2.UnderReview', 'Name_12345678', 'v1', 'ORIGINAL_DATA'))
+    makedirs(join(tmp_path, '1.ToDo', 'Name_12345678', '.v1.moved', 'ORIGINAL_DATA'))
+
+    mc.main('Name_12345678/v1', '1.ToDo', '2.UnderReview')
+    assert not exists(join(tmp_path, '1.ToDo', 'Name_12345678'))
+    assert exists(join(tmp_path, '2.UnderReview', 'Name_12345678', 'v1', 'ORIGINAL_DATA'))
+    assert mc.catalog.lookup('Name_12345678/v1') == '2.UnderReview'
+
+
+def test_batch_move(tmp_path):
+    curation_dict = make_curation_dict(tmp_path)
+    makedirs(join(tmp_path, '1.ToDo', 'Name_11111111', 'v1'))
+    makedirs(join(tmp_path, '2.UnderReview', 'Name_22222222', 'v1'))
+    makedirs(join(tmp_path, '4.Published', 'Name_33333333', 'v1'))
+
+    mc = MoveClass(curation_dict=curation_dict)
+
+    result_list = mc.batch_move([('Name_11111111/v1', 'next'),
+                                 ('Name_22222222/v1', 'publish'),
+                                 ('Name_33333333/v1', 'next'),
+                                 ('Unknown_87654321/v1', 'next'),
+                                 ('Name_11111111/v1', 'next')])
+
+    assert [result['status'] for result in result_list] == \
+        ['moved', 'moved', 'skipped', 'skipped', 'skipped']
+    assert result_list[-1]['message'] == 'Duplicate entry'
+    assert exists(join(tmp_path, '2.UnderReview', 'Name_11111111', 'v1'))
+    assert exists(join(tmp_path, '4.Published', 'Name_22222222', 'v1'))
+    assert not exists(join(tmp_path, '2.UnderReview', 'Name_22222222'))
+    assert mc.list_stage('4.Published') == ['Name_22222222/v1', 'Name_33333333/v1']
+    assert mc.catalog.lookup('Name_11111111/v1') == '2.UnderReview'
@@ -0,0 +1,23 @@
+from os.path import join
+from os import makedirs, stat, symlink
+
+from ldcoolp.admin import permissions
+
+
+def test_curation(tmp_path):
+    makedirs(join(tmp_path, 'folder1', 'subfolder'))
+    makedirs(join(tmp_path, 'folder2'))
+    for filename in ['file.txt', join('folder1', 'subfolder', 'file.txt')]:
+        with open(join(tmp_path, filename), 'w') as f:
+            f.write('test')
+    symlink(join(tmp_path, 'file.txt'), join(tmp_path, 'folder2', 'link.txt'))
+
+    # Parent, 3 folders and 2 files
+    assert permissions.curation(str(tmp_path), mode=0o777) == 6
+    assert stat(join(tmp_path, 'folder1', 'subfolder', 'file.txt')).st_mode & 0o777 == 0o777
+
+    # Nothing to change
+    assert permissions.curation(str(tmp_path), mode=0o777) == 0
+
+    # Single file
+    assert permissions.curation(join(tmp_path, 'file.txt'), mode=0o644) == 1
@@ -0,0 +1,355 @@
+from os.path import join, exists
+from os import listdir, stat, utime
+from pathlib import Path
+from http.client import IncompleteRead
+from urllib.error import HTTPError
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Thread
+import hashlib
+import zipfile
+import errno
+
+import pytest
+
+from ldcoolp.admin.move import MoveClass
+from ldcoolp.admin.fixity import write_manifest
+from ldcoolp.curation import retrieve
+
+from .test_move import make_curation_dict
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serve server.content with byte ranges. The first server.n_truncate
+    responses are cut short and server.status is returned as an error"""
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.headers.get('Range'))
+        if server.status:
+            self.send_error(server.status)
+            return
+
+        body = server.content
+        byte_range = self.headers.get('Range')
+        if byte_range and server.ranges:
+            start, end = [int(value) for value in byte_range[6:].split('-')]
+            body = server.content[start:end + 1]
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{end}/{len(server.content)}")
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        if server.n_truncate > 0:
+            server.n_truncate -= 1
+            body = body[:len(body) // 2]
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    server.content = bytes(range(256)) * 400
+    server.requests = []
+    server.n_truncate = 0
+    server.status = None
+    server.ranges = True
+    server.url = f"http://127.0.0.1:{server.server_port}/file.bin"
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_file_list(n_files, size):
+    content = b'x' * size
+    return [{'name': f'file{i}.txt', 'size': size,
+             'computed_md5': hashlib.md5(content).hexdigest()}
+            for i in range(n_files)], content
+
+
+def test_select_mode():
+    file_list, _ = make_file_list(200, 10)
+    assert retrieve.select_mode(file_list) == 'bundle'
+
+    file_list, _ = make_file_list(5, 10)
+    assert retrieve.select_mode(file_list) == 'file'
+
+    file_list, _ = make_file_list(200, 10)
+    assert retrieve.select_mode(file_list, max_median_size=5) == 'file'
+
+
+def test_bundle_retrieve(tmp_path):
+    file_list, content = make_file_list(3, 100)
+    file_list[-1]['computed_md5'] = 'bad checksum'
+
+    archive = join(tmp_path, 'bundle.zip')
+    with zipfile.ZipFile(archive, 'w') as zf:
+        for file_dict in file_list:
+            zf.writestr(file_dict['name'], content)
+
+    dir_path = join(tmp_path, 'ORIGINAL_DATA')
+    Path(dir_path).mkdir()
+
+    remaining_list = retrieve.bundle_retrieve(Path(archive).as_uri(), file_list,
+                                              dir_path, mode=0o444)
+
+    assert remaining_list == [file_list[-1]]
+    assert exists(join(dir_path, 'file0.txt'))
+    assert not exists(join(dir_path, 'file2.txt'))
+    assert sorted(listdir(dir_path)) == ['file0.txt', 'file1.txt']
+    assert stat(join(dir_path, 'file0.txt')).st_mode & 0o777 == 0o444
+
+
+def test_bundle_retrieve_error(tmp_path, monkeypatch):
+    file_list, content = make_file_list(1, 100)
+
+    archive = join(tmp_path, 'bundle.zip')
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr(file_list[0]['name'], content)
+
+    dir_path = join(tmp_path, 'ORIGINAL_DATA')
+    Path(dir_path).mkdir()
+
+    # Error creating the partial file is raised as is
+    def no_space(filename, *args, **kwargs):
+        raise OSError(errno.ENOSPC, 'No space left on device', filename)
+
+    monkeypatch.setattr(retrieve, 'open', no_space, raising=False)
+    with pytest.raises(OSError) as excinfo:
+        retrieve.bundle_retrieve(Path(archive).as_uri(), file_list, dir_path)
+    assert excinfo.value.errno == errno.ENOSPC
+    assert listdir(dir_path) == []
+
+
+def test_check_disk_space(tmp_path):
+    retrieve.check_disk_space(join(tmp_path, 'new_folder'), 0)
+
+    try:
+        retrieve.check_disk_space(join(tmp_path, 'new_folder'), 1024 ** 6)
+        assert False
+    except OSError as error:
+        assert error.errno == errno.ENOSPC
+
+
+def test_private_file_retrieve(tmp_path, http_server):
+    content = http_server.content
+    md5 = hashlib.md5(content).hexdigest()
+    filename = join(tmp_path, 'file.bin')
+
+    # Interrupted transfer: no file is left under its final name
+    http_server.n_truncate = 1
+    with pytest.raises((IncompleteRead, ValueError)):
+        retrieve.private_file_retrieve(http_server.url, filename, size=len(content), md5=md5)
+    assert listdir(tmp_path) == []
+
+    # Checksum mismatch
+    with pytest.raises(ValueError):
+        retrieve.private_file_retrieve(http_server.url, filename, size=len(content),
+                                       md5='bad checksum')
+    assert listdir(tmp_path) == []
+
+    retrieve.private_file_retrieve(http_server.url, filename, size=len(content), md5=md5,
+                                   mode=0o444)
+    assert listdir(tmp_path) == ['file.bin']
+    assert Path(filename).read_bytes() == content
+    assert stat(filename).st_mode & 0o777 == 0o444
+
+
+def test_supports_ranges(http_server):
+    assert retrieve.supports_ranges(http_server.url)
+
+    http_server.ranges = False
+    assert not retrieve.supports_ranges(http_server.url)
+
+
+def test_segmented_file_retrieve(tmp_path, http_server):
+    content = http_server.content
+    md5 = hashlib.md5(content).hexdigest()
+    filename = join(tmp_path, 'file.bin')
+
+    # Truncated segments are resumed from their last written byte
+    http_server.n_truncate = 2
+    stats = retrieve.segmented_file_retrieve(http_server.url, filename, len(content),
+                                             md5=md5, n_connections=4, mode=0o444)
+    assert Path(filename).read_bytes() == content
+    assert stats['method'] == 'segmented'
+    assert stats['retries'] == 2
+    assert len(http_server.requests) == 6
+    assert stat(filename).st_mode & 0o777 == 0o444
+
+    # Checksum of the assembled file is verified
+    filename = join(tmp_path, 'bad.bin')
+    with pytest.raises(ValueError):
+        retrieve.segmented_file_retrieve(http_server.url, filename, len(content),
+                                         md5='bad checksum', n_connections=4)
+    assert not exists(filename)
+
+    # Server errors are retried, client errors are not
+    for status, n_requests in [(503, 3), (404, 1)]:
+        http_server.requests = []
+        http_server.status = status
+        with pytest.raises(HTTPError):
+            retrieve.segmented_file_retrieve(http_server.url, filename, len(content),
+                                             n_connections=1, retries=2)
+        assert len(http_server.requests) == n_requests
+        assert not exists(filename)
+
+
+def test_private_file_retrieve_segmented(tmp_path, http_server, monkeypatch):
+    content = http_server.content
+    monkeypatch.setattr(retrieve, 'segment_min_size', 1024)
+    filename = join(tmp_path, 'file.bin')
+
+    stats = retrieve.private_file_retrieve(http_server.url, filename, size=len(content),
+                                           md5=hashlib.md5(content).hexdigest())
+    assert stats['method'] == 'segmented'
+    assert listdir(tmp_path) == ['file.bin']
+    assert Path(filename).read_bytes() == content
+
+    # Single stream if byte ranges are not honored
+    http_server.ranges = False
+    stats = retrieve.private_file_retrieve(http_server.url, filename, size=len(content))
+    assert stats['method'] == 'stream'
+    assert Path(filename).read_bytes() == content
+
+
+class FakeFigshare:
+    """Figshare stand-in listing files served by a local HTTP server"""
+
+    token = None
+
+    def __init__(self, file_list):
+        self.file_list = file_list
+
+    def list_files(self, article_id):
+        return self.file_list
+
+
+def test_download_files(tmp_path, http_server):
+    content = http_server.content
+    file_list = [{'name': 'file.bin', 'size': len(content),
+                  'computed_md5': hashlib.md5(content).hexdigest(),
+                  'download_url': http_server.url}]
+
+    # Zero-filled file of full length left by an earlier interrupted run
+    dir_path = join(tmp_path, 'ORIGINAL_DATA')
+    Path(dir_path).mkdir()
+    Path(dir_path, 'file.bin').write_bytes(bytes(len(content)))
+
+    retrieve.download_files(12345678, FakeFigshare(file_list), root_directory=str(tmp_path),
+                            data_directory='ORIGINAL_DATA', mode='file')
+    assert Path(dir_path, 'file.bin').read_bytes() == content
+    assert len(http_server.requests) == 1
+
+    # Files and folder are sealed once retrieved
+    assert stat(join(dir_path, 'file.bin')).st_mode & 0o777 == 0o555
+    assert stat(dir_path).st_mode & 0o777 == 0o555
+
+    # Verified files are not retrieved again
+    retrieve.download_files(12345678, FakeFigshare(file_list), root_directory=str(tmp_path),
+                            data_directory='ORIGINAL_DATA', mode='file')
+    assert len(http_server.requests) == 1
+
+
+def test_find_previous_file(tmp_path, monkeypatch):
+    content = b'unchanged'
+    file_dict = {'name': 'same.bin', 'size': len(content),
+                 'computed_md5': hashlib.md5(content).hexdigest()}
+
+    previous_path = join(tmp_path, 'v1', 'ORIGINAL_DATA')
+    Path(previous_path).mkdir(parents=True)
+    Path(previous_path, 'same.bin').write_bytes(content)
+    assert retrieve.read_recorded_checksums(previous_path) is None
+
+    digest_dict = {'same.bin': {'md5': file_dict['computed_md5']}}
+    Path(tmp_path, 'v1', 'UAL_RDM').mkdir()
+    write_manifest(digest_dict, join(tmp_path, 'v1', 'UAL_RDM'), 'md5', prefix='ORIGINAL_DATA')
+    recorded_dict = {previous_path: retrieve.read_recorded_checksums(previous_path)}
+    assert recorded_dict[previous_path][0] == {'same.bin': file_dict['computed_md5']}
+
+    # Recorded checksum is used without reading the file
+    hashed = []
+    monkeypatch.setattr(retrieve, 'md5_checksum', lambda filename: hashed.append(filename))
+    assert retrieve.find_previous_file(file_dict, [previous_path], recorded_dict) == \
+        join(previous_path, 'same.bin')
+    assert hashed == []
+
+    # File modified after the manifest was written is read
+    manifest_mtime = recorded_dict[previous_path][1]
+    utime(join(previous_path, 'same.bin'), (manifest_mtime + 10, manifest_mtime + 10))
+    assert retrieve.find_previous_file(file_dict, [previous_path], recorded_dict) is None
+    assert hashed == [join(previous_path, 'same.bin')]
+
+
+def test_download_files_previous_version(tmp_path, http_server, monkeypatch):
+    content = http_server.content
+    md5 = hashlib.md5(content).hexdigest()
+    file_list = [{'name': name, 'size': len(content), 'computed_md5': md5,
+                  'download_url': http_server.url} for name in ['same.bin', 'changed.bin']]
+
+    # Earlier version with one unchanged file and one of the same size that changed
+    curation_dict = make_curation_dict(tmp_path)
+    previous_path = join(tmp_path, '4.Published', 'Name_12345678', 'v1', 'ORIGINAL_DATA')
+    Path(previous_path).mkdir(parents=True)
+    Path(previous_path, 'same.bin').write_bytes(content)
+    Path(previous_path, 'changed.bin').write_bytes(bytes(len(content)))
+
+    mc = MoveClass(curation_dict=curation_dict)
+    previous_directories = [join(version_path, 'ORIGINAL_DATA') for version_path in
+                            mc.get_previous_versions('Name_12345678/v2')]
+    assert previous_directories == [previous_path]
+
+    # Linked files take no space
+    required_list = []
+    monkeypatch.setattr(retrieve, 'check_disk_space',
+                        lambda path, required, log=None: required_list.append(required))
+
+    data_directory = join('Name_12345678', 'v2', 'ORIGINAL_DATA')
+    retrieve.download_files(12345678, FakeFigshare(file_list),
+                            root_directory=join(tmp_path, '1.ToDo'),
+                            data_directory=data_directory, mode='file',
+                            previous_directories=previous_directories)
+
+    dir_path = join(tmp_path, '1.ToDo', data_directory)
+    assert stat(join(dir_path, 'same.bin')).st_ino == \
+        stat(join(previous_path, 'same.bin')).st_ino
+    assert Path(dir_path, 'changed.bin').read_bytes() == content
+    assert len(http_server.requests) == 1
+    assert required_list == [len(content)]
+
+
+def test_download_files_bundle(tmp_path, http_server, monkeypatch):
+    content = http_server.content
+    file_list = [{'name': f'file{i}.bin', 'size': len(content),
+                  'computed_md5': hashlib.md5(content).hexdigest(),
+                  'download_url': http_server.url} for i in range(3)]
+
+    # Last file is missing from the archive and is retrieved on its own
+    archive = join(tmp_path, 'bundle.zip')
+    with zipfile.ZipFile(archive, 'w') as zf:
+        for file_dict in file_list[:-1]:
+            zf.writestr(file_dict['name'], content)
+
+    # Space for the spooled archive and the extracted files
+    required_list = []
+    monkeypatch.setattr(retrieve, 'check_disk_space',
+                        lambda path, required, log=None: required_list.append(required))
+
+    retrieve.download_files(12345678, FakeFigshare(file_list), root_directory=str(tmp_path),
+                            data_directory='ORIGINAL_DATA', mode='bundle',
+                            bundle_url=Path(archive).as_uri(), file_mode=0o444)
+
+    dir_path = join(tmp_path, 'ORIGINAL_DATA')
+    assert sorted(listdir(dir_path)) == ['file0.bin', 'file1.bin', 'file2.bin']
+    assert len(http_server.requests) == 1
+    for file_dict in file_list:
+        assert Path(dir_path, file_dict['name']).read_bytes() == content
+        assert stat(join(dir_path, file_dict['name'])).st_mode & 0o777 == 0o444
+    assert stat(dir_path).st_mode & 0o777 == 0o444
+    assert required_list == [2 * 3 * len(content)]
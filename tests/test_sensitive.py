@@ -0,0 +1,65 @@
+from os.path import join
+from os import makedirs
+
+from ldcoolp.curation.inspection import sensitive
+
+
+def test_scan_file(tmp_path):
+    filename = join(tmp_path, 'notes.txt')
+    with open(filename, 'wb') as f:
+        f.write(b"Contact jane.doe@example.edu or (520) 555-1234.\n"
+                b"SSN 123-45-6789, card 4111 1111 1111 1111, not 4111 1111 1111 1112\n"
+                b"Sample 12345678 on 2020-01-01\n" * 5)
+
+    result_dict = sensitive.scan_file(filename)
+    assert result_dict['counts'] == {'email': 5, 'phone': 5, 'ssn': 5, 'credit_card': 5}
+    assert result_dict['findings'][0] == {'type': 'email', 'line': 1, 'offset': 8,
+                                          'value': 'ja****************du'}
+    assert result_dict['findings'][-1]['line'] == 14
+
+    # Matches straddling chunk boundaries are found once
+    for chunk_size in [1, 7, 64]:
+        assert sensitive.scan_file(filename, chunk_size=chunk_size) == result_dict
+
+
+def test_false_positives(tmp_path):
+    filename = join(tmp_path, 'table.csv')
+    with open(filename, 'wb') as f:
+        # Luhn-valid numbers without a card issuer prefix or of the wrong
+        # length, mixed separators, and decimals
+        f.write(b"1000000000000008,79927398713,4111 1111-1111 1111,0.4111111111111111\n"
+                b"4111111111111111,378282246310005,2020-01-01\n")
+    assert sensitive.scan_file(filename)['counts'] == {'credit_card': 2}
+
+    # Longest email found across chunk boundaries
+    email = b'a' * 64 + b'@' + b'.'.join([b'b' * 63] * 5) + b'.' + b'c' * 24
+    with open(filename, 'wb') as f:
+        f.write(b'x ' * 300 + email + b' y\n')
+    for chunk_size in [1, 100, 1024]:
+        assert sensitive.scan_file(filename, chunk_size=chunk_size)['counts'] == {'email': 1}
+
+
+def test_inspect(tmp_path):
+    folder_path = join(tmp_path, 'Name_12345678', 'v1')
+    data_path = join(folder_path, 'ORIGINAL_DATA')
+    makedirs(join(data_path, 'sub'))
+
+    with open(join(data_path, 'sub', 'survey.csv'), 'w') as f:
+        f.write('id,email\n1,someone@arizona.edu\n')
+    with open(join(data_path, 'clean.txt'), 'w') as f:
+        f.write('Nothing to see here\n')
+    with open(join(data_path, 'data.bin'), 'wb') as f:
+        f.write(b'\x00someone@arizona.edu')
+
+    curation_dict = {'folder_data': 'ORIGINAL_DATA', 'folder_ual_rdm': 'UAL_RDM'}
+    result_list = sensitive.inspect(folder_path, curation_dict)
+
+    result_dict = {result['path']: result for result in result_list}
+    assert result_dict[join('sub', 'survey.csv')]['counts'] == {'email': 1}
+    assert result_dict['clean.txt']['counts'] == {}
+    assert result_dict['data.bin']['skipped'] == 'binary'
+
+    with open(join(folder_path, 'UAL_RDM', 'sensitive_data.txt')) as f:
+        report = f.read()
+    assert 'someone@arizona.edu' not in report
+    assert join('sub', 'survey.csv') in report
@@ -0,0 +1,50 @@
+from os.path import join
+from os import makedirs, remove
+
+from ldcoolp.curation.inspection import snapshot
+
+
+def test_SnapshotClass(tmp_path):
+    folder_path = join(tmp_path, 'Name_12345678', 'v1')
+    for folder in ['ORIGINAL_DATA', 'DATA']:
+        makedirs(join(folder_path, folder, 'sub', 'deep'))
+        for filename, content in [('README.txt', 'Read me\n'),
+                                  (join('sub', 'a.csv'), 'a,b\n1,2\n'),
+                                  (join('sub', 'deep', 'b.txt'), 'b\n')]:
+            with open(join(folder_path, folder, filename), 'w') as f:
+                f.write(content)
+
+    curation_dict = {'folder_data': 'ORIGINAL_DATA', 'folder_copy_data': 'DATA',
+                     'folder_ual_rdm': 'UAL_RDM'}
+    original_diff, session_diff = snapshot.inspect(folder_path, curation_dict)
+    assert not any(original_diff.values())
+    assert session_diff is None
+
+    # Curator edits
+    data_path = join(folder_path, 'DATA')
+    with open(join(data_path, 'sub', 'a.csv'), 'w') as f:
+        f.write('a,b\n1,3\n')
+    remove(join(data_path, 'sub', 'deep', 'b.txt'))
+    with open(join(data_path, 'new.txt'), 'w') as f:
+        f.write('new\n')
+
+    sc = snapshot.SnapshotClass(folder_path, curation_dict)
+    original_diff, session_diff = sc.main()
+    expected = {'added': ['new.txt'], 'removed': [join('sub', 'deep', 'b.txt')],
+                'modified': [join('sub', 'a.csv')]}
+    assert original_diff == expected
+    assert session_diff == expected
+
+    # Unchanged files are not hashed again
+    tree, previous = sc.snapshot('DATA')
+    assert tree == previous['tree']
+    hash_list = []
+    snapshot.scan_tree(data_path, previous['tree'], hash_list)
+    assert hash_list == []
+
+    original_diff, session_diff = sc.main()
+    assert original_diff == expected
+    assert not any(session_diff.values())
+
+    with open(join(folder_path, 'UAL_RDM', 'snapshot_diff.txt')) as f:
+        assert 'MODIFIED: ' + join('sub', 'a.csv') in f.read()
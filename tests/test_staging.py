@@ -0,0 +1,99 @@
+from os.path import join, exists
+from os import makedirs
+import fcntl
+
+from ldcoolp.admin.move import MoveClass
+from ldcoolp.admin.lock import get_lock_filename
+from ldcoolp.curation import staging
+
+from .test_move import make_curation_dict
+
+
+def make_staging(tmp_path, monkeypatch):
+    """Return curation_dict, MoveClass and list of retrieved article IDs"""
+
+    curation_dict = make_curation_dict(tmp_path)
+    curation_dict.update({'folder_prefetch': '.prefetch', 'folder_data': 'ORIGINAL_DATA',
+                          'folder_copy_data': 'DATA', 'folder_ual_rdm': 'UAL_RDM',
+                          'scan_sensitive': True})
+
+    retrieved = []
+
+    def fake_download_files(article_id, fs, root_directory=None, data_directory=None,
+                            **kwargs):
+        retrieved.append(article_id)
+        makedirs(join(root_directory, data_directory))
+        with open(join(root_directory, data_directory, 'file.txt'), 'w') as f:
+            f.write('Contact: jane.doe@example.com\n')
+
+    monkeypatch.setattr(staging, 'download_files', fake_download_files)
+
+    return curation_dict, MoveClass(curation_dict=curation_dict), retrieved
+
+
+def test_stage(tmp_path, monkeypatch):
+    curation_dict, mc, retrieved = make_staging(tmp_path, monkeypatch)
+
+    # Deposit locked by another process (e.g., a curator's workflow) is skipped
+    lock_filename = get_lock_filename(join(tmp_path, '.locks'), 'Name_12345678/v1')
+    makedirs(join(tmp_path, '.locks'), exist_ok=True)
+    with open(lock_filename, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        assert not staging.stage(12345678, 'Name_12345678/v1', None,
+                                 curation_dict=curation_dict, mc=mc)
+    assert retrieved == []
+
+    assert staging.stage(12345678, 'Name_12345678/v1', None, curation_dict=curation_dict,
+                         mc=mc)
+    assert retrieved == [12345678]
+    assert exists(join(tmp_path, '.prefetch', 'Name_12345678', 'v1', 'ORIGINAL_DATA',
+                       'file.txt'))
+    assert not exists(join(tmp_path, '.prefetch', '.partial', 'Name_12345678'))
+
+    # Scanned for sensitive data
+    with open(join(tmp_path, '.prefetch', 'Name_12345678', 'v1', 'UAL_RDM',
+                   'sensitive_data.txt')) as f:
+        assert 'email' in f.read()
+
+    # Already prefetched
+    assert not staging.stage(12345678, 'Name_12345678/v1', None,
+                             curation_dict=curation_dict, mc=mc)
+    assert retrieved == [12345678]
+
+
+def test_adopt(tmp_path, monkeypatch):
+    curation_dict, mc, retrieved = make_staging(tmp_path, monkeypatch)
+    staging.stage(12345678, 'Name_12345678/v1', None, curation_dict=curation_dict, mc=mc)
+
+    root_directory = join(tmp_path, '1.ToDo')
+    assert staging.adopt('Name_12345678/v1', root_directory, curation_dict=curation_dict)
+    assert exists(join(root_directory, 'Name_12345678', 'v1', 'ORIGINAL_DATA', 'file.txt'))
+    assert not exists(join(tmp_path, '.prefetch', 'Name_12345678'))
+
+    # Nothing staged
+    assert not staging.adopt('Name_12345678/v1', root_directory, curation_dict=curation_dict)
+
+    # Deposits set up by a curator are not prefetched again
+    assert not staging.stage(12345678, 'Name_12345678/v1', None,
+                             curation_dict=curation_dict, mc=mc)
+    assert retrieved == [12345678]
+
+
+def test_clean(tmp_path, monkeypatch):
+    curation_dict, mc, _ = make_staging(tmp_path, monkeypatch)
+    for article_id in [11111111, 22222222, 33333333]:
+        staging.stage(article_id, f'Name_{article_id}/v1', None, curation_dict=curation_dict,
+                      mc=mc)
+
+    # Set up without adopting the prefetched data, and an abandoned retrieval
+    makedirs(join(tmp_path, '1.ToDo', 'Name_11111111', 'v1'))
+    makedirs(join(tmp_path, '.prefetch', '.partial', 'Name_44444444', 'v1'))
+
+    assert staging.clean(curation_dict=curation_dict, mc=mc) == ['Name_11111111/v1']
+    assert staging.list_staged(join(tmp_path, '.prefetch')) == \
+        ['Name_22222222/v1', 'Name_33333333/v1']
+
+    assert staging.clean(curation_dict=curation_dict, pending_list=[22222222], mc=mc) == \
+        ['Name_33333333/v1', 'Name_44444444/v1']
+    assert staging.list_staged(join(tmp_path, '.prefetch')) == ['Name_22222222/v1']
+    assert not exists(join(tmp_path, '.prefetch', '.partial', 'Name_44444444'))
@@ -0,0 +1,25 @@
+from os.path import join
+import json
+
+from ldcoolp.curation.telemetry import TelemetryClass
+
+
+def test_TelemetryClass(tmp_path):
+    filename = join(tmp_path, 'test.telemetry.jsonl')
+
+    telemetry = TelemetryClass(12345678, 3000, 3, filename=filename)
+    telemetry.record('file1.txt', 1000, 0.5, ttfb=0.1)
+    telemetry.record('file2.txt', 1000, 0.5, ttfb=0.3, retries=1)
+    telemetry.record('file3.txt', 1000, 0.1, method='hardlink')
+    summary_dict = telemetry.finish()
+
+    assert summary_dict['files'] == 3
+    assert summary_dict['bytes'] == 3000
+    assert summary_dict['transfer_bytes'] == 2000
+    assert summary_dict['throughput'] == 2000.0
+    assert summary_dict['median_ttfb'] == 0.2
+    assert summary_dict['retries'] == 1
+
+    with open(filename) as f:
+        records = [json.loads(line) for line in f]
+    assert [record['type'] for record in records] == ['file'] * 3 + ['deposit']
@@ -0,0 +1,60 @@
+from os.path import join, exists
+from os import makedirs, stat
+import tarfile
+import zipfile
+
+from ldcoolp.curation import unpack
+
+
+def test_unpack(tmp_path):
+    folder_path = join(tmp_path, 'Name_12345678', 'v1')
+    data_path = join(folder_path, 'ORIGINAL_DATA')
+    makedirs(join(data_path, 'sub'))
+    makedirs(join(folder_path, 'DATA'))
+
+    with zipfile.ZipFile(join(data_path, 'sub', 'data.zip'), 'w') as zf:
+        for ii in range(20):
+            zf.writestr(f'folder/file{ii}.txt', f'file{ii}')
+
+    with open(join(tmp_path, 'file.txt'), 'w') as f:
+        f.write('content')
+    with tarfile.open(join(data_path, 'data.tar.gz'), 'w:gz') as tar:
+        tar.add(join(tmp_path, 'file.txt'), arcname='inner/file.txt')
+
+    # Path traversal
+    with zipfile.ZipFile(join(data_path, 'evil.zip'), 'w') as zf:
+        zf.writestr('../../evil.txt', 'evil')
+
+    # Zip bomb
+    with zipfile.ZipFile(join(data_path, 'bomb.zip'), 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('zeros.bin', b'\0' * 10**6)
+
+    # Unsupported compression method (Deflate64) set in the local and central headers
+    with zipfile.ZipFile(join(data_path, 'deflate64.zip'), 'w') as zf:
+        zf.writestr('file.txt', 'content')
+    with open(join(data_path, 'deflate64.zip'), 'r+b') as f:
+        content = bytearray(f.read())
+        content[8:10] = (9).to_bytes(2, 'little')
+        central = content.index(b'PK\x01\x02')
+        content[central + 10:central + 12] = (9).to_bytes(2, 'little')
+        f.seek(0)
+        f.write(content)
+
+    curation_dict = {'folder_data': 'ORIGINAL_DATA', 'folder_copy_data': 'DATA'}
+    result_dict = unpack.unpack(folder_path, curation_dict)
+
+    assert result_dict == {'bomb.zip': None, 'data.tar.gz': 1, 'deflate64.zip': None,
+                           'evil.zip': None, join('sub', 'data.zip'): 20}
+    assert not exists(join(folder_path, 'DATA', 'deflate64'))
+    assert not exists(join(folder_path, 'DATA', '.deflate64.partial'))
+    with open(join(folder_path, 'DATA', 'sub', 'data', 'folder', 'file7.txt')) as f:
+        assert f.read() == 'file7'
+    with open(join(folder_path, 'DATA', 'data', 'inner', 'file.txt')) as f:
+        assert f.read() == 'content'
+    assert stat(join(folder_path, 'DATA', 'data', 'inner')).st_mode & 0o777 == 0o777
+    assert not exists(join(tmp_path, 'Name_12345678', 'evil.txt'))
+    assert not exists(join(folder_path, 'DATA', 'evil'))
+    assert not exists(join(folder_path, 'DATA', 'bomb'))
+
+    # Already unpacked
+    assert unpack.unpack(folder_path, curation_dict)[join('sub', 'data.zip')] is None
@@ -0,0 +1,70 @@
+from os.path import join
+from os import makedirs, symlink
+
+from ldcoolp.curation.inspection import validate
+
+
+def test_validate_file(tmp_path):
+    filename = join(tmp_path, 'table.csv')
+    with open(filename, 'wb') as f:
+        f.write(b'a,b,c\r\n1,2,3\r\n"x,y",5,6\r\n7,8\r\n9,10,11,12\n' +
+                'café,é,1\n'.encode() + b'caf\xe9,2,3\n')
+
+    # Small chunks so that rows, CRLF and characters straddle chunk boundaries
+    for chunk_size in [3, 7, 1024]:
+        result_dict = validate.validate_file(filename, delimiter=',', chunk_size=chunk_size)
+        assert result_dict['rows'] == 7
+        assert result_dict['columns'] == 3
+        assert result_dict['inconsistent_rows'] == 2
+        assert result_dict['encoding'] == 'mixed'
+        assert result_dict['line_endings'] == {'\r\n': 4, '\n': 3}
+        assert len(result_dict['issues']) == 4
+
+    # Malformed quoting
+    with open(filename, 'w') as f:
+        f.write('a,b\n"1"x,2\n3,4\n')
+    result_dict = validate.validate_file(filename, delimiter=',')
+    assert result_dict['rows'] == 2
+    assert 'malformed' in result_dict['issues'][0]
+
+    # Lines longer than the cap are not held in memory
+    with open(filename, 'w') as f:
+        f.write('a,b\n' + 'x' * 100 + ',1\n')
+    result_dict = validate.validate_file(filename, delimiter=',', chunk_size=16,
+                                         max_line_length=50)
+    assert result_dict['skipped'] == 'invalid (Line 2 is longer than 50 characters)'
+    assert len(result_dict['issues']) == 1
+    assert not validate.validate_file(filename, delimiter=',', chunk_size=16)['skipped']
+
+    # Binary files are skipped
+    with open(filename, 'wb') as f:
+        f.write(bytes(100))
+    assert validate.validate_file(filename)['skipped'] == 'binary'
+
+
+def test_inspect(tmp_path):
+    folder_path = join(tmp_path, 'Name_12345678', 'v1')
+    data_path = join(folder_path, 'DATA')
+    makedirs(join(data_path, 'sub'))
+
+    with open(join(data_path, 'good.tsv'), 'w') as f:
+        f.write('a\tb\n1\t2\n')
+    with open(join(data_path, 'sub', 'notes.txt'), 'w') as f:
+        f.write('x;y;z\n1;2;3\n4;5;6\n7;8;9\n10;11\n')
+    with open(join(data_path, 'image.png'), 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+    # Unreadable file does not stop the validation of the others
+    symlink(join(data_path, 'missing.csv'), join(data_path, 'broken.csv'))
+
+    curation_dict = {'folder_copy_data': 'DATA', 'folder_ual_rdm': 'UAL_RDM'}
+    result_list = validate.inspect(folder_path, curation_dict)
+
+    result_dict = {result['path']: result for result in result_list}
+    assert sorted(result_dict) == ['broken.csv', 'good.tsv', join('sub', 'notes.txt')]
+    assert result_dict['broken.csv']['skipped'].startswith('unreadable')
+    assert not result_dict['good.tsv']['issues']
+    assert result_dict[join('sub', 'notes.txt')]['delimiter'] == ';'
+    assert result_dict[join('sub', 'notes.txt')]['inconsistent_rows'] == 1
+
+    with open(join(folder_path, 'UAL_RDM', 'validation_report.txt')) as f:
+        assert 'ISSUE' in f.read()